@@ -1,36 +1,35 @@
-from src.plotting import BasePlot, PlotStyle
-import matplotlib.pyplot as plt
+from src.plotting import BasePlot, PlotStyle, pivot
 import numpy as np
 from typing import Optional, List, Union
 
 class AccountValuePlot(BasePlot):
     def plot(self, account_ids: Optional[Union[int, List[int]]] = None):
-        fig = PlotStyle.setup_plot_style()
+        fig = self.new_figure()
         
         if account_ids is None:
             account_ids = self.accounts_df['account_id'].unique()
         elif isinstance(account_ids, int):
             account_ids = [account_ids]
         
-        colors = PlotStyle.get_colors(
-            self.accounts_df[self.accounts_df['account_id'].isin(account_ids)],
-            'account_id',
-            'Set2'
-        )
+        selected = self.accounts_df[self.accounts_df['account_id'].isin(account_ids)]
+        colors = PlotStyle.get_colors(selected, 'account_id', 'Set2')
         
         ax = PlotStyle.setup_axis(
-            plt.subplot(1, 1, 1),
+            fig.add_subplot(1, 1, 1),
             'Account Balances Over Time',
             'Block Number',
             'Full Balance'
         )
         
+        values = pivot(selected, 'block', 'account_id', 'market_value')
         for idx, account_id in enumerate(account_ids):
-            account_data = self.accounts_df[self.accounts_df['account_id'] == account_id]
-            ax.plot(account_data['block'], 
-                    account_data['market_value'],
-                    color=colors[idx],
-                    label=f'Account {account_id}')
+            if account_id not in values.columns:
+                continue
+            PlotStyle.plot_line(ax,
+                                values.index,
+                                values[account_id],
+                                color=colors[idx],
+                                label=f'Account {account_id}')
         
         PlotStyle.create_legend(ax)
-        plt.tight_layout()
+        fig.tight_layout()
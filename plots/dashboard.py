@@ -1,49 +1,52 @@
-from src.plotting import BasePlot, PlotStyle
-import matplotlib.pyplot as plt
+from src.plotting import BasePlot, PlotStyle, pivot
+import pandas as pd
 import numpy as np
 
+MAX_BARS = 20
+
 class DashboardPlot(BasePlot):
     def plot(self):
-        fig = PlotStyle.setup_plot_style()
+        fig = self.new_figure()
         
         checkpoints = np.linspace(0, self.blocks, int(self.n_steps) + 1, dtype=int)[:-1]
         interval_labels = [str(i) for i in range(len(checkpoints))]
         
-        non_root_subnets_df = self.subnets_df[self.subnets_df['subnet_id'] != 0]
-        non_root_subnets = non_root_subnets_df['subnet_id'].unique()
+        subnet_pivots = pivot(self.subnets_df, 'block', 'subnet_id', ['exchange_rate', 'emission_rate'])
+        subnet_pivots = {value: df.drop(columns=0, errors='ignore') for value, df in subnet_pivots.items()}
+        non_root_subnets = subnet_pivots['exchange_rate'].columns
+        balances_pivot = pivot(self.accounts_df, 'block', 'account_id', 'market_value')
 
-        s_colors = PlotStyle.get_colors(non_root_subnets_df, 'subnet_id', 'Set1')
-        a_colors = PlotStyle.get_colors(self.accounts_df, 'account_id', 'Set2')
+        s_colors = PlotStyle.get_colors(pd.DataFrame({'subnet_id': non_root_subnets}), 'subnet_id', 'Set1')
+        a_colors = PlotStyle.get_colors(pd.DataFrame({'account_id': balances_pivot.columns}), 'account_id', 'Set2')
 
-        ax1 = PlotStyle.setup_axis(plt.subplot(2, 2, 1), 'Exchange Rates Over Time')
-        exchange_rates_pivot = non_root_subnets_df.pivot(index='block', 
-                                                        columns='subnet_id', 
-                                                        values='exchange_rate')
+        ax1 = PlotStyle.setup_axis(fig.add_subplot(2, 2, 1), 'Exchange Rates Over Time')
+        exchange_rates_pivot = subnet_pivots['exchange_rate']
         for i, subnet in enumerate(non_root_subnets):
-            ax1.plot(exchange_rates_pivot.index, 
-                    exchange_rates_pivot[subnet],
-                    label=f'Subnet {subnet}', 
-                    color=s_colors[i])
+            PlotStyle.plot_line(ax1,
+                                exchange_rates_pivot.index,
+                                exchange_rates_pivot[subnet],
+                                label=f'Subnet {subnet}',
+                                color=s_colors[i])
         PlotStyle.create_legend(ax1)
 
-        ax2 = PlotStyle.setup_axis(plt.subplot(2, 2, 2), 'User Balances Over Time')
-        balances_pivot = self.accounts_df.pivot(index='block', 
-                                              columns='account_id', 
-                                              values='market_value')
+        ax2 = PlotStyle.setup_axis(fig.add_subplot(2, 2, 2), 'User Balances Over Time')
         for i, account in enumerate(balances_pivot.columns):
-            ax2.plot(balances_pivot.index, 
-                    balances_pivot[account],
-                    label=f'User {account}', 
-                    color=a_colors[i])
+            PlotStyle.plot_line(ax2,
+                                balances_pivot.index,
+                                balances_pivot[account],
+                                label=f'User {account}',
+                                color=a_colors[i])
         PlotStyle.create_legend(ax2)
 
-        ax3 = PlotStyle.setup_axis(plt.subplot(2, 2, 3), 
+        ax3 = PlotStyle.setup_axis(fig.add_subplot(2, 2, 3), 
                                  'Emission Rates Over Time',
                                  'Blocks', 
                                  'Emission Rate')
-        emission_data = non_root_subnets_df.pivot(index='block', 
-                                                 columns='subnet_id',
-                                                 values='emission_rate').fillna(0)
+        emission_data = subnet_pivots['emission_rate'].fillna(0)
+        # One bar per logged block is unreadable past a few dozen; show an
+        # evenly spaced subset instead.
+        if len(emission_data) > MAX_BARS:
+            emission_data = emission_data.iloc[np.linspace(0, len(emission_data) - 1, MAX_BARS).astype(int)]
         emission_data.plot(kind='bar', 
                          stacked=True, 
                          ax=ax3, 
@@ -51,17 +54,18 @@ class DashboardPlot(BasePlot):
                          legend=False)
         ax3.tick_params(axis='x', rotation=45)
 
-        ax4 = PlotStyle.setup_axis(plt.subplot(2, 2, 4), 
+        ax4 = PlotStyle.setup_axis(fig.add_subplot(2, 2, 4), 
                                  'Sum of Subnet Exchange Rates Over Time',
                                  'Interval', 
                                  'Sum of Exchange Rates')
-        ax4.plot(self.subtensor_df['block'], 
-                self.subtensor_df['sum_prices'],
-                color='cyan', 
-                label='Sum of Exchange Rates')
+        PlotStyle.plot_line(ax4,
+                            self.subtensor_df['block'],
+                            self.subtensor_df['sum_prices'],
+                            color='cyan',
+                            label='Sum of Exchange Rates')
 
         for ax in [ax1, ax2, ax4]:
             ax.set_xticks(checkpoints)
             ax.set_xticklabels(interval_labels)
 
-        plt.tight_layout()
+        fig.tight_layout()
@@ -0,0 +1,38 @@
+from src.plotting import BasePlot, PlotStyle
+
+class EnsembleBandsPlot(BasePlot):
+    @property
+    def bands_df(self):
+        return self.results.table("bands")
+
+    def plot(self, metric: str = 'market_value'):
+        fig = self.new_figure()
+
+        bands = self.bands_df[self.bands_df['metric'] == metric]
+        quantiles = sorted(column for column in bands.columns if column.startswith('q'))
+        colors = PlotStyle.get_colors(bands, 'id', 'Set2')
+
+        label = 'Account' if metric == 'market_value' else 'Subnet'
+        ax = PlotStyle.setup_axis(
+            fig.add_subplot(1, 1, 1),
+            f'{metric.replace("_", " ").title()} Across Replicates',
+            'Block Number',
+            metric.replace('_', ' ').title()
+        )
+
+        for idx, (item_id, data) in enumerate(bands.groupby('id')):
+            for outer in range(len(quantiles) // 2):
+                ax.fill_between(data['block'],
+                                data[quantiles[outer]],
+                                data[quantiles[-outer - 1]],
+                                color=colors[idx],
+                                alpha=0.15 * (outer + 1),
+                                linewidth=0)
+            center = quantiles[len(quantiles) // 2] if len(quantiles) % 2 else 'mean'
+            ax.plot(data['block'],
+                    data[center],
+                    color=colors[idx],
+                    label=f'{label} {item_id}')
+
+        PlotStyle.create_legend(ax)
+        fig.tight_layout()
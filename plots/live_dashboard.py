@@ -0,0 +1,82 @@
+from src.live import LivePlot, Series
+from src.plotting import PlotStyle
+import matplotlib.pyplot as plt
+import numpy as np
+
+# Lines per panel; accounts beyond this are not drawn live.
+MAX_LINES = 10
+
+class LiveDashboardPlot(LivePlot):
+    def setup(self):
+        fig = self.fig = PlotStyle.setup_plot_style()
+        self.axes = {
+            'exchange_rate': PlotStyle.setup_axis(fig.add_subplot(2, 2, 1), 'Exchange Rates Over Time'),
+            'market_value': PlotStyle.setup_axis(fig.add_subplot(2, 2, 2), 'User Balances Over Time'),
+            'emission_rate': PlotStyle.setup_axis(fig.add_subplot(2, 2, 3),
+                                                  'Emission Rates Over Time',
+                                                  'Blocks',
+                                                  'Emission Rate'),
+            'sum_prices': PlotStyle.setup_axis(fig.add_subplot(2, 2, 4),
+                                               'Sum of Subnet Exchange Rates Over Time',
+                                               'Blocks',
+                                               'Sum of Exchange Rates'),
+        }
+        for ax in self.axes.values():
+            ax.set_xlim(0, self.blocks)
+        self.series = {}
+        self.limits = {}
+        fig.tight_layout()
+
+    def update(self, tables):
+        changed = False
+        subnets = tables.get('subnets')
+        if subnets is not None:
+            non_root = subnets['subnet_id'] != 0
+            for metric in ('exchange_rate', 'emission_rate'):
+                changed |= self._extend(metric, subnets['block'][non_root], subnets['subnet_id'][non_root],
+                                        subnets[metric][non_root], 'Subnet', 'Set1')
+        accounts = tables.get('accounts')
+        if accounts is not None:
+            changed |= self._extend('market_value', accounts['block'], accounts['account_id'],
+                                    accounts['market_value'], 'User', 'Set2')
+        subtensor = tables.get('subtensor')
+        if subtensor is not None:
+            changed |= self._extend('sum_prices', subtensor['block'], np.zeros(len(subtensor['block'])),
+                                    subtensor['sum_prices'], None, None)
+
+        for (metric, _), series in self.series.items():
+            series.redraw(max(int(self.axes[metric].get_window_extent().width), 200))
+        return changed
+
+    def _extend(self, metric, blocks, ids, values, label, cmap):
+        ax = self.axes[metric]
+        changed = False
+        for id_ in np.unique(ids):
+            key = (metric, id_)
+            if key not in self.series:
+                if sum(1 for m, _ in self.series if m == metric) >= MAX_LINES:
+                    continue
+                index = sum(1 for m, _ in self.series if m == metric)
+                line, = ax.plot([], [],
+                                color=plt.get_cmap(cmap)(index) if cmap else 'cyan',
+                                label=f'{label} {id_}' if label else 'Sum of Exchange Rates')
+                self.series[key] = Series(self.add_artist(line))
+                if label:
+                    PlotStyle.create_legend(ax)
+                changed = True
+            mask = ids == id_
+            self.series[key].extend(blocks[mask], values[mask])
+
+        # The y range only grows, with some headroom, so blitting can go on
+        # between the rare full redraws.
+        if len(values) and np.isfinite(values).any():
+            low, high = np.nanmin(values), np.nanmax(values)
+            current = self.limits.get(metric)
+            if current is None or low < current[0] or high > current[1]:
+                low = low if current is None else min(low, current[0])
+                high = high if current is None else max(high, current[1])
+                margin = 0.1 * (high - low) or 0.1 * abs(high) or 1.0
+                self.limits[metric] = (low - margin, high + margin)
+                ax.set_ylim(*self.limits[metric])
+                changed = True
+        return changed
@@ -0,0 +1,37 @@
+from src.plotting import BasePlot, PlotStyle
+from src.store import ResultStore
+import matplotlib.pyplot as plt
+
+# Runs beyond this many are drawn without a legend entry each.
+MAX_LEGEND_RUNS = 10
+
+class RunComparisonPlot(BasePlot):
+    # data_dir is a result store (a results.sqlite file or the directory
+    # holding one); only the rows of the selected account are read.
+    def plot(self, account_id: int = 1):
+        fig = self.new_figure()
+
+        store = ResultStore(self.data_dir)
+        values = store.compare('accounts', 'market_value', account_id=account_id)
+        store.close()
+
+        ax = PlotStyle.setup_axis(
+            fig.add_subplot(1, 1, 1),
+            f'Account {account_id} Market Value Across {values.shape[1]} Runs',
+            'Block Number',
+            'Market Value'
+        )
+
+        cmap = plt.get_cmap('viridis', max(values.shape[1], 1))
+        for idx, run_id in enumerate(values.columns):
+            run = values[run_id].dropna()
+            PlotStyle.plot_line(ax,
+                                run.index.to_numpy(),
+                                run.to_numpy(),
+                                color=cmap(idx),
+                                linewidth=1,
+                                label=run_id if values.shape[1] <= MAX_LEGEND_RUNS else None)
+
+        if 0 < values.shape[1] <= MAX_LEGEND_RUNS:
+            PlotStyle.create_legend(ax)
+        fig.tight_layout()
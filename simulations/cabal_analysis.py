@@ -1,4 +1,5 @@
 from src.models import Subnet, Account, Trade
+from src.schedules import Periodic
 from src.simulation import run_simulation
 import argparse
 
@@ -19,40 +20,12 @@ accounts = [
 trades = [
     Trade(block=0, account_id=1, subnet_id=1, action='buy', amount='all'),
     Trade(block=0, account_id=2, subnet_id=2, action='buy', amount='all'),
-]
-
-for block in range(blocks):
-    trades.append(Trade(
-        block=block,
-        account_id=1,
-        subnet_id=2,
-        action='unstake',
-        amount='all'
-    ))
-
-    trades.append(Trade(
-        block=block,
-        account_id=2,
-        subnet_id=1,
-        action='unstake',
-        amount='all'
-    ))
 
-    trades.append(Trade(
-        block=block,
-        account_id=1,
-        subnet_id=1,
-        action='stake',
-        amount='all'
-    ))
-
-    trades.append(Trade(
-        block=block,
-        account_id=2,
-        subnet_id=2,
-        action='stake',
-        amount='all'
-    ))
+    Periodic(account_id=1, subnet_id=2, action='unstake', amount='all', stop=blocks),
+    Periodic(account_id=2, subnet_id=1, action='unstake', amount='all', stop=blocks),
+    Periodic(account_id=1, subnet_id=1, action='stake', amount='all', stop=blocks),
+    Periodic(account_id=2, subnet_id=2, action='stake', amount='all', stop=blocks),
+]
 
 config = {
     "blocks": blocks + 1,
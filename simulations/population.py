@@ -0,0 +1,88 @@
+from src.models import Subnet
+from src.accounts import AccountStore
+from src.trades import TradeBook, BUY, SELL, AMOUNT_ABSOLUTE, AMOUNT_PERCENT
+from src.simulation import run_simulation
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+# A validator/nominator population of 100k accounts held in an AccountStore:
+# 64 validators stake on every subnet, nominators on one or two subnets each.
+# Trades arrive in bursts on a few blocks so event mode can fast-forward the
+# quiet ranges in between.
+blocks = 7200
+n_steps = 4
+n_subnets = 16
+n_validators = 64
+n_accounts = 100_000
+n_trades = 50_000
+n_trade_blocks = 100
+
+
+def build_population(rng: np.random.Generator, subnet_ids: np.ndarray) -> AccountStore:
+    free_balance = rng.gamma(2.0, 50.0, n_accounts)
+    stakes = np.zeros((n_accounts, len(subnet_ids)))
+    stakes[:n_validators, 0] = rng.uniform(1000.0, 5000.0, n_validators)
+    stakes[:n_validators, 1:] = rng.uniform(100.0, 500.0, (n_validators, len(subnet_ids) - 1))
+
+    nominators = np.arange(n_validators, n_accounts)
+    first = rng.integers(0, len(subnet_ids), len(nominators))
+    stakes[nominators, first] = rng.gamma(2.0, 5.0, len(nominators))
+    second = rng.random(len(nominators)) < 0.3
+    stakes[nominators[second], rng.integers(1, len(subnet_ids), second.sum())] += rng.gamma(2.0, 5.0, second.sum())
+
+    return AccountStore(np.arange(n_accounts), free_balance, subnet_ids, stakes)
+
+
+def build_trades(rng: np.random.Generator, store: AccountStore) -> TradeBook:
+    action = np.where(rng.random(n_trades) < 0.5, BUY, SELL)
+    return TradeBook(
+        block=rng.choice(rng.choice(np.arange(1, blocks - 1), n_trade_blocks, replace=False), n_trades),
+        account_id=rng.choice(store.ids, n_trades),
+        subnet_id=rng.choice(store.subnet_ids[1:], n_trades),
+        action=action,
+        amount_kind=np.where(action == BUY, AMOUNT_ABSOLUTE, AMOUNT_PERCENT),
+        amount_value=np.where(action == BUY, rng.uniform(0.5, 5.0, n_trades), rng.uniform(5.0, 50.0, n_trades))
+    )
+
+
+rng = np.random.default_rng(0)
+subnets = [
+    Subnet(id=0, tao_in=10000.0, alpha_in=10000.0, alpha_out=10000.0, is_root=True),
+    *[Subnet(id=i, tao_in=1000.0, alpha_in=1000.0, alpha_out=1000.0) for i in range(1, n_subnets + 1)],
+]
+accounts = build_population(rng, np.array([s.id for s in subnets]))
+
+config = {
+    "blocks": blocks,
+    "n_steps": n_steps,
+    "subnets": subnets,
+    "accounts": accounts,
+    "trades": build_trades(rng, accounts),
+    "tao_supply": 1000000.0,
+    "global_split": 0.5,
+    "balanced": True,
+    "root_weight": 0.5,
+    "engine": "numpy",
+    "mode": "event",
+    "output_format": "npy",
+    "chunk_size": 1 << 16
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--plots', nargs='+', help='List of plot modules to run')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Report the peak memory allocated during the run (slows it down)')
+    args = parser.parse_args()
+
+    print(f"{n_accounts} accounts x {len(subnets)} subnets, account store {accounts.nbytes / 1e6:.1f} MB")
+    if args.trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    run_simulation(config, args.plots if args.plots else [])
+    print(f"Simulated {blocks} blocks in {time.perf_counter() - start:.1f}s")
+    if args.trace_memory:
+        print(f"Peak memory allocated during the run: {tracemalloc.get_traced_memory()[1] / 1e6:.1f} MB")
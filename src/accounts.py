@@ -0,0 +1,201 @@
+from collections.abc import Mapping, MutableMapping
+from typing import Dict, Iterator, List, Optional, Sequence
+import numpy as np
+from .models import Account
+
+
+class StakeView(MutableMapping):
+    # Dict-like view of one account's row in an AccountStore. Iteration and
+    # membership only see nonzero stakes; reading a subnet the account has no
+    # stake on gives 0.0, like a dict entry that was staked and then emptied.
+    __slots__ = ('store', 'row')
+
+    def __init__(self, store: 'AccountStore', row: int):
+        self.store = store
+        self.row = row
+
+    def __getitem__(self, subnet_id: int) -> float:
+        column = self.store.subnet_index.get(subnet_id)
+        if column is None:
+            raise KeyError(subnet_id)
+        return float(self.store.alpha_stakes[self.row, column])
+
+    def __setitem__(self, subnet_id: int, stake: float):
+        column = self.store.subnet_index.get(subnet_id)
+        if column is None:
+            raise KeyError(f"Subnet {subnet_id} is not a column of this account store")
+        self.store.alpha_stakes[self.row, column] = stake
+
+    def __delitem__(self, subnet_id: int):
+        self[subnet_id] = 0.0
+
+    def __contains__(self, subnet_id: object) -> bool:
+        column = self.store.subnet_index.get(subnet_id)
+        return column is not None and self.store.alpha_stakes[self.row, column] != 0
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.store.subnet_ids[np.flatnonzero(self.store.alpha_stakes[self.row])].tolist())
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.store.alpha_stakes[self.row]))
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class AccountView:
+    # Account-like handle on one row of an AccountStore; reads and writes go
+    # straight to the store's arrays.
+    __slots__ = ('store', 'row')
+
+    def __init__(self, store: 'AccountStore', row: int):
+        self.store = store
+        self.row = row
+
+    @property
+    def id(self) -> int:
+        return int(self.store.ids[self.row])
+
+    @property
+    def free_balance(self) -> float:
+        return float(self.store.free_balance[self.row])
+
+    @free_balance.setter
+    def free_balance(self, value: float):
+        self.store.free_balance[self.row] = value
+
+    @property
+    def alpha_stakes(self) -> StakeView:
+        return StakeView(self.store, self.row)
+
+    @alpha_stakes.setter
+    def alpha_stakes(self, stakes: Dict[int, float]):
+        self.store.alpha_stakes[self.row] = 0.0
+        view = StakeView(self.store, self.row)
+        for subnet_id, stake in stakes.items():
+            view[subnet_id] = stake
+
+    @property
+    def registered_subnets(self) -> List[int]:
+        return self.store.registered_subnets_of(self.row)
+
+    def __repr__(self) -> str:
+        return (f"AccountView(id={self.id}, free_balance={self.free_balance}, "
+                f"registered_subnets={self.registered_subnets}, alpha_stakes={self.alpha_stakes!r})")
+
+
+class AccountStore(Mapping):
+    # Array-backed account population, a mapping from account id to an
+    # AccountView. Stakes are a dense accounts x subnets matrix (8 bytes per
+    # cell, 100k accounts x 16 subnets is 12.8 MB); registrations are CSR
+    # (indptr/indices) and default to every subnet of the store.
+    def __init__(self, ids: Sequence[int], free_balance: Sequence[float], subnet_ids: Sequence[int],
+                 alpha_stakes: Optional[np.ndarray] = None,
+                 registered_indptr: Optional[Sequence[int]] = None,
+                 registered_indices: Optional[Sequence[int]] = None):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.free_balance = np.array(free_balance, dtype=np.float64)
+        self.subnet_ids = np.asarray(subnet_ids, dtype=np.int64)
+        if self.free_balance.shape != self.ids.shape:
+            raise ValueError("Account store ids and free balances must have the same length")
+        shape = (len(self.ids), len(self.subnet_ids))
+        self.alpha_stakes = np.zeros(shape) if alpha_stakes is None else np.array(alpha_stakes, dtype=np.float64)
+        if self.alpha_stakes.shape != shape:
+            raise ValueError(f"Account store stakes must have shape {shape}, got {self.alpha_stakes.shape}")
+
+        if (registered_indptr is None) != (registered_indices is None):
+            raise ValueError("registered_indptr and registered_indices must be given together")
+        self.registered_indptr = None if registered_indptr is None else np.asarray(registered_indptr, dtype=np.int64)
+        self.registered_indices = None if registered_indices is None else np.asarray(registered_indices, dtype=np.int32)
+
+        self.index = {account_id: i for i, account_id in enumerate(self.ids.tolist())}
+        self.subnet_index = {subnet_id: j for j, subnet_id in enumerate(self.subnet_ids.tolist())}
+        if len(self.index) != len(self.ids):
+            raise ValueError("Account ids in a store must be unique")
+
+    @classmethod
+    def from_accounts(cls, accounts: List[Account], subnet_ids: Optional[Sequence[int]] = None) -> 'AccountStore':
+        if subnet_ids is None:
+            subnet_ids = sorted({s for account in accounts for s in (*account.alpha_stakes, *account.registered_subnets)})
+        store = cls([a.id for a in accounts], [a.free_balance for a in accounts], subnet_ids)
+        for i, account in enumerate(accounts):
+            for subnet_id, stake in account.alpha_stakes.items():
+                store.alpha_stakes[i, store.subnet_index[subnet_id]] = stake
+        store.registered_indptr = np.cumsum([0] + [len(a.registered_subnets) for a in accounts], dtype=np.int64)
+        store.registered_indices = np.array([s for a in accounts for s in a.registered_subnets], dtype=np.int32)
+        return store
+
+    def to_accounts(self) -> List[Account]:
+        return [
+            Account(id=view.id, free_balance=view.free_balance,
+                    registered_subnets=view.registered_subnets, alpha_stakes=dict(view.alpha_stakes))
+            for view in self.values()
+        ]
+
+    def save(self, path: str):
+        arrays = {'ids': self.ids, 'free_balance': self.free_balance, 'subnet_ids': self.subnet_ids,
+                  'alpha_stakes': self.alpha_stakes}
+        if self.registered_indptr is not None:
+            arrays.update(registered_indptr=self.registered_indptr, registered_indices=self.registered_indices)
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> 'AccountStore':
+        with np.load(path) as data:
+            return cls(data['ids'], data['free_balance'], data['subnet_ids'], data['alpha_stakes'],
+                       data['registered_indptr'] if 'registered_indptr' in data else None,
+                       data['registered_indices'] if 'registered_indices' in data else None)
+
+    def registered_subnets_of(self, row: int) -> List[int]:
+        if self.registered_indptr is None:
+            return self.subnet_ids.tolist()
+        return self.registered_indices[self.registered_indptr[row]:self.registered_indptr[row + 1]].tolist()
+
+    def stake_matrix(self, subnet_ids: Sequence[int]) -> np.ndarray:
+        # Copy of the stakes with columns in the given subnet order; subnets the
+        # store has no column for are zero.
+        stakes = np.zeros((len(self.ids), len(subnet_ids)))
+        for j, subnet_id in enumerate(subnet_ids):
+            if subnet_id in self.subnet_index:
+                stakes[:, j] = self.alpha_stakes[:, self.subnet_index[subnet_id]]
+        return stakes
+
+    def set_stake_matrix(self, subnet_ids: Sequence[int], stakes: np.ndarray):
+        missing = [subnet_id for subnet_id in subnet_ids if subnet_id not in self.subnet_index]
+        if missing:
+            raise ValueError(f"Subnets {missing} are not columns of this account store")
+        for j, subnet_id in enumerate(subnet_ids):
+            self.alpha_stakes[:, self.subnet_index[subnet_id]] = stakes[:, j]
+
+    def add_subnets(self, subnet_ids: Sequence[int]):
+        # Appends a zero stake column for each subnet the store has none for, so
+        # a simulation can stake on every one of its subnets. Registrations
+        # stay as they were: defaulted ones are first pinned to the old columns.
+        missing = [subnet_id for subnet_id in dict.fromkeys(subnet_ids) if subnet_id not in self.subnet_index]
+        if not missing:
+            return
+        if self.registered_indptr is None:
+            self.registered_indptr = np.arange(len(self.ids) + 1, dtype=np.int64) * len(self.subnet_ids)
+            self.registered_indices = np.tile(self.subnet_ids.astype(np.int32), len(self.ids))
+        self.alpha_stakes = np.hstack((self.alpha_stakes, np.zeros((len(self.ids), len(missing)))))
+        self.subnet_ids = np.concatenate((self.subnet_ids, np.asarray(missing, dtype=np.int64)))
+        self.subnet_index = {subnet_id: j for j, subnet_id in enumerate(self.subnet_ids.tolist())}
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [self.ids, self.free_balance, self.subnet_ids, self.alpha_stakes]
+        if self.registered_indptr is not None:
+            arrays += [self.registered_indptr, self.registered_indices]
+        return sum(array.nbytes for array in arrays)
+
+    def __getitem__(self, account_id: int) -> AccountView:
+        return AccountView(self, self.index[account_id])
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.index)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, account_id: object) -> bool:
+        return account_id in self.index
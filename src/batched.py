@@ -0,0 +1,488 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from .sinks import Sink, JSONLinesSink, new_run_id
+from .trades import TradeBook, BUY, SELL, AMOUNT_ALL, AMOUNT_PERCENT, trade_row
+from .schedules import Periodic, split_trades
+from .accounts import AccountStore
+
+UNSUPPORTED_KEYS = ('log_policy', 'checkpoint_interval', 'profile')
+
+
+class ScenarioView:
+    # What trade schedules and summaries see of one scenario in a batch.
+    def __init__(self, batch: 'BatchedSubtensor', b: int):
+        self.batch = batch
+        self.b = b
+        self.subnets = {s.id: s for s in batch.scenarios[b][0]}
+        self.accounts = {a.id: a for a in batch.scenarios[b][1]}
+
+    @property
+    def tao_supply(self) -> float:
+        return float(self.batch.tao_supply[self.b])
+
+    def free_balance_of(self, account_id: int) -> float:
+        return float(self.batch.free_balance[self.b, self.batch.account_index[self.b][account_id]])
+
+    def alpha_stake_of(self, account_id: int, subnet_id: int) -> float:
+        b = self.b
+        return float(self.batch.alpha_stakes[b, self.batch.account_index[b][account_id],
+                                             self.batch.subnet_index[b][subnet_id]])
+
+    # Prices and market values are worked out for this scenario only, so a
+    # schedule querying every scenario of a batch does not touch the others.
+    def alpha_price_of(self, subnet_id: int) -> float:
+        batch, b = self.batch, self.b
+        j = batch.subnet_index[b][subnet_id]
+        if batch.is_root[b, j] or batch.alpha_in[b, j] == 0:
+            return 1.0
+        return float(batch.tao_in[b, j] / batch.alpha_in[b, j])
+
+    def market_value_of(self, account_id: int) -> float:
+        batch, b = self.batch, self.b
+        i = batch.account_index[b][account_id]
+        value = float(batch.free_balance[b, i])
+        for j in np.flatnonzero(batch.alpha_stakes[b, i] > 0).tolist():
+            stake = batch.alpha_stakes[b, i, j]
+            if batch.is_root[b, j]:
+                value += stake
+            else:
+                value += batch.tao_in[b, j] - batch.k[b, j] / (batch.alpha_in[b, j] + stake)
+        return float(value)
+
+
+class BatchedSubtensor:
+    # Runs independent scenarios side by side. Pool state is (scenario, subnet)
+    # and stakes are (scenario, account, subnet), padded to the largest
+    # scenario; padded subnets and accounts are masked out of every step.
+    def __init__(self, configs: List[Dict[str, Any]], sink: Optional[Sink] = None):
+        if not configs:
+            raise ValueError("BatchedSubtensor needs at least one config")
+        for key in ('blocks', 'n_steps'):
+            if len({config[key] for config in configs}) != 1:
+                raise ValueError(f"All batched configs must share the same '{key}'")
+        # Every block is stepped and logged at a fixed interval, with no
+        # checkpoints or profiling; configs asking for more are rejected rather
+        # than run without it.
+        for config in configs:
+            if config.get('mode', 'block') != 'block':
+                raise ValueError(f"BatchedSubtensor only runs in block mode, got mode '{config['mode']}'")
+            for key in UNSUPPORTED_KEYS:
+                if config.get(key):
+                    raise ValueError(f"BatchedSubtensor does not support '{key}'")
+
+        self.blocks = configs[0]['blocks']
+        self.log_interval = max(self.blocks // configs[0]['n_steps'], 1)
+        self.sink = sink if sink is not None else JSONLinesSink(os.path.join('data', new_run_id()))
+        self.output_dir = self.sink.directory
+        for config in configs:
+            if isinstance(config['accounts'], AccountStore):
+                config['accounts'].add_subnets([s.id for s in config['subnets']])
+        self.scenarios = [
+            (config['subnets'], list(config['accounts'].values())
+             if isinstance(config['accounts'], AccountStore) else config['accounts'])
+            for config in configs
+        ]
+
+        B = len(configs)
+        S = max(len(subnets) for subnets, _ in self.scenarios)
+        A = max(len(accounts) for _, accounts in self.scenarios)
+        self.tao_supply = np.array([c['tao_supply'] for c in configs], dtype=np.float64)
+        self.global_split = np.array([c['global_split'] for c in configs], dtype=np.float64)
+        self.balanced = np.array([c['balanced'] for c in configs], dtype=bool)
+        self.root_weight = np.array([c['root_weight'] for c in configs], dtype=np.float64)
+
+        self.subnet_ids = np.full((B, S), -1, dtype=np.int64)
+        self.active = np.zeros((B, S), dtype=bool)
+        self.is_root = np.zeros((B, S), dtype=bool)
+        self.tao_in = np.zeros((B, S))
+        self.alpha_in = np.zeros((B, S))
+        self.alpha_out = np.zeros((B, S))
+        self.k = np.zeros((B, S))
+        self.account_ids = np.full((B, A), -1, dtype=np.int64)
+        self.valid_accounts = np.zeros((B, A), dtype=bool)
+        self.free_balance = np.zeros((B, A))
+        self.alpha_stakes = np.zeros((B, A, S))
+        self.subnet_index = []
+        self.account_index = []
+
+        for b, (subnets, accounts) in enumerate(self.scenarios):
+            self.subnet_index.append({s.id: j for j, s in enumerate(subnets)})
+            self.account_index.append({a.id: i for i, a in enumerate(accounts)})
+            for j, subnet in enumerate(subnets):
+                self.subnet_ids[b, j] = subnet.id
+                self.active[b, j] = True
+                self.is_root[b, j] = subnet.is_root
+                self.tao_in[b, j] = subnet.tao_in
+                self.alpha_in[b, j] = subnet.alpha_in
+                self.alpha_out[b, j] = subnet.alpha_out
+                self.k[b, j] = subnet.k
+            for i, account in enumerate(accounts):
+                self.account_ids[b, i] = account.id
+                self.valid_accounts[b, i] = True
+                self.free_balance[b, i] = account.free_balance
+                for subnet_id, stake in account.alpha_stakes.items():
+                    if subnet_id in self.subnet_index[b]:
+                        self.alpha_stakes[b, i, self.subnet_index[b][subnet_id]] = stake
+        self.non_root = self.active & ~self.is_root
+
+        self._load_trades(configs)
+        self.views = [ScenarioView(self, b) for b in range(B)]
+
+    def _load_trades(self, configs: List[Dict[str, Any]]):
+        # All scenarios' trade books are merged into one book sorted by
+        # (block, scenario), with each trade's account and subnet resolved to
+        # array indices (-1 when the scenario does not have them).
+        self.schedules = []
+        self.actions = ['buy', 'sell']
+        columns = {name: [] for name in ('block', 'scenario', 'account_id', 'subnet_id', 'account',
+                                         'subnet', 'action', 'amount_kind', 'amount_value')}
+        rules = []
+        for b, config in enumerate(configs):
+            book, schedules = split_trades(config['trades'])
+            for position, schedule in enumerate(schedules):
+                # Plain Periodic rules are checked for every scenario at once;
+                # other schedules are asked one by one.
+                if type(schedule) is Periodic:
+                    rules.append((b, position, schedule))
+                else:
+                    self.schedules.append((b, position, schedule))
+            codes = np.array([self._action_code(action) for action in book.actions], dtype=np.int8)
+            columns['block'].append(book.block)
+            columns['scenario'].append(np.full(len(book), b, dtype=np.int32))
+            columns['account_id'].append(book.account_id)
+            columns['subnet_id'].append(book.subnet_id)
+            columns['account'].append(self._resolve(self.account_index[b], book.account_id))
+            columns['subnet'].append(self._resolve(self.subnet_index[b], book.subnet_id))
+            columns['action'].append(codes[book.action])
+            columns['amount_kind'].append(book.amount_kind)
+            columns['amount_value'].append(book.amount_value)
+        columns = {name: np.concatenate(values) for name, values in columns.items()}
+
+        order = np.lexsort((columns['scenario'], columns['block']))
+        columns = {name: values[order] for name, values in columns.items()}
+        self.trades = TradeBook(columns['block'], columns['account_id'], columns['subnet_id'],
+                                columns['action'], columns['amount_kind'], columns['amount_value'],
+                                self.actions)
+        self.trade_scenario = columns['scenario']
+        self.trade_account = columns['account']
+        self.trade_subnet = columns['subnet']
+        self._load_rules(rules)
+
+    def _load_rules(self, rules: List[Tuple[int, int, Periodic]]):
+        rows = [(b, position, *trade_row(rule), rule) for b, position, rule in rules]
+        self.rules = {
+            'scenario': np.array([row[0] for row in rows], dtype=np.int64),
+            'position': np.array([row[1] for row in rows], dtype=np.int64),
+            'account': np.array([self.account_index[row[0]].get(row[2], -1) for row in rows], dtype=np.int64),
+            'subnet': np.array([self.subnet_index[row[0]].get(row[3], -1) for row in rows], dtype=np.int64),
+            'action': np.array([row[4] for row in rows], dtype=np.int8),
+            'kind': np.array([row[5] for row in rows], dtype=np.int8),
+            'value': np.array([row[6] for row in rows], dtype=np.float64),
+            'start': np.array([row[7].start for row in rows], dtype=np.int64),
+            'every': np.array([row[7].every for row in rows], dtype=np.int64),
+            'stop': np.array([self.blocks if row[7].stop is None else row[7].stop for row in rows], dtype=np.int64),
+        }
+        self.rule_trades = {
+            'account_id': np.array([row[2] for row in rows], dtype=np.int64),
+            'subnet_id': np.array([row[3] for row in rows], dtype=np.int64),
+            'action': np.array([row[7].action for row in rows], dtype=object),
+            'amount': np.array([row[7].amount for row in rows], dtype=object),
+        }
+
+    def _action_code(self, action: str) -> int:
+        if action not in self.actions:
+            self.actions.append(action)
+        return self.actions.index(action)
+
+    def _resolve(self, index: Dict[int, int], ids: np.ndarray) -> np.ndarray:
+        unique, inverse = np.unique(ids, return_inverse=True)
+        return np.array([index.get(i, -1) for i in unique.tolist()], dtype=np.int64)[inverse]
+
+    def run_simulation(self):
+        for block in range(self.blocks):
+            self._execute_block_trades(block)
+            self._process_block_step()
+
+            if block % self.log_interval == 0 or block == self.blocks - 1:
+                self._log_state(block)
+
+        self.sink.close()
+        self._sync_models()
+
+    def scenario(self, b: int) -> ScenarioView:
+        return self.views[b]
+
+    def _execute_block_trades(self, block: int):
+        start, stop = self.trades.range(block)
+        scenario = [self.trade_scenario[start:stop]]
+        position = [np.full(stop - start, -1, dtype=np.int64)]
+        account = [self.trade_account[start:stop]]
+        subnet = [self.trade_subnet[start:stop]]
+        action = [self.trades.action[start:stop]]
+        kind = [self.trades.amount_kind[start:stop]]
+        value = [self.trades.amount_value[start:stop]]
+        if stop > start:
+            self.sink.write_columns("trades", {"scenario": scenario[0], **self.trades.columns(start, stop)})
+
+        rules = self.rules
+        due = np.flatnonzero((block >= rules['start']) & (block < rules['stop']) &
+                             ((block - rules['start']) % rules['every'] == 0))
+        if len(due):
+            for column, values in zip((scenario, position, account, subnet, action, kind, value),
+                                      (rules[key] for key in ('scenario', 'position', 'account', 'subnet',
+                                                              'action', 'kind', 'value'))):
+                column.append(values[due])
+            self.sink.write_columns("trades", {
+                "scenario": rules['scenario'][due],
+                "block": np.full(len(due), block),
+                **{key: values[due].tolist() for key, values in self.rule_trades.items()},
+            })
+
+        for b, schedule_position, schedule in self.schedules:
+            if schedule.next_block(block) != block:
+                continue
+            for trade in schedule.trades(block, self.scenario(b)):
+                _, _, code, amount_kind, amount_value = trade_row(trade)
+                scenario.append([b])
+                position.append([schedule_position])
+                account.append([self.account_index[b].get(trade.account_id, -1)])
+                subnet.append([self.subnet_index[b].get(trade.subnet_id, -1)])
+                action.append([code])
+                kind.append([amount_kind])
+                value.append([amount_value])
+                self.sink.write("trades", {
+                    "scenario": b,
+                    "block": block,
+                    "account_id": trade.account_id,
+                    "subnet_id": trade.subnet_id,
+                    "action": trade.action,
+                    "amount": trade.amount
+                })
+
+        if len(scenario) > 1 or stop > start:
+            # Within a scenario the book's trades run first, then the
+            # schedules' in the order they were given.
+            columns = [np.concatenate(column) for column in (scenario, position, account, subnet, action, kind, value)]
+            order = np.lexsort((columns[1], columns[0]))
+            self._execute_trades(*(column[order] for i, column in enumerate(columns) if i != 1))
+
+    def _execute_trades(self, scenario: np.ndarray, account: np.ndarray, subnet: np.ndarray,
+                        action: np.ndarray, kind: np.ndarray, value: np.ndarray):
+        # A scenario's trades in a block run in order, so they are applied in
+        # rounds: round r executes the r-th trade of every scenario at once.
+        keep = (account >= 0) & (subnet >= 0) & ((action == BUY) | (action == SELL))
+        order = np.argsort(scenario[keep], kind='stable')
+        scenario, account, subnet, action, kind, value = (
+            column[keep][order] for column in (scenario, account, subnet, action, kind, value))
+        if not len(scenario):
+            return
+
+        positions = np.arange(len(scenario))
+        group_start = np.maximum.accumulate(np.where(np.r_[True, scenario[1:] != scenario[:-1]], positions, 0))
+        rounds = positions - group_start
+        for r in range(rounds.max() + 1):
+            m = rounds == r
+            self._trade_round(scenario[m], account[m], subnet[m], action[m] == BUY, kind[m], value[m])
+
+    def _trade_round(self, b: np.ndarray, i: np.ndarray, j: np.ndarray, buy: np.ndarray,
+                     kind: np.ndarray, value: np.ndarray):
+        total = np.where(buy, self.free_balance[b, i], self.alpha_stakes[b, i, j])
+        amount = np.where(kind == AMOUNT_ALL, total, np.where(kind == AMOUNT_PERCENT, total * value / 100, value))
+        root = self.is_root[b, j]
+        tao_in, alpha_in, k = self.tao_in[b, j], self.alpha_in[b, j], self.k[b, j]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            staked_alpha_in = k / (tao_in + amount)
+            unstaked_tao_in = k / (alpha_in + amount)
+        alpha_bought = np.where(root, amount, alpha_in - staked_alpha_in)
+        tao_bought = np.where(root, amount, tao_in - unstaked_tao_in)
+
+        self.tao_in[b, j] = np.where(root, tao_in, np.where(buy, tao_in + amount, unstaked_tao_in))
+        self.alpha_in[b, j] = np.where(root, alpha_in, np.where(buy, staked_alpha_in, alpha_in + amount))
+        self.alpha_out[b, j] += np.where(buy, alpha_bought, -amount)
+        self.alpha_stakes[b, i, j] += np.where(buy, alpha_bought, -amount)
+        self.free_balance[b, i] += np.where(buy, -amount, tao_bought)
+
+    def _alpha_prices(self) -> np.ndarray:
+        prices = np.ones_like(self.tao_in)
+        np.divide(self.tao_in, self.alpha_in, out=prices, where=self.non_root & (self.alpha_in != 0))
+        return prices
+
+    def _emission_shares(self) -> np.ndarray:
+        emission = np.where(self.non_root, self.tao_in, 0.0)
+        total = emission.sum(axis=1, keepdims=True)
+        shares = np.zeros_like(emission)
+        np.divide(emission, total, out=shares, where=total != 0)
+        return shares
+
+    def _weight_factors(self) -> np.ndarray:
+        factors = np.zeros_like(self.tao_in)
+        np.divide(self.tao_in, self.alpha_out, out=factors, where=self.alpha_out != 0)
+        return np.where(self.is_root, self.root_weight[:, None], factors)
+
+    def _global_weights(self, factors: np.ndarray) -> np.ndarray:
+        return np.einsum('bas,bs->ba', self.alpha_stakes, factors)
+
+    def _market_values(self) -> np.ndarray:
+        held = self.alpha_stakes > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pool_value = self.tao_in[:, None, :] - self.k[:, None, :] / (
+                self.alpha_in[:, None, :] + np.where(held, self.alpha_stakes, 0.0))
+        stake_value = np.where(self.is_root[:, None, :], self.alpha_stakes, pool_value)
+        return self.free_balance + np.where(held, stake_value, 0.0).sum(axis=2)
+
+    def _inject(self, emission_val: float):
+        emit = self._emission_shares()
+        sum_prices = np.where(self.non_root, self._alpha_prices(), 0.0).sum(axis=1)
+        self._step_emission = emit
+        inject_tao = (sum_prices < 1.0) | ~self.balanced
+
+        self.tao_supply += np.where(inject_tao, emission_val, 0.0)
+        self.tao_in += np.where(inject_tao[:, None], emit * emission_val, 0.0)
+        self.alpha_in += np.where(~inject_tao[:, None] & self.non_root, emission_val, 0.0)
+        self.alpha_out += np.where(self.non_root, emission_val, 0.0)
+        self.k = np.where(self.non_root, self.tao_in * self.alpha_in, self.k)
+
+    def _process_block_step(self):
+        emission_val = 1
+        factors_before = self._weight_factors()
+        self._inject(emission_val)
+
+        factors_after = self._weight_factors()
+        weights = self._global_weights(factors_before)
+        total_global = weights.sum(axis=1)
+        chained = total_global != 0
+        # Dividend shares, scenarios x accounts x subnets, kept for logging.
+        dividends = np.zeros_like(self.alpha_stakes)
+        if chained.any():
+            dividends = np.where(chained[:, None, None],
+                                 self._chained_dividends(weights, total_global, factors_before, factors_after), 0.0)
+            self.alpha_stakes += dividends * emission_val
+        sequential = ~chained & self.alpha_stakes.any(axis=(1, 2))
+        if sequential.any():
+            self._sequential_dividends(sequential, factors_before, factors_after, emission_val, dividends)
+        self._step_dividends = dividends
+
+    def _chained_dividends(self, weights: np.ndarray, total_global: np.ndarray,
+                           factors_before: np.ndarray, factors_after: np.ndarray) -> np.ndarray:
+        # The same recurrence as VectorizedSubtensor._chained_dividends, run over
+        # all subnet columns with root and padded columns made neutral (zero
+        # factor change, zero payout, growth 1) instead of compacting them away.
+        g = self.global_split[:, None]
+        nr = self.non_root
+        stakes = np.where(nr[:, None, :], self.alpha_stakes, 0.0)
+        factors = np.where(nr, factors_after, 0.0)
+        delta = np.where(nr, factors_after - factors_before, 0.0)
+
+        local_weights = stakes * factors[:, None, :]
+        total_local = local_weights.sum(axis=1)
+        local_share = np.zeros_like(local_weights)
+        np.divide(local_weights, total_local[:, None, :], out=local_share, where=total_local[:, None, :] != 0)
+        local_paid = np.where(total_local != 0, 1 - g, 0.0)
+
+        weight_shift = stakes.sum(axis=1) * delta
+        weight_paid = factors * (g + local_paid)
+        totals = total_global[:, None] + np.cumsum(weight_shift + weight_paid, axis=1) - weight_paid
+        ratio = np.zeros_like(totals)
+        np.divide(g * factors, totals, out=ratio, where=totals != 0)
+        growth = 1 + ratio
+
+        carried_after = np.cumprod(growth, axis=1)
+        carried = np.concatenate((np.ones_like(growth[:, :1]), carried_after[:, :-1]), axis=1)
+        increments = stakes * (delta / carried)[:, None, :]
+        payouts = local_share * (factors * (1 - g) / carried_after)[:, None, :]
+        chained = carried[:, None, :] * (
+            weights[:, :, None] + np.cumsum(increments, axis=2) + np.cumsum(payouts, axis=2) - payouts)
+
+        inverse_totals = np.zeros_like(totals)
+        np.divide(1.0, totals, out=inverse_totals, where=totals != 0)
+        dividends = g[:, :, None] * chained * inverse_totals[:, None, :] + (1 - g[:, :, None]) * local_share
+        return np.where(nr[:, None, :], dividends, 0.0)
+
+    def _sequential_dividends(self, selected: np.ndarray, factors_before: np.ndarray,
+                              factors_after: np.ndarray, emission_val: float, out: np.ndarray):
+        g = self.global_split[:, None]
+        factors = factors_before.copy()
+        for j in range(factors.shape[1]):
+            column = selected & self.non_root[:, j]
+            if not column.any():
+                continue
+            factors[column, j] = factors_after[column, j]
+            weights = self._global_weights(factors)
+            total_global = weights.sum(axis=1, keepdims=True)
+            local_weights = self.alpha_stakes[:, :, j] * factors[:, j:j + 1]
+            total_local = local_weights.sum(axis=1, keepdims=True)
+            global_share = np.zeros_like(weights)
+            np.divide(weights, total_global, out=global_share, where=total_global != 0)
+            local_share = np.zeros_like(local_weights)
+            np.divide(local_weights, total_local, out=local_share, where=total_local != 0)
+            dividends = g * global_share + (1 - g) * local_share
+            out[column, :, j] = dividends[column]
+            self.alpha_stakes[column, :, j] += emission_val * dividends[column]
+
+    def _log_state(self, block: int):
+        b, i = np.nonzero(self.valid_accounts)
+        market_values = self._market_values()
+        self.sink.write_columns("accounts", {
+            "scenario": b,
+            "block": np.full(len(b), block),
+            "account_id": self.account_ids[b, i],
+            "free_balance": self.free_balance[b, i],
+            "market_value": market_values[b, i],
+        })
+
+        b, i, j = np.nonzero(self.alpha_stakes)
+        self.sink.write_columns("stakes", {
+            "scenario": b,
+            "block": np.full(len(b), block),
+            "account_id": self.account_ids[b, i],
+            "subnet_id": self.subnet_ids[b, j],
+            "alpha_stake": self.alpha_stakes[b, i, j],
+        })
+
+        prices = self._alpha_prices()
+        b, j = np.nonzero(self.active)
+        self.sink.write_columns("subnets", {
+            "scenario": b,
+            "block": np.full(len(b), block),
+            "subnet_id": self.subnet_ids[b, j],
+            "tao_in": self.tao_in[b, j],
+            "alpha_in": self.alpha_in[b, j],
+            "alpha_out": self.alpha_out[b, j],
+            "exchange_rate": prices[b, j],
+            "emission_rate": self._step_emission[b, j],
+        })
+
+        # Emission shares and dividends are the ones the block step just paid
+        # out, so logging recomputes neither.
+        dividends = self._step_dividends
+        b, j, i = np.nonzero(dividends.transpose(0, 2, 1))
+        self.sink.write_columns("dividends", {
+            "scenario": b,
+            "block": np.full(len(b), block),
+            "account_id": self.account_ids[b, i],
+            "subnet_id": self.subnet_ids[b, j],
+            "dividend": dividends[b, i, j],
+        })
+
+        self.sink.write_columns("subtensor", {
+            "scenario": np.arange(len(self.tao_supply)),
+            "block": np.full(len(self.tao_supply), block),
+            "tao_supply": self.tao_supply,
+            "sum_prices": np.where(self.non_root, prices, 0.0).sum(axis=1),
+        })
+
+    def _sync_models(self):
+        for b, (subnets, accounts) in enumerate(self.scenarios):
+            for j, subnet in enumerate(subnets):
+                subnet.tao_in = float(self.tao_in[b, j])
+                subnet.alpha_in = float(self.alpha_in[b, j])
+                subnet.alpha_out = float(self.alpha_out[b, j])
+                subnet.k = float(self.k[b, j])
+            for i, account in enumerate(accounts):
+                account.free_balance = float(self.free_balance[b, i])
+                account.alpha_stakes = {
+                    int(self.subnet_ids[b, j]): float(self.alpha_stakes[b, i, j])
+                    for j in np.flatnonzero(self.alpha_stakes[b, i])
+                }
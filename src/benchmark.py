@@ -0,0 +1,276 @@
+import argparse
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from .accounts import AccountStore
+from .models import Subnet, Trade
+from .schedules import Periodic
+from .simulation import create_subtensor
+from .sinks import new_run_id
+from .sweep import expand_grid, parse_value
+from .trades import TradeBook, BUY, SELL, AMOUNT_ABSOLUTE, AMOUNT_PERCENT, AMOUNT_ALL
+from .utils import read_json, write_json
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+SHAPES = ['simple', 'random', 'cabal']
+PHASES = ['trades', 'emission', 'weights', 'dividends', 'fast_forward', 'logging', 'write']
+SUITES = {
+    'quick': {
+        'shape': SHAPES,
+        'engine': ['dict', 'numpy'],
+        'mode': ['block'],
+        'subnets': [2, 8],
+        'accounts': [2, 500],
+        'density': [1.0],
+        'blocks': [500],
+    },
+    'full': {
+        'shape': SHAPES,
+        'engine': ['dict', 'numpy'],
+        'mode': ['block'],
+        'subnets': [2, 16, 64, 256],
+        'accounts': [2, 1000, 10000, 100000],
+        'density': [0.1, 1.0, 10.0],
+        'blocks': [1000, 10000],
+    },
+}
+# Populations above this size are passed to the engines as an AccountStore.
+STORE_THRESHOLD = 10000
+
+
+def case_id(case: Dict[str, Any]) -> str:
+    return (f"{case['shape']}-{case['engine']}-{case['mode']}-s{case['subnets']}-a{case['accounts']}"
+            f"-d{case['density']:g}-b{case['blocks']}")
+
+
+def build_config(shape: str, subnets: int, accounts: int, density: float, blocks: int,
+                 seed: int = 0) -> Dict[str, Any]:
+    # Synthetic scenarios shaped like simulations/simple.py, random.py and
+    # cabal_analysis.py, scaled to the given size. density is trades per block.
+    rng = np.random.default_rng(seed)
+    subnet_list = [
+        Subnet(id=0, tao_in=1000.0, alpha_in=1000.0, alpha_out=1000.0, is_root=True),
+        *[Subnet(id=i, tao_in=1000.0, alpha_in=1000.0, alpha_out=1000.0) for i in range(1, subnets)],
+    ]
+    ids = np.arange(1, accounts + 1)
+    free_balance = np.full(accounts, 100.0)
+    stakes = np.zeros((accounts, subnets))
+    n_trades = int(round(density * blocks))
+    account = rng.integers(0, accounts, n_trades)
+    trades: Any = None
+
+    if shape == 'simple':
+        # Every account starts staked on one subnet and later sells half or all of it.
+        stakes[np.arange(accounts), ids % subnets] = 100.0
+        trades = TradeBook(
+            block=rng.integers(1, blocks, n_trades),
+            account_id=ids[account],
+            subnet_id=ids[account] % subnets,
+            action=np.full(n_trades, SELL),
+            amount_kind=np.where(rng.random(n_trades) < 0.5, AMOUNT_PERCENT, AMOUNT_ALL),
+            amount_value=np.full(n_trades, 50.0)
+        )
+    elif shape == 'random':
+        # One opening buy per account at block 0, then random buys of a few tao
+        # and percentage sells on random subnets.
+        buy = rng.random(n_trades) < 0.6
+        trades = TradeBook(
+            block=np.concatenate((np.zeros(accounts, dtype=np.int64), rng.integers(1, blocks, n_trades))),
+            account_id=np.concatenate((ids, ids[account])),
+            subnet_id=rng.integers(0, subnets, accounts + n_trades),
+            action=np.concatenate((np.full(accounts, BUY), np.where(buy, BUY, SELL))),
+            amount_kind=np.concatenate((np.full(accounts, AMOUNT_ABSOLUTE),
+                                        np.where(buy, AMOUNT_ABSOLUTE, AMOUNT_PERCENT))),
+            amount_value=np.concatenate((rng.uniform(10.0, 50.0, accounts),
+                                         np.where(buy, rng.uniform(1.0, 10.0, n_trades),
+                                                  rng.uniform(10.0, 50.0, n_trades))))
+        )
+    elif shape == 'cabal':
+        # Two whales stake everything at block 0 and then rotate their stake
+        # between two subnets through Periodic rules; everyone else idles.
+        free_balance[:] = 10.0
+        free_balance[:2] = [350000.0, 650000.0][:accounts]
+        stakes[2:, 0] = 1.0
+        first, second = 1 % subnets, min(2, subnets - 1)
+        trades = [
+            Trade(block=0, account_id=1, subnet_id=first, action='buy', amount='all'),
+            Trade(block=0, account_id=2, subnet_id=second, action='buy', amount='all'),
+        ]
+        if density > 0 and accounts >= 2:
+            every = max(1, int(round(1 / density)))
+            trades += [
+                Periodic(account_id=1, subnet_id=second, action='sell', amount='all', every=every, start=1),
+                Periodic(account_id=2, subnet_id=first, action='sell', amount='all', every=every, start=1),
+                Periodic(account_id=1, subnet_id=first, action='buy', amount='all', every=every, start=1),
+                Periodic(account_id=2, subnet_id=second, action='buy', amount='all', every=every, start=1),
+            ]
+    else:
+        raise ValueError(f"Unknown benchmark shape '{shape}', expected one of {SHAPES}")
+
+    store = AccountStore(ids, free_balance, np.arange(subnets), stakes)
+    return {
+        "blocks": blocks,
+        "n_steps": 10,
+        "subnets": subnet_list,
+        "accounts": store if accounts > STORE_THRESHOLD else store.to_accounts(),
+        "trades": trades,
+        "tao_supply": 1000000.0,
+        "global_split": 0.5,
+        "balanced": True,
+        "root_weight": 0.5
+    }
+
+
+def peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_case(case: Dict[str, Any], directory: str, output_format: str) -> Dict[str, Any]:
+    # Runs in a fresh process, so peak RSS belongs to this case alone.
+    base_rss = peak_rss_mb()
+    config = build_config(case['shape'], case['subnets'], case['accounts'], case['density'], case['blocks'])
+    config.update(engine=case['engine'], mode=case['mode'], output_format=output_format, profile=True)
+    subtensor = create_subtensor(config, output_dir=directory)
+    timer = subtensor.profiler
+
+    start = time.perf_counter()
+    subtensor.run_simulation()
+    elapsed = time.perf_counter() - start
+    shutil.rmtree(directory, ignore_errors=True)
+
+    result = {
+        "case_id": case_id(case),
+        **case,
+        "status": "ok",
+        "elapsed": elapsed,
+        "blocks_per_sec": case['blocks'] / elapsed,
+        "peak_rss_mb": peak_rss_mb(),
+        "base_rss_mb": base_rss,
+    }
+    for phase in PHASES:
+        result[f"{phase}_seconds"] = timer.times.get(phase, 0.0)
+        result[f"{phase}_calls"] = timer.calls.get(phase, 0)
+    result["other_seconds"] = elapsed - sum(result[f"{phase}_seconds"] for phase in PHASES)
+    return result
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "created": datetime.now().isoformat(timespec='seconds'),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_benchmarks(cases: List[Dict[str, Any]], directory: str, output_format: str = 'jsonl',
+                   max_work: float = 2e9) -> pd.DataFrame:
+    # Cases run one at a time, each in a freshly spawned process. Cases whose
+    # accounts x subnets x blocks exceeds max_work are recorded as skipped.
+    # results.json is rewritten after every case, so an interrupted run keeps
+    # what it measured.
+    os.makedirs(directory, exist_ok=True)
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for done, case in enumerate(cases, 1):
+        cid = case_id(case)
+        if case['accounts'] * case['subnets'] * case['blocks'] > max_work:
+            results.append({"case_id": cid, **case, "status": "skipped"})
+            print(f"[{done}/{len(cases)}] {cid} skipped (over --max-work)")
+            continue
+        try:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                result = executor.submit(run_case, case, os.path.join(directory, 'output', cid),
+                                         output_format).result()
+            print(f"[{done}/{len(cases)}] {cid}: {result['blocks_per_sec']:.0f} blocks/s, "
+                  f"peak RSS {result['peak_rss_mb'] or float('nan'):.0f} MB")
+        except Exception as e:
+            result = {"case_id": cid, **case, "status": f"failed: {str(e)}"}
+            print(f"[{done}/{len(cases)}] {cid} failed: {str(e)}")
+        results.append(result)
+        write_json(os.path.join(directory, 'results.json'), {"environment": environment(), "results": results})
+
+    shutil.rmtree(os.path.join(directory, 'output'), ignore_errors=True)
+    df = pd.DataFrame(results)
+    df.to_csv(os.path.join(directory, 'results.csv'), index=False)
+    return df
+
+
+def load_results(path: str) -> pd.DataFrame:
+    if os.path.isdir(path):
+        path = os.path.join(path, 'results.json')
+    return pd.DataFrame(read_json(path)["results"])
+
+
+def compare(results: pd.DataFrame, baseline: pd.DataFrame, tolerance: float = 0.1) -> pd.DataFrame:
+    # A case regresses when its throughput drops, or its peak RSS grows, by
+    # more than tolerance relative to the baseline.
+    columns = ['case_id', 'blocks_per_sec', 'peak_rss_mb']
+    ok = results[results['status'] == 'ok'][columns]
+    base = baseline[baseline['status'] == 'ok'][columns]
+    merged = ok.merge(base, on='case_id', suffixes=('', '_baseline'))
+    merged['speedup'] = merged['blocks_per_sec'] / merged['blocks_per_sec_baseline']
+    merged['rss_ratio'] = merged['peak_rss_mb'] / merged['peak_rss_mb_baseline']
+    merged['regression'] = (merged['speedup'] < 1 - tolerance) | (merged['rss_ratio'] > 1 + tolerance)
+    return merged
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Benchmark the simulation engines over a matrix of scenario sizes')
+    parser.add_argument('--suite', choices=list(SUITES), default='quick', help='Base case matrix')
+    for axis in SUITES['quick']:
+        parser.add_argument(f'--{axis}', default=None, metavar='V1,V2', help=f'Override the {axis} axis')
+    parser.add_argument('--output-format', default='jsonl', help='Sink format the runs write')
+    parser.add_argument('--max-work', type=float, default=2e9,
+                        help='Skip cases with more than this many account x subnet x block cells')
+    parser.add_argument('--output-dir', default=os.path.join('data', 'benchmarks'), help='Parent directory for results')
+    parser.add_argument('--benchmark-id', default=None, help='Name of the results directory')
+    parser.add_argument('--baseline', default=None, help='results.json (or its directory) to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='Relative change counted as a regression')
+    args = parser.parse_args(argv)
+
+    grid = dict(SUITES[args.suite])
+    for axis in grid:
+        values = getattr(args, axis)
+        if values is not None:
+            grid[axis] = [parse_value(value.strip()) for value in values.split(',')]
+    grid['density'] = [float(density) for density in grid['density']]
+
+    directory = os.path.join(args.output_dir, args.benchmark_id or new_run_id())
+    results = run_benchmarks(expand_grid(grid), directory, args.output_format, args.max_work)
+    print(f"Results written to {os.path.join(directory, 'results.json')}")
+
+    if args.baseline:
+        comparison = compare(results, load_results(args.baseline), args.tolerance)
+        print(comparison.to_string(index=False))
+        if comparison['regression'].any():
+            print(f"{int(comparison['regression'].sum())} case(s) regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
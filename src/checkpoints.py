@@ -0,0 +1,38 @@
+import glob
+import gzip
+import os
+import pickle
+from typing import Any, Dict, Optional
+
+CHECKPOINT_VERSION = 1
+
+
+def checkpoint_path(directory: str, block: int) -> str:
+    return os.path.join(directory, f"block-{block:09d}.ckpt")
+
+
+def write_checkpoint(path: str, state: Dict[str, Any]):
+    # Written to a temporary file first so a crash mid-write never leaves a
+    # truncated checkpoint behind as the latest one.
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    try:
+        with gzip.open(tmp_path, 'wb', compresslevel=1) as f:
+            pickle.dump({"version": CHECKPOINT_VERSION, **state}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, AttributeError) as e:
+        os.remove(tmp_path)
+        raise ValueError(f"Simulation state cannot be checkpointed (trade schedules must be picklable): {str(e)}")
+    os.replace(tmp_path, path)
+
+
+def read_checkpoint(path: str) -> Dict[str, Any]:
+    with gzip.open(path, 'rb') as f:
+        state = pickle.load(f)
+    if state.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Checkpoint {path} has version {state.get('version')}, expected {CHECKPOINT_VERSION}")
+    return state
+
+
+def latest_checkpoint(directory: str) -> Optional[str]:
+    paths = sorted(glob.glob(os.path.join(directory, 'block-*.ckpt')))
+    return paths[-1] if paths else None
@@ -0,0 +1,263 @@
+import warnings
+from typing import Any, Dict, List, Optional, Union
+import numpy as np
+from .models import Subnet, Account
+from .accounts import AccountStore
+from .sinks import Sink
+from .log_policies import LogPolicy
+from .schedules import Periodic, TradeSchedule
+from .trades import TradeBook, BUY, SELL, AMOUNT_ALL, AMOUNT_PERCENT, trade_row
+from .vectorized import VectorizedSubtensor
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _jit(function):
+    return njit(cache=True)(function) if njit is not None else function
+
+
+# The kernels below repeat the arithmetic of Subnet.stake/unstake/inject and
+# VectorizedSubtensor._process_block_step as scalar loops over flat arrays.
+
+@_jit
+def _resolve_amount(kind, value, total):
+    if kind == AMOUNT_ALL:
+        return total
+    if kind == AMOUNT_PERCENT:
+        return total * value / 100
+    return value
+
+
+@_jit
+def _execute_trade(i, j, action, kind, value, is_root, tao_in, alpha_in, alpha_out, k,
+                   free_balance, alpha_stakes):
+    if action == BUY:
+        tao_amount = _resolve_amount(kind, value, free_balance[i])
+        if is_root[j]:
+            alpha_out[j] += tao_amount
+            alpha_bought = tao_amount
+        else:
+            new_tao_in = tao_in[j] + tao_amount
+            new_alpha_in = k[j] / new_tao_in
+            alpha_bought = alpha_in[j] - new_alpha_in
+            alpha_out[j] += alpha_bought
+            alpha_in[j] = new_alpha_in
+            tao_in[j] = new_tao_in
+        alpha_stakes[i, j] += alpha_bought
+        free_balance[i] -= tao_amount
+    elif action == SELL:
+        alpha_amount = _resolve_amount(kind, value, alpha_stakes[i, j])
+        if is_root[j]:
+            alpha_out[j] -= alpha_amount
+            tao_bought = alpha_amount
+        else:
+            new_alpha_in = alpha_in[j] + alpha_amount
+            new_tao_in = k[j] / new_alpha_in
+            tao_bought = tao_in[j] - new_tao_in
+            alpha_out[j] -= alpha_amount
+            alpha_in[j] = new_alpha_in
+            tao_in[j] = new_tao_in
+        free_balance[i] += tao_bought
+        alpha_stakes[i, j] -= alpha_amount
+
+
+@_jit
+def _weight_factors(is_root, tao_in, alpha_out, root_weight):
+    factors = np.zeros(len(tao_in))
+    for j in range(len(tao_in)):
+        if is_root[j]:
+            factors[j] = root_weight
+        elif alpha_out[j] != 0:
+            factors[j] = tao_in[j] / alpha_out[j]
+    return factors
+
+
+@_jit
+def _block_step(is_root, tao_in, alpha_in, alpha_out, k, alpha_stakes, root_weight, global_split,
+                balanced, tao_supply):
+    n_accounts, n_subnets = alpha_stakes.shape
+    factors_before = _weight_factors(is_root, tao_in, alpha_out, root_weight)
+
+    total_tao = 0.0
+    sum_prices = 0.0
+    paying = 0
+    for j in range(n_subnets):
+        if not is_root[j]:
+            paying += 1
+            total_tao += tao_in[j]
+            sum_prices += tao_in[j] / alpha_in[j] if alpha_in[j] != 0 else 1.0
+    inject_tao = sum_prices < 1.0 or not balanced
+    if inject_tao:
+        tao_supply += 1.0
+    for j in range(n_subnets):
+        if is_root[j]:
+            continue
+        if inject_tao:
+            tao_in[j] += tao_in[j] / total_tao if total_tao else 0.0
+        else:
+            alpha_in[j] += 1.0
+        alpha_out[j] += 1.0
+        k[j] = tao_in[j] * alpha_in[j]
+    if not paying:
+        return tao_supply
+
+    # Subnets pay out in order; each payout and each subnet's switch to its
+    # post-injection factor updates the global weights the next subnet sees.
+    factors_after = _weight_factors(is_root, tao_in, alpha_out, root_weight)
+    weights = np.zeros(n_accounts)
+    for i in range(n_accounts):
+        for j in range(n_subnets):
+            weights[i] += alpha_stakes[i, j] * factors_before[j]
+    g = global_split
+    for j in range(n_subnets):
+        if is_root[j]:
+            continue
+        delta = factors_after[j] - factors_before[j]
+        total_global = 0.0
+        total_local = 0.0
+        for i in range(n_accounts):
+            weights[i] += alpha_stakes[i, j] * delta
+            total_global += weights[i]
+            total_local += alpha_stakes[i, j] * factors_after[j]
+        for i in range(n_accounts):
+            dividend = g * weights[i] / total_global if total_global else 0.0
+            if total_local:
+                dividend += (1 - g) * alpha_stakes[i, j] * factors_after[j] / total_local
+            alpha_stakes[i, j] += dividend
+            weights[i] += dividend * factors_after[j]
+    return tao_supply
+
+
+@_jit
+def _run_blocks(block, n_blocks, trade_block, trade_account, trade_subnet, trade_action, trade_kind,
+                trade_value, is_root, tao_in, alpha_in, alpha_out, k, free_balance, alpha_stakes,
+                root_weight, global_split, balanced, tao_supply):
+    # Plays trade rows (account and subnet given as array indices, -1 when
+    # unknown) and then one block step for each of n_blocks blocks.
+    row = 0
+    for current in range(block, block + n_blocks):
+        while row < len(trade_block) and trade_block[row] == current:
+            i = trade_account[row]
+            j = trade_subnet[row]
+            if i >= 0 and j >= 0:
+                _execute_trade(i, j, trade_action[row], trade_kind[row], trade_value[row], is_root,
+                               tao_in, alpha_in, alpha_out, k, free_balance, alpha_stakes)
+            row += 1
+        tao_supply = _block_step(is_root, tao_in, alpha_in, alpha_out, k, alpha_stakes, root_weight,
+                                 global_split, balanced, tao_supply)
+    return tao_supply
+
+
+def _positions(index: Dict[int, int], ids: np.ndarray) -> np.ndarray:
+    return np.array([index.get(key, -1) for key in ids.tolist()], dtype=np.int64)
+
+
+class CompiledSubtensor(VectorizedSubtensor):
+    # Same state layout as the numpy engine, but every stretch of blocks between
+    # log, checkpoint and schedule blocks, trade-book rows and Periodic rules
+    # included, runs in one numba kernel call. Without numba it is the numpy
+    # engine.
+    PROFILE_PHASES = {
+        **VectorizedSubtensor.PROFILE_PHASES,
+        '_advance': 'kernel',
+    }
+    batches_trades = njit is not None
+
+    def __init__(self, subnets: List[Subnet], accounts: Union[List[Account], AccountStore],
+                 trades: Union[TradeBook, List[Any]], tao_supply: float, global_split: float,
+                 balanced: bool, root_weight: float, blocks: int,
+                 n_steps: int, mode: str = 'block', sink: Optional[Sink] = None,
+                 checkpoint_interval: Optional[int] = None, profile: bool = False,
+                 progress_interval: Optional[float] = None,
+                 log_policy: Union[LogPolicy, Dict[str, LogPolicy], None] = None):
+        super().__init__(subnets, accounts, trades, tao_supply, global_split,
+                         balanced, root_weight, blocks, n_steps, mode, sink, checkpoint_interval,
+                         profile, progress_interval, log_policy)
+        self.trade_accounts = _positions(self.account_index, self.trades.account_id)
+        self.trade_subnets = _positions(self.subnet_index, self.trades.subnet_id)
+        every_block = [type(schedule).__name__ for schedule in self._event_schedules()
+                       if type(schedule).next_block is TradeSchedule.next_block]
+        if self.batches_trades and every_block:
+            warnings.warn(f"Schedules {every_block} may trade on any block, so the compiled engine "
+                          f"steps every block one by one; use a TradeBook or Periodic rules to batch them")
+
+    def _event_schedules(self) -> List[TradeSchedule]:
+        if not self.batches_trades:
+            return self.schedules
+        return [schedule for schedule in self.schedules if not _expands(schedule)]
+
+    def _advance(self, block: int, n_blocks: int):
+        if not self.batches_trades:
+            super()._advance(block, n_blocks)
+            return
+
+        start, stop = np.searchsorted(self.trades.block, [block, block + n_blocks])
+        rows = slice(start, stop)
+        trades = {
+            'block': self.trades.block[rows], 'account': self.trade_accounts[rows],
+            'subnet': self.trade_subnets[rows], 'action': self.trades.action[rows],
+            'kind': self.trades.amount_kind[rows], 'value': self.trades.amount_value[rows],
+        }
+        logged = self.trades.columns(start, stop)
+        periodic = self._periodic_rows(block, block + n_blocks)
+        if periodic is not None:
+            # Within a block the book's rows run first, then the rules in the
+            # order given, as on the per-block path; the stable sort keeps that.
+            extra, extra_logged = periodic
+            order = np.argsort(np.concatenate((trades['block'], extra['block'])), kind='stable')
+            trades = {key: np.concatenate((trades[key], extra[key]))[order] for key in trades}
+            logged = {key: np.concatenate((np.asarray(logged[key]), np.asarray(extra_logged[key])))[order]
+                      if stop > start else np.asarray(extra_logged[key])[order] for key in logged}
+
+        self.tao_supply = _run_blocks(
+            block, n_blocks, trades['block'], trades['account'], trades['subnet'],
+            trades['action'], trades['kind'], trades['value'],
+            self.is_root, self.tao_in, self.alpha_in, self.alpha_out, self.k, self.free_balance,
+            self.alpha_stakes, float(self.root_weight), float(self.global_split), bool(self.balanced),
+            float(self.tao_supply)
+        )
+        if len(trades['block']):
+            self.sink.write_columns("trades", logged)
+
+    def _periodic_rows(self, start: int, stop: int):
+        # Kernel rows, and trades-table columns, of the Periodic rules' trades
+        # in blocks [start, stop); None when there are none.
+        parts = []
+        for schedule in self.schedules:
+            if not _expands(schedule):
+                continue
+            first = schedule.next_block(start)
+            if first is None or first >= stop:
+                continue
+            blocks = np.arange(first, stop if schedule.stop is None else min(stop, schedule.stop), schedule.every)
+            parts.append((schedule, blocks))
+        if not parts:
+            return None
+
+        rows = {key: [] for key in ('block', 'account', 'subnet', 'action', 'kind', 'value')}
+        logged = {key: [] for key in ('block', 'account_id', 'subnet_id', 'action', 'amount')}
+        for schedule, blocks in parts:
+            account_id, subnet_id, action, kind, value = trade_row(schedule)
+            n = len(blocks)
+            rows['block'].append(blocks.astype(np.int32))
+            rows['account'].append(np.full(n, self.account_index.get(account_id, -1), dtype=np.int64))
+            rows['subnet'].append(np.full(n, self.subnet_index.get(subnet_id, -1), dtype=np.int64))
+            rows['action'].append(np.full(n, action, dtype=np.int8))
+            rows['kind'].append(np.full(n, kind, dtype=np.int8))
+            rows['value'].append(np.full(n, value))
+            logged['block'].append(blocks)
+            logged['account_id'].append(np.full(n, account_id))
+            logged['subnet_id'].append(np.full(n, subnet_id))
+            logged['action'] += [schedule.action] * n
+            logged['amount'] += [schedule.amount] * n
+        logged.update({key: np.concatenate(logged[key]) for key in ('block', 'account_id', 'subnet_id')})
+        return {key: np.concatenate(parts) for key, parts in rows.items()}, logged
+
+
+def _expands(schedule: TradeSchedule) -> bool:
+    # Plain Periodic rules trade the same way on a fixed grid of blocks, so
+    # their trades can be laid out ahead of time; subclasses may not.
+    return type(schedule) is Periodic
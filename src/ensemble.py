@@ -0,0 +1,171 @@
+import argparse
+import importlib
+import inspect
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from .simulation import create_subtensor, run_plots
+from .sinks import make_sink, new_run_id, read_table
+from .sweep import apply_params, parse_value, summarize
+from .utils import write_json
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+BAND_METRICS = {
+    'market_value': ('accounts', 'account_id'),
+    'exchange_rate': ('subnets', 'subnet_id'),
+}
+
+
+def quantile_column(q: float) -> str:
+    return f"q{round(q * 100):02d}"
+
+
+def build_replicate(build_config: Callable[..., Dict[str, Any]], rng: np.random.Generator,
+                    overrides: Dict[str, Any]) -> Dict[str, Any]:
+    # Overrides named after build_config arguments (e.g. blocks) are passed to
+    # it so the random trades follow them; the rest are applied to its config.
+    accepted = inspect.signature(build_config).parameters
+    kwargs = {key: value for key, value in overrides.items() if key in accepted}
+    config = build_config(rng, **kwargs)
+    return apply_params(config, {key: value for key, value in overrides.items() if key not in kwargs})
+
+
+def run_replicate(build_config: Callable[..., Dict[str, Any]], overrides: Dict[str, Any],
+                  seed: np.random.SeedSequence, index: int, directory: str,
+                  keep_outputs: bool) -> Dict[str, Any]:
+    start = time.perf_counter()
+    config = build_replicate(build_config, np.random.default_rng(seed), overrides)
+    output_dir = os.path.join(directory, f"replicate-{index:05d}")
+    shutil.rmtree(output_dir, ignore_errors=True)
+    subtensor = create_subtensor(config, output_dir=output_dir)
+    subtensor.run_simulation()
+
+    series = {}
+    for metric, (table, id_column) in BAND_METRICS.items():
+        df = read_table(output_dir, table)
+        series[metric] = df.pivot(index='block', columns=id_column, values=metric)
+    if not keep_outputs:
+        shutil.rmtree(output_dir)
+
+    return {
+        "summary": {
+            "replicate": index,
+            **summarize(subtensor),
+            "elapsed": time.perf_counter() - start,
+        },
+        "series": series,
+    }
+
+
+class QuantileBands:
+    # Holds only the logged market values and exchange rates of each replicate
+    # (replicates x log blocks x ids), never the full output tables.
+    def __init__(self, n_replicates: int, quantiles: Sequence[float] = QUANTILES):
+        self.n_replicates = n_replicates
+        self.quantiles = list(quantiles)
+        self.blocks = None
+        self.ids = {}
+        self.values = {}
+        self.filled = np.zeros(n_replicates, dtype=bool)
+
+    def add(self, index: int, series: Dict[str, pd.DataFrame]):
+        for metric, df in series.items():
+            if metric not in self.values:
+                self.blocks = df.index.to_numpy()
+                self.ids[metric] = df.columns.to_numpy()
+                self.values[metric] = np.full((self.n_replicates, *df.shape), np.nan)
+            self.values[metric][index] = df.reindex(index=self.blocks, columns=self.ids[metric]).to_numpy()
+        self.filled[index] = True
+
+    def columns(self, metric: str) -> Dict[str, Any]:
+        values = self.values[metric][self.filled]
+        n_blocks, n_ids = values.shape[1:]
+        quantiles = np.nanquantile(values, self.quantiles, axis=0)
+        columns = {
+            "block": np.repeat(self.blocks, n_ids),
+            "metric": [metric] * (n_blocks * n_ids),
+            "id": np.tile(self.ids[metric], n_blocks),
+            "mean": np.nanmean(values, axis=0).ravel(),
+        }
+        for q, band in zip(self.quantiles, quantiles):
+            columns[quantile_column(q)] = band.ravel()
+        return columns
+
+
+def run_ensemble(build_config: Callable[..., Dict[str, Any]], n_replicates: int, directory: str,
+                 seed: Optional[int] = None, overrides: Optional[Dict[str, Any]] = None,
+                 max_workers: Optional[int] = None, output_format: str = 'jsonl',
+                 quantiles: Sequence[float] = QUANTILES, keep_outputs: bool = False) -> pd.DataFrame:
+    # Replicate i draws its trades from a Generator seeded with the i-th child
+    # of SeedSequence(seed), so every replicate can be reproduced on its own.
+    overrides = overrides or {}
+    seed_sequence = np.random.SeedSequence(seed)
+    children = seed_sequence.spawn(n_replicates)
+    sink = make_sink(output_format, directory)
+    write_json(os.path.join(directory, 'ensemble.json'), {
+        "replicates": n_replicates,
+        "entropy": str(seed_sequence.entropy),
+        "overrides": overrides,
+        "quantiles": list(quantiles),
+    })
+
+    bands = QuantileBands(n_replicates, quantiles)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(run_replicate, build_config, overrides, child, index, directory, keep_outputs): index
+            for index, child in enumerate(children)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            index = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"[{done}/{n_replicates}] replicate {index} failed: {str(e)}")
+                continue
+            bands.add(index, result["series"])
+            sink.write("replicates", result["summary"])
+            sink.flush()
+            print(f"[{done}/{n_replicates}] replicate {index} finished in {result['summary']['elapsed']:.1f}s")
+
+    for metric in bands.values:
+        sink.write_columns("bands", bands.columns(metric))
+    sink.close()
+    return read_table(directory, "bands")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Run seeded replicates of a randomized simulation')
+    parser.add_argument('simulation', help='Module with a build_config(rng) function, e.g. simulations.random')
+    parser.add_argument('--replicates', type=int, default=16, help='Number of replicates')
+    parser.add_argument('--seed', type=int, default=None, help='Root seed (default: fresh entropy, recorded in ensemble.json)')
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                        help='Config override; keys accepted by build_config are passed to it')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--output-dir', default=os.path.join('data', 'ensembles'), help='Parent directory for ensembles')
+    parser.add_argument('--ensemble-id', default=None, help='Name of the ensemble directory')
+    parser.add_argument('--keep-outputs', action='store_true', help='Keep every replicate\'s full output tables')
+    parser.add_argument('--plots', nargs='+', help='List of plot modules to run')
+    args = parser.parse_args(argv)
+
+    module = importlib.import_module(args.simulation)
+    overrides = {}
+    for item in args.set:
+        key, _, value = item.partition('=')
+        overrides[key.strip()] = parse_value(value.strip())
+
+    directory = os.path.join(args.output_dir, args.ensemble_id or new_run_id())
+    run_ensemble(module.build_config, args.replicates, directory, args.seed, overrides,
+                 args.workers, keep_outputs=args.keep_outputs)
+    print(f"Results written to {directory}")
+
+    if args.plots:
+        config = {**module.config, **overrides}
+        run_plots(directory, config["blocks"], config["n_steps"], args.plots)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+import argparse
+import time
+from typing import List, Optional, Tuple, Union
+import numpy as np
+from .models import Subnet, Account
+from .accounts import AccountStore
+from .trades import TradeBook, BUY, SELL, AMOUNT_ABSOLUTE, AMOUNT_PERCENT
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+# Mean number of accounts per round above which windows run as numpy rounds.
+ROUND_WIDTH = 32
+
+
+def _jit(function):
+    return njit(cache=True)(function) if njit is not None else function
+
+
+@_jit
+def _trade_events(events, draw_action, draw_amount, draw_pick, valid_indptr, valid_columns,
+                  free_balance, staked, n_subnets, action, column, value):
+    # One random-walk step per (block, account) event, in block order. The
+    # generator tracks its own view of each account (tao and alpha counted
+    # 1:1): below 1 tao of free balance it sells, otherwise it buys with
+    # probability 0.6. Buys are absolute amounts on a random registered subnet,
+    # sells are percentages of a random subnet it holds stake on. Returns the
+    # number of events that traded; their indices are written to events.
+    n = 0
+    for e in range(len(events)):
+        i = events[e]
+        n_valid = valid_indptr[i + 1] - valid_indptr[i]
+        n_held = 0
+        for v in range(valid_indptr[i], valid_indptr[i + 1]):
+            if staked[i * n_subnets + valid_columns[v]] > 0:
+                n_held += 1
+
+        if free_balance[i] < 1.0 and n_held > 0:
+            percentage = 0.3 + 0.4 * draw_amount[e]
+        elif draw_action[e] < 0.6 and free_balance[i] > 0:
+            if n_valid == 0:
+                continue
+            c = valid_columns[valid_indptr[i] + int(draw_pick[e] * n_valid)]
+            amount = free_balance[i] * (0.1 + 0.4 * draw_amount[e])
+            staked[i * n_subnets + c] += amount
+            free_balance[i] -= amount
+            events[n] = e
+            action[n] = BUY
+            column[n] = c
+            value[n] = amount
+            n += 1
+            continue
+        elif n_held > 0:
+            percentage = 0.1 + 0.4 * draw_amount[e]
+        else:
+            continue
+
+        pick = int(draw_pick[e] * n_held)
+        c = -1
+        for v in range(valid_indptr[i], valid_indptr[i + 1]):
+            if staked[i * n_subnets + valid_columns[v]] > 0:
+                c = valid_columns[v]
+                if pick == 0:
+                    break
+                pick -= 1
+        amount = staked[i * n_subnets + c] * percentage
+        staked[i * n_subnets + c] -= amount
+        free_balance[i] += amount
+        events[n] = e
+        action[n] = SELL
+        column[n] = c
+        value[n] = percentage * 100
+        n += 1
+    return n
+
+
+def _kernel_trades(events, draws, valid, free_balance, staked):
+    if njit is not None:
+        traded = events.copy()
+        action = np.empty(len(events), dtype=np.int8)
+        column = np.empty(len(events), dtype=np.int64)
+        value = np.empty(len(events), dtype=np.float64)
+        n = _trade_events(traded, *draws, np.concatenate(([0], np.cumsum(valid.sum(axis=1)))),
+                          np.nonzero(valid)[1], free_balance, staked.reshape(-1), valid.shape[1],
+                          action, column, value)
+        return traded[:n], action[:n], column[:n], value[:n]
+
+    # Plain Python runs the kernel much faster on lists than on arrays, so it
+    # gets list copies of the rows of the accounts in this window.
+    rows, local = np.unique(events, return_inverse=True)
+    valid = valid[rows]
+    state = [free_balance[rows].tolist(), staked[rows].reshape(-1).tolist()]
+    traded = local.tolist()
+    outputs = ([0] * len(events), [0] * len(events), [0.0] * len(events))
+    n = _trade_events(traded, *draws.tolist(), np.concatenate(([0], np.cumsum(valid.sum(axis=1)))).tolist(),
+                      np.nonzero(valid)[1].tolist(), *state, valid.shape[1], *outputs)
+    free_balance[rows] = state[0]
+    staked[rows] = np.reshape(state[1], valid.shape)
+    return (np.array(traded[:n], dtype=np.int64), np.array(outputs[0][:n], dtype=np.int8),
+            np.array(outputs[1][:n], dtype=np.int64), np.array(outputs[2][:n], dtype=np.float64))
+
+
+def _round_trades(events, draws, valid, free_balance, staked):
+    # The steps of _trade_events with numpy, for all accounts at once: round r
+    # runs the r-th event of every account in the window. Accounts only see
+    # their own events, so this gives the kernel's trades.
+    valid_indptr = np.concatenate(([0], np.cumsum(valid.sum(axis=1))))
+    valid_columns = np.nonzero(valid)[1]
+    n_valid = np.diff(valid_indptr)
+    by_account = np.argsort(events * len(events) + np.arange(len(events)))
+    counts = np.bincount(events)
+    rank = np.empty(len(events), dtype=np.int64)
+    rank[by_account] = np.arange(len(events)) - np.repeat(np.cumsum(counts) - counts, counts)
+    by_rank = np.argsort(rank)
+    outputs = []
+    for e in np.split(by_rank, np.cumsum(np.bincount(rank))[:-1]):
+        i = events[e]
+        draw_action, draw_amount, draw_pick = draws[:, e]
+        held = staked[i] > 0
+        n_held = held.sum(axis=1)
+        forced = (free_balance[i] < 1.0) & (n_held > 0)
+        wants_buy = ~forced & (draw_action < 0.6) & (free_balance[i] > 0)
+        buy = wants_buy & (n_valid[i] > 0)
+        sell = forced | (~wants_buy & (n_held > 0))
+
+        b = i[buy]
+        buy_column = valid_columns[valid_indptr[b] + (draw_pick[buy] * n_valid[b]).astype(np.int64)]
+        buy_amount = free_balance[b] * (0.1 + 0.4 * draw_amount[buy])
+        staked[b, buy_column] += buy_amount
+        free_balance[b] -= buy_amount
+
+        s = i[sell]
+        pick = (draw_pick[sell] * n_held[sell]).astype(np.int64)
+        sell_column = np.argmax(np.cumsum(held[sell], axis=1) > pick[:, None], axis=1)
+        percentage = np.where(forced[sell], 0.3, 0.1) + 0.4 * draw_amount[sell]
+        sell_amount = staked[s, sell_column] * percentage
+        staked[s, sell_column] -= sell_amount
+        free_balance[s] += sell_amount
+
+        outputs.append((np.concatenate((e[buy], e[sell])),
+                        np.concatenate((np.full(len(b), BUY, dtype=np.int8), np.full(len(s), SELL, dtype=np.int8))),
+                        np.concatenate((buy_column, sell_column)),
+                        np.concatenate((buy_amount, percentage * 100))))
+    if not outputs:
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int8), np.zeros(0, dtype=np.int64),
+                np.zeros(0))
+    traded, action, column, value = (np.concatenate(output) for output in zip(*outputs))
+    in_order = np.argsort(traded)
+    return traded[in_order], action[in_order], column[in_order], value[in_order]
+
+
+def _registrations(accounts: Union[List[Account], AccountStore]) -> Tuple[np.ndarray, ...]:
+    # ids, free balances and registrations in CSR form (indptr, subnet ids).
+    if isinstance(accounts, AccountStore):
+        if accounts.registered_indptr is None:
+            indptr = np.arange(len(accounts) + 1, dtype=np.int64) * len(accounts.subnet_ids)
+            return accounts.ids, accounts.free_balance, indptr, np.tile(accounts.subnet_ids, len(accounts))
+        return accounts.ids, accounts.free_balance, accounts.registered_indptr, accounts.registered_indices
+    ids = np.array([a.id for a in accounts], dtype=np.int64)
+    free_balance = np.array([a.free_balance for a in accounts], dtype=np.float64)
+    indptr = np.cumsum([0] + [len(a.registered_subnets) for a in accounts], dtype=np.int64)
+    indices = np.array([s for a in accounts for s in a.registered_subnets], dtype=np.int64)
+    return ids, free_balance, indptr, indices
+
+
+def random_trades(subnets: List[Subnet], accounts: Union[List[Account], AccountStore], blocks: int,
+                  rng: Optional[np.random.Generator] = None, batch_size: int = 1 << 20) -> TradeBook:
+    # Random trade history of simulations/random.py. Every account opens one to
+    # three stakes at block 0, then trades on every trading block (80-90% of
+    # all blocks) that is a multiple of its own random frequency. The random
+    # draws are made for about batch_size of these events at a time.
+    rng = rng if rng is not None else np.random.default_rng()
+    subnet_ids = np.array([subnet.id for subnet in subnets], dtype=np.int64)
+    ids, free_balance, indptr, indices = _registrations(accounts)
+    order = np.argsort(ids, kind='stable')
+    n_accounts, n_subnets = len(ids), len(subnet_ids)
+
+    # Registered subnets that exist, as a dense mask and per-account columns.
+    rows = np.repeat(np.arange(n_accounts), np.diff(indptr))
+    positions = np.searchsorted(np.sort(subnet_ids), indices)
+    known = positions < n_subnets
+    known[known] = np.sort(subnet_ids)[positions[known]] == indices[known]
+    valid = np.zeros((n_accounts, n_subnets), dtype=bool)
+    valid[rows[known], np.argsort(subnet_ids, kind='stable')[positions[known]]] = True
+    valid = valid[order]
+    n_valid = valid.sum(axis=1)
+
+    free_balance = free_balance[order].astype(np.float64)
+    staked = np.zeros((n_accounts, n_subnets))
+
+    # Opening stakes: each buys free * U(0.1, 0.5) of what is left.
+    opening = np.flatnonzero((free_balance > 0) & (n_valid > 0))
+    n_open = rng.integers(1, np.minimum(3, n_valid[opening]) + 1)
+    keys = np.where(valid[opening], rng.random((len(opening), n_subnets)), 2.0)
+    picks = np.argsort(keys, axis=1)[:, :3]
+    k = picks.shape[1]
+    percentages = rng.uniform(0.1, 0.5, (len(opening), k))
+    left = np.cumprod(np.hstack((np.ones((len(opening), 1)), 1 - percentages)), axis=1)
+    amounts = free_balance[opening, None] * left[:, :k] * percentages
+    opens = np.arange(k)[None, :] < n_open[:, None]
+    staked[opening[:, None].repeat(k, axis=1)[opens], picks[opens]] = amounts[opens]
+    free_balance[opening] *= left[np.arange(len(opening)), n_open]
+
+    columns = {
+        'block': [np.zeros(int(opens.sum()), dtype=np.int64)],
+        'account': [opening[:, None].repeat(k, axis=1)[opens]],
+        'action': [np.full(int(opens.sum()), BUY, dtype=np.int8)],
+        'column': [picks[opens]],
+        'value': [amounts[opens]],
+    }
+
+    candidates = np.arange(1, max(blocks - 1, 1))
+    target_blocks = min(int(blocks * rng.uniform(0.8, 0.9)), len(candidates))
+    trading_blocks = np.sort(rng.choice(candidates, target_blocks, replace=False))
+    frequencies = rng.integers(1, max(2, blocks // 20) + 1, n_accounts)[order]
+
+    # Each window of blocks holds about batch_size events: the multiples of
+    # each account's frequency in it that are trading blocks.
+    is_trading = np.zeros(max(blocks, 1), dtype=bool)
+    is_trading[trading_blocks] = True
+    window = max(1, int(batch_size / (1 / frequencies).sum())) if n_accounts else blocks
+    for start in range(1, blocks, window):
+        stop = min(start + window, blocks)
+        first = -(-start // frequencies)
+        counts = np.maximum((stop - 1) // frequencies - first + 1, 0)
+        events = np.repeat(np.arange(n_accounts), counts)
+        multiples = np.arange(len(events)) - np.repeat(np.cumsum(counts) - counts - first, counts)
+        event_blocks = multiples * frequencies[events]
+        trading = is_trading[event_blocks]
+        events, event_blocks = events[trading], event_blocks[trading]
+        by_block = np.argsort(event_blocks * n_accounts + events)
+        events, event_blocks = events[by_block], event_blocks[by_block]
+        # Drawn event by event, so the trades do not depend on batch_size.
+        draws = rng.random((len(events), 3)).T
+        # Without numba, windows where many accounts trade side by side run
+        # as numpy rounds; the per-event loop is quicker for a few busy ones.
+        if njit is None and len(events) >= ROUND_WIDTH * np.bincount(events).max(initial=0):
+            traded, action, column, value = _round_trades(events, draws, valid, free_balance, staked)
+        else:
+            traded, action, column, value = _kernel_trades(events, draws, valid, free_balance, staked)
+        columns['block'].append(event_blocks[traded])
+        columns['account'].append(events[traded])
+        columns['action'].append(action)
+        columns['column'].append(column)
+        columns['value'].append(value)
+
+    action = np.concatenate(columns['action'])
+    return TradeBook(
+        block=np.concatenate(columns['block']),
+        account_id=ids[order][np.concatenate(columns['account'])],
+        subnet_id=subnet_ids[np.concatenate(columns['column'])],
+        action=action,
+        amount_kind=np.where(action == BUY, AMOUNT_ABSOLUTE, AMOUNT_PERCENT),
+        amount_value=np.concatenate(columns['value'])
+    )
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Generate a random trade history like simulations/random.py')
+    parser.add_argument('--subnets', type=int, default=4, help='Subnets, the first one root')
+    parser.add_argument('--accounts', type=int, default=2, help='Accounts registered on every subnet')
+    parser.add_argument('--blocks', type=int, default=216000, help='Blocks to generate trades for')
+    parser.add_argument('--seed', type=int, default=None, help='Seed for a reproducible trade history')
+    parser.add_argument('--output', default=None, help='Save the trade book to this .npz file')
+    args = parser.parse_args(argv)
+
+    subnets = [
+        Subnet(id=0, tao_in=1000.0, alpha_in=1000.0, alpha_out=1000.0, is_root=True),
+        *[Subnet(id=i, tao_in=1000.0, alpha_in=1000.0, alpha_out=1000.0) for i in range(1, args.subnets)],
+    ]
+    accounts = AccountStore(np.arange(1, args.accounts + 1), np.full(args.accounts, 100.0),
+                            [subnet.id for subnet in subnets])
+    start = time.perf_counter()
+    book = random_trades(subnets, accounts, args.blocks, np.random.default_rng(args.seed))
+    elapsed = time.perf_counter() - start
+    print(f"Generated {len(book)} trades for {args.accounts} accounts over {args.blocks} blocks in "
+          f"{elapsed:.3f}s ({len(book) / elapsed / 1e6:.2f}M trades/s, {'numba' if njit else 'python'} kernel)")
+    if args.output:
+        book.save(args.output)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import importlib
+import threading
+from collections import deque
+from typing import Any, Dict, List, Tuple
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+from .plotting import decimate
+
+# Tables published to live plots by default; stakes and dividends are left out
+# since they are the large ones.
+LIVE_TABLES = ('subnets', 'accounts', 'subtensor')
+NON_INTERACTIVE_BACKENDS = {'agg', 'cairo', 'pdf', 'pgf', 'ps', 'svg', 'template'}
+
+
+class RingBuffer:
+    # Bounded hand-off from the simulation thread to a live plot. Appends never
+    # block; when the plot falls behind, the oldest entries are dropped.
+    def __init__(self, capacity: int = 100000):
+        self._items = deque(maxlen=capacity)
+        self.published = 0
+        self.consumed = 0
+
+    def put(self, table: str, data: Dict[str, Any]):
+        self._items.append((table, data))
+        self.published += 1
+
+    def drain(self) -> List[Tuple[str, Dict[str, Any]]]:
+        items = []
+        while True:
+            try:
+                items.append(self._items.popleft())
+            except IndexError:
+                break
+        self.consumed += len(items)
+        return items
+
+    @property
+    def dropped(self) -> int:
+        return self.published - self.consumed - len(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class LiveSink:
+    # Forwards everything to the run's sink and also publishes the rows of the
+    # watched tables. Column arrays are copied, since engines pass their live
+    # state arrays to write_columns.
+    def __init__(self, sink, buffer: RingBuffer, tables=LIVE_TABLES):
+        self.sink = sink
+        self.buffer = buffer
+        self.tables = set(tables)
+
+    def write(self, table: str, row: Dict[str, Any]):
+        self.sink.write(table, row)
+        if table in self.tables:
+            self.buffer.put(table, dict(row))
+
+    def write_columns(self, table: str, columns: Dict[str, Any]):
+        self.sink.write_columns(table, columns)
+        if table in self.tables:
+            self.buffer.put(table, {column: np.array(values) for column, values in columns.items()})
+
+    def __getattr__(self, name: str):
+        return getattr(self.sink, name)
+
+
+def collect(items: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Dict[str, np.ndarray]]:
+    # Turns drained rows and column chunks into one set of columns per table.
+    parts: Dict[str, Dict[str, List]] = {}
+    for table, data in items:
+        columns = parts.setdefault(table, {column: [] for column in data})
+        for column, values in data.items():
+            columns.setdefault(column, []).append(np.atleast_1d(values))
+    return {table: {column: np.concatenate(values) for column, values in columns.items()}
+            for table, columns in parts.items()}
+
+
+class Series:
+    # A growing x/y series behind one animated line.
+    def __init__(self, line):
+        self.line = line
+        self.x = np.empty(1024)
+        self.y = np.empty(1024)
+        self.size = 0
+
+    def extend(self, x: np.ndarray, y: np.ndarray):
+        needed = self.size + len(x)
+        if needed > len(self.x):
+            capacity = max(needed, 2 * len(self.x))
+            self.x = np.resize(self.x, capacity)
+            self.y = np.resize(self.y, capacity)
+        self.x[self.size:needed] = x
+        self.y[self.size:needed] = y
+        self.size = needed
+
+    def redraw(self, width: int):
+        self.line.set_data(*decimate(self.x[:self.size], self.y[:self.size], width))
+
+
+class LivePlot:
+    # Base class for plots that follow a running simulation. The simulation runs
+    # in a background thread and publishes rows to a RingBuffer; a timer on the
+    # GUI thread drains it, and only the animated artists are redrawn (blitted)
+    # unless update() reports that axes or legends changed.
+    def __init__(self, buffer: RingBuffer, blocks: int, n_steps: int, interval: int = 200):
+        self.buffer = buffer
+        self.blocks = blocks
+        self.n_steps = n_steps
+        self.interval = interval
+        self.fig = None
+        self.artists = []
+        self._background = None
+
+    def setup(self):
+        raise NotImplementedError("Subclasses must implement setup")
+
+    def update(self, tables: Dict[str, Dict[str, np.ndarray]]) -> bool:
+        raise NotImplementedError("Subclasses must implement update")
+
+    def add_artist(self, artist):
+        artist.set_animated(True)
+        self.artists.append(artist)
+        return artist
+
+    def refresh(self):
+        items = self.buffer.drain()
+        changed = self.update(collect(items)) if items else False
+        canvas = self.fig.canvas
+        if changed or self._background is None:
+            canvas.draw()
+            return
+        canvas.restore_region(self._background)
+        self._draw_artists()
+        canvas.blit(self.fig.bbox)
+        canvas.flush_events()
+
+    def _on_draw(self, event):
+        self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        for artist in self.artists:
+            self.fig.draw_artist(artist)
+
+    def run(self, subtensor, thread: threading.Thread):
+        # Blocks until the window is closed. Closing it before the run ends
+        # stops the simulation after its current block.
+        self.setup()
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+        timer = self.fig.canvas.new_timer(interval=self.interval)
+
+        def tick():
+            self.refresh()
+            if not thread.is_alive() and not len(self.buffer):
+                timer.stop()
+                self.fig.suptitle(f"Finished: {subtensor.output_dir}", color='white')
+                self.fig.canvas.draw_idle()
+
+        timer.add_callback(tick)
+        timer.start()
+        plt.show()
+        timer.stop()
+        if thread.is_alive():
+            subtensor.stop()
+        thread.join()
+
+
+def run_live(subtensor, plot_module: str, n_steps: int, capacity: int = 100000):
+    # Runs the simulation in a background thread while the LivePlot from
+    # plot_module follows it on the main thread, which GUI toolkits require.
+    module = importlib.import_module(plot_module)
+    plot_class = [obj for obj in module.__dict__.values()
+                  if isinstance(obj, type) and issubclass(obj, LivePlot) and obj is not LivePlot][-1]
+
+    buffer = RingBuffer(capacity)
+    subtensor.sink = LiveSink(subtensor.sink, buffer)
+    errors = []
+
+    def simulate():
+        try:
+            subtensor.run_simulation()
+        except BaseException as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=simulate, name='simulation', daemon=True)
+    thread.start()
+    if matplotlib.get_backend().lower() in NON_INTERACTIVE_BACKENDS:
+        print(f"No interactive matplotlib backend ({matplotlib.get_backend()}), running without the live view")
+        thread.join()
+    else:
+        plot_class(buffer, subtensor.blocks, n_steps).run(subtensor, thread)
+    if errors:
+        raise errors[0]
+    if buffer.dropped:
+        print(f"The live view fell behind and skipped {buffer.dropped} of {buffer.published} updates")
@@ -0,0 +1,130 @@
+import bisect
+from typing import Any, Dict, List, Optional, Tuple, Union
+import numpy as np
+
+# Tables written by _log_state; trades are written as they execute.
+LOG_TABLES = ('accounts', 'stakes', 'subnets', 'dividends', 'subtensor')
+
+
+class LogPolicy:
+    # Decides the blocks at which _log_state runs. next_block is the first
+    # block >= block at which the policy may log (None when it never will
+    # again); event mode jumps straight to it. should_log is asked once per
+    # visited block, after the block has run. The default logs every block.
+    # The last block of a run is logged whenever log_final is set.
+    log_final = True
+
+    def next_block(self, block: int, subtensor: Any) -> Optional[int]:
+        return block
+
+    def should_log(self, block: int, subtensor: Any) -> bool:
+        return self.next_block(block, subtensor) == block
+
+
+class Fixed(LogPolicy):
+    def __init__(self, every: int, start: int = 0):
+        if every < 1:
+            raise ValueError(f"Fixed log policies need every >= 1, got {every}")
+        self.every = every
+        self.start = start
+
+    def next_block(self, block: int, subtensor: Any) -> Optional[int]:
+        if block <= self.start:
+            return self.start
+        return self.start + -(-(block - self.start) // self.every) * self.every
+
+
+class LogSpaced(LogPolicy):
+    # About n blocks spaced evenly in log(block + 1) over the run, dense at the
+    # start where pools move fastest and sparse later.
+    def __init__(self, n: int, blocks: int):
+        if n < 1:
+            raise ValueError(f"LogSpaced log policies need n >= 1, got {n}")
+        self.blocks = np.unique(np.geomspace(1, blocks, n).astype(np.int64) - 1).tolist()
+
+    def next_block(self, block: int, subtensor: Any) -> Optional[int]:
+        i = bisect.bisect_left(self.blocks, block)
+        return self.blocks[i] if i < len(self.blocks) else None
+
+
+class OnTrades(LogPolicy):
+    # Logs every block on which a trade ran, right after it.
+    def next_block(self, block: int, subtensor: Any) -> Optional[int]:
+        candidates = [subtensor.trades.next_block(block),
+                      *(schedule.next_block(block) for schedule in subtensor.schedules)]
+        candidates = [c for c in candidates if c is not None]
+        return min(candidates) if candidates else None
+
+    def should_log(self, block: int, subtensor: Any) -> bool:
+        return subtensor.last_trade_block == block
+
+
+class PriceMove(LogPolicy):
+    # Logs when some subnet's price has moved by more than threshold (relative)
+    # since the last block this policy logged. Prices are checked every `every`
+    # blocks; in event mode each check is a visited block, so a coarser check
+    # keeps the blocks in between batched.
+    def __init__(self, threshold: float, every: int = 1):
+        if every < 1:
+            raise ValueError(f"PriceMove log policies need every >= 1, got {every}")
+        self.threshold = threshold
+        self.every = every
+        self._prices = None
+
+    def next_block(self, block: int, subtensor: Any) -> Optional[int]:
+        return -(-block // self.every) * self.every
+
+    def should_log(self, block: int, subtensor: Any) -> bool:
+        if block % self.every:
+            return False
+        prices = np.array([subtensor.alpha_price_of(subnet_id) for subnet_id in subtensor.subnets])
+        if self._prices is not None and len(prices) == len(self._prices):
+            moved = np.abs(prices - self._prices) > self.threshold * np.abs(self._prices)
+            if not moved.any():
+                return False
+        self._prices = prices
+        return True
+
+
+class AnyOf(LogPolicy):
+    def __init__(self, *policies: LogPolicy):
+        self.policies = policies
+        self.log_final = any(policy.log_final for policy in policies)
+
+    def next_block(self, block: int, subtensor: Any) -> Optional[int]:
+        candidates = [policy.next_block(block, subtensor) for policy in self.policies]
+        candidates = [c for c in candidates if c is not None]
+        return min(candidates) if candidates else None
+
+    def should_log(self, block: int, subtensor: Any) -> bool:
+        # Every policy is asked, so stateful ones see every block they expect.
+        return any([policy.should_log(block, subtensor) for policy in self.policies])
+
+
+class Never(LogPolicy):
+    log_final = False
+
+    def next_block(self, block: int, subtensor: Any) -> Optional[int]:
+        return None
+
+    def should_log(self, block: int, subtensor: Any) -> bool:
+        return False
+
+
+def log_groups(policy: Union[LogPolicy, Dict[str, LogPolicy], None],
+               default: LogPolicy) -> List[Tuple[LogPolicy, Tuple[str, ...]]]:
+    # A single policy applies to every table; a dict sets it per table, and
+    # tables it leaves out follow the default. Tables sharing one policy object
+    # are grouped so a stateful policy is asked once per block.
+    if policy is None:
+        policy = default
+    if isinstance(policy, LogPolicy):
+        return [(policy, LOG_TABLES)]
+    unknown = set(policy) - set(LOG_TABLES)
+    if unknown:
+        raise ValueError(f"Unknown log tables {sorted(unknown)}, expected some of {list(LOG_TABLES)}")
+    groups: Dict[int, Tuple[LogPolicy, List[str]]] = {}
+    for table in LOG_TABLES:
+        table_policy = policy.get(table, default)
+        groups.setdefault(id(table_policy), (table_policy, []))[1].append(table)
+    return [(table_policy, tuple(tables)) for table_policy, tables in groups.values()]
@@ -68,3 +68,16 @@ class Trade:
     subnet_id: int
     action: str
     amount: str
+
+
+@dataclass
+class BlockResult:
+    # What the step of one block computed. sum_prices is the price sum before
+    # the injection, which decided between injecting TAO and alpha. emission
+    # maps each non-root subnet to its share of the block's emission, and
+    # dividends[subnet_id] maps accounts to their share of that subnet's payout.
+    block: int
+    sum_prices: float
+    injected_tao: bool
+    emission: Dict[int, float]
+    dividends: Dict[int, Dict[int, float]]
@@ -1,12 +1,136 @@
+import importlib
+import re
+from typing import Any, List, Optional, Union
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
-from .utils import read_json
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from .results import open_results
+
+# Lines are decimated to about this many points per pixel column of the axes;
+# first, last, min and max of each bucket are kept so spikes stay visible.
+MIN_PLOT_WIDTH = 200
+
+
+def decimate(x, y, n_buckets):
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n <= 4 * n_buckets:
+        return x, y
+    size = -(-n // n_buckets)
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(n_buckets, size)
+    missing = np.isnan(padded)
+    starts = np.arange(n_buckets) * size
+    lows = np.where(missing, np.inf, padded).argmin(axis=1) + starts
+    highs = np.where(missing, -np.inf, padded).argmax(axis=1) + starts
+    ends = np.minimum(starts + size, n) - 1
+    keep = np.unique(np.concatenate((starts, lows, highs, ends)))
+    keep = keep[keep < n]
+    return x[keep], y[keep]
+
+
+def _factorize(values):
+    # Logged tables are in block order, so the index column is usually sorted
+    # already and can be coded without a sort or a hash table.
+    values = np.asarray(values)
+    if len(values) and (values[1:] >= values[:-1]).all():
+        starts = np.concatenate(([True], values[1:] != values[:-1]))
+        return np.cumsum(starts) - 1, values[starts]
+    codes, labels = pd.factorize(values, sort=True)
+    return codes, np.asarray(labels)
+
+
+def pivot(df, index, columns, values):
+    # DataFrame.pivot in one pass over the rows for any number of value
+    # columns; a list of values gives a dict of frames. Missing cells are NaN
+    # and duplicate cells keep the last row.
+    rows, row_labels = _factorize(df[index])
+    cols, col_labels = _factorize(df[columns])
+    frames = {}
+    for value in [values] if isinstance(values, str) else values:
+        grid = np.full((len(row_labels), len(col_labels)), np.nan)
+        grid[rows, cols] = df[value].to_numpy()
+        frames[value] = pd.DataFrame(grid, index=pd.Index(row_labels, name=index),
+                                     columns=pd.Index(col_labels, name=columns))
+    return frames[values] if isinstance(values, str) else frames
+
+
+def parse_plot_argument(plot_arg: str) -> tuple[str, Optional[Union[List[Any], Any]]]:
+    match = re.match(r'([^[]+)(?:\[(.*)\])?', plot_arg)
+    if not match:
+        return plot_arg, None
+    
+    module_name, params_str = match.groups()
+    if not params_str:
+        return module_name, None
+
+    params = [param.strip() for param in params_str.split(',')]
+    
+    converted_params = []
+    for param in params:
+        try:
+            converted_params.append(int(param))
+        except ValueError:
+            try:
+                converted_params.append(float(param))
+            except ValueError:
+                converted_params.append(param)
+    
+    return module_name, converted_params[0] if len(converted_params) == 1 else converted_params
+
+
+def load_plot_class(module_name: str) -> type:
+    module = importlib.import_module(module_name)
+    return [obj for obj in module.__dict__.values()
+            if isinstance(obj, type) and issubclass(obj, BasePlot) and obj != BasePlot][-1]
+
+
+class DecimatedLine:
+    # A line drawn from at most a few points per pixel. When the x limits
+    # change (zoom, pan), only the visible window is decimated again.
+    def __init__(self, ax, x, y, **kwargs):
+        self.ax = ax
+        self.x = np.asarray(x)
+        self.y = np.asarray(y, dtype=np.float64)
+        self._window = None
+        self.line, = ax.plot(*self._resample(None), **kwargs)
+        ax.callbacks.connect('xlim_changed', lambda ax: self._update(ax.get_xlim()))
+
+    def _update(self, xlim):
+        data = self._resample(xlim)
+        if data is not None:
+            self.line.set_data(*data)
+
+    def _resample(self, xlim):
+        # Returns None when the visible rows and the width are unchanged, as
+        # on the first draw after autoscaling.
+        lo, hi = 0, len(self.x)
+        if xlim is not None:
+            lo = max(int(np.searchsorted(self.x, xlim[0], 'left')) - 1, 0)
+            hi = min(int(np.searchsorted(self.x, xlim[1], 'right')) + 1, len(self.x))
+        width = max(int(self.ax.get_window_extent().width), MIN_PLOT_WIDTH)
+        if self._window == (lo, hi, width):
+            return None
+        self._window = (lo, hi, width)
+        return decimate(self.x[lo:hi], self.y[lo:hi], width)
 
 class PlotStyle:
+    STYLE = 'dark_background'
+
     @staticmethod
-    def setup_plot_style():
-        plt.style.use('dark_background')
-        fig = plt.figure(figsize=(7.5, 5))
+    def setup_plot_style(headless=False):
+        # Headless figures are not registered with pyplot and draw with Agg;
+        # the caller applies STYLE around the plot with plt.style.context.
+        if headless:
+            fig = Figure(figsize=(7.5, 5))
+            FigureCanvasAgg(fig)
+        else:
+            plt.style.use(PlotStyle.STYLE)
+            fig = plt.figure(figsize=(7.5, 5))
         fig.patch.set_facecolor('black')
         return fig
 
@@ -26,28 +150,57 @@ class PlotStyle:
         ax.tick_params(colors='white')
         return ax
 
+    @staticmethod
+    def plot_line(ax, x, y, **kwargs):
+        return DecimatedLine(ax, x, y, **kwargs).line
+
     @staticmethod
     def create_legend(ax, **kwargs):
         return ax.legend(loc='upper right', facecolor='black', edgecolor='black',
                         labelcolor='white', fontsize=10, **kwargs)
 
 class BasePlot:
-    def __init__(self, data_dir, blocks, n_steps):
+    def __init__(self, data_dir, blocks, n_steps, headless=False):
         self.data_dir = data_dir
         self.blocks = blocks
         self.n_steps = n_steps
+        self.headless = headless
+        self.fig = None
+        self.results = open_results(data_dir)
         self.load_data()
-        
+
+    def new_figure(self):
+        self.fig = PlotStyle.setup_plot_style(self.headless)
+        return self.fig
+
     def load_data(self):
-        self.subnets_data = read_json(f"{self.data_dir}/subnets.json")
-        self.accounts_data = read_json(f"{self.data_dir}/accounts.json")
-        self.subtensor_data = read_json(f"{self.data_dir}/subtensor.json")
-        self.trades_data = read_json(f"{self.data_dir}/trades.json")
-
-        self.subnets_df = pd.DataFrame(self.subnets_data)
-        self.accounts_df = pd.DataFrame(self.accounts_data)
-        self.subtensor_df = pd.DataFrame(self.subtensor_data)
-        self.trades_df = pd.DataFrame(self.trades_data)
+        # Tables are loaded lazily through self.results; subclasses may still
+        # prepare their own data here.
+        pass
+
+    @property
+    def subnets_df(self):
+        return self.results.table("subnets")
+
+    @property
+    def accounts_df(self):
+        return self.results.table("accounts")
+
+    @property
+    def subtensor_df(self):
+        return self.results.table("subtensor")
+
+    @property
+    def trades_df(self):
+        return self.results.table("trades")
+
+    @property
+    def stakes_df(self):
+        return self.results.table("stakes")
+
+    @property
+    def dividends_df(self):
+        return self.results.table("dividends")
 
     def plot(self, *args, **kwargs):
         raise NotImplementedError("Subclasses must implement plot method")
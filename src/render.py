@@ -0,0 +1,119 @@
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+import matplotlib
+import matplotlib.pyplot as plt
+import pandas as pd
+from .plotting import PlotStyle, load_plot_class, parse_plot_argument
+from .results import open_results
+
+PLOTS_DIR = 'plots'
+
+
+def plot_filename(plot_arg: str, fmt: str = 'png') -> str:
+    # plots.account_value[1,2] -> account_value-1-2.png
+    module_name, params = parse_plot_argument(plot_arg)
+    name = module_name.rsplit('.', 1)[-1]
+    if params is not None:
+        values = params if isinstance(params, list) else [params]
+        name = '-'.join([name, *(str(value) for value in values)])
+    name = re.sub(r'[^\w.-]+', '_', name)
+    return f"{name}.{fmt}"
+
+
+def render_run(data_dir: str, plot_args: List[str], blocks: int, n_steps: int,
+               output_dir: Optional[str] = None, dpi: int = 100, fmt: str = 'png') -> List[Dict[str, Any]]:
+    # Renders every plot of one run to <output_dir or data_dir/plots>/. The
+    # plots share the run's loaded tables, which are released at the end.
+    output_dir = output_dir or os.path.join(data_dir, PLOTS_DIR)
+    os.makedirs(output_dir, exist_ok=True)
+    records = []
+    for plot_arg in plot_args:
+        start = time.perf_counter()
+        path = os.path.join(output_dir, plot_filename(plot_arg, fmt))
+        error = None
+        try:
+            module_name, params = parse_plot_argument(plot_arg)
+            plotter = load_plot_class(module_name)(data_dir, blocks, n_steps, headless=True)
+            with plt.style.context(PlotStyle.STYLE):
+                if params is not None:
+                    plotter.plot(params)
+                else:
+                    plotter.plot()
+                plotter.fig.savefig(path, dpi=dpi)
+        except Exception as e:
+            error = str(e)
+            path = None
+        records.append({
+            "data_dir": data_dir,
+            "plot": plot_arg,
+            "path": path,
+            "elapsed": time.perf_counter() - start,
+            "error": error,
+        })
+    open_results(data_dir).clear()
+    return records
+
+
+def _init_worker():
+    matplotlib.use('Agg')
+
+
+def render_plots(data_dirs: List[str], plot_args: List[str], blocks: int, n_steps: int,
+                 output_dir: Optional[str] = None, max_workers: Optional[int] = None,
+                 dpi: int = 100, fmt: str = 'png') -> pd.DataFrame:
+    # One task per result directory. With output_dir, each run's images go to
+    # <output_dir>/<run directory name>/, otherwise next to its tables.
+    start = time.perf_counter()
+    records = []
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker) as executor:
+        futures = {
+            executor.submit(render_run, data_dir, plot_args, blocks, n_steps,
+                            os.path.join(output_dir, os.path.basename(os.path.normpath(data_dir)))
+                            if output_dir else None, dpi, fmt): data_dir
+            for data_dir in data_dirs
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            data_dir = futures[future]
+            try:
+                run_records = future.result()
+            except Exception as e:
+                print(f"[{done}/{len(futures)}] {data_dir} failed: {str(e)}")
+                continue
+            records.extend(run_records)
+            for record in run_records:
+                if record["error"]:
+                    print(f"Error rendering {record['plot']} for {data_dir}: {record['error']}")
+            rendered = sum(record["error"] is None for record in run_records)
+            print(f"[{done}/{len(futures)}] {data_dir}: {rendered} images in "
+                  f"{sum(record['elapsed'] for record in run_records):.1f}s")
+
+    elapsed = time.perf_counter() - start
+    rendered = sum(record["error"] is None for record in records)
+    print(f"Rendered {rendered} images from {len(data_dirs)} runs in {elapsed:.1f}s "
+          f"({rendered / elapsed if elapsed else 0:.1f} images/s)")
+    return pd.DataFrame(records, columns=["data_dir", "plot", "path", "elapsed", "error"])
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Render plots of many result directories to image files')
+    parser.add_argument('data_dirs', nargs='+', help='Result directories, e.g. data/sweeps/<id>/point-*')
+    parser.add_argument('--plots', nargs='+', required=True, help='List of plot modules to render')
+    parser.add_argument('--blocks', type=int, required=True, help='Blocks the runs simulated')
+    parser.add_argument('--n-steps', type=int, required=True, help='Logging steps of the runs')
+    parser.add_argument('--output-dir', default=None, help='Parent directory for images (default: <run>/plots)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--dpi', type=int, default=100, help='Image resolution')
+    parser.add_argument('--format', default='png', help='Image format understood by savefig')
+    args = parser.parse_args(argv)
+
+    data_dirs = [data_dir for data_dir in args.data_dirs if os.path.isdir(data_dir)]
+    render_plots(data_dirs, args.plots, args.blocks, args.n_steps, args.output_dir,
+                 args.workers, args.dpi, args.format)
+
+
+if __name__ == "__main__":
+    main()
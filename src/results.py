@@ -0,0 +1,134 @@
+import glob
+import json
+import os
+from typing import Any, Dict, List
+import numpy as np
+import pandas as pd
+from .sinks import read_table
+from .utils import read_json, write_json
+
+# Tables are converted once to one .npy file per column under this
+# subdirectory of the run, which later loads memory-map instead of parsing.
+COLUMNS_DIR = 'columns'
+
+
+class Results:
+    # Handle on one run's output directory. Each table is read on first access
+    # and kept; tables that are never asked for are never read.
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        self.key = run_files_key(data_dir)
+        self._tables: Dict[str, pd.DataFrame] = {}
+
+    def table(self, table: str) -> pd.DataFrame:
+        if table not in self._tables:
+            self._tables[table] = load_table(self.data_dir, table)
+        return self._tables[table]
+
+    def __getitem__(self, table: str) -> pd.DataFrame:
+        return self.table(table)
+
+    def clear(self):
+        self._tables.clear()
+
+
+_results: Dict[str, Results] = {}
+
+
+def open_results(data_dir: str) -> Results:
+    # One handle per directory and process, so every plot of a run shares it.
+    # A handle whose run was rewritten since it was opened is replaced.
+    key = os.path.abspath(data_dir)
+    if key not in _results or _results[key].key != run_files_key(data_dir):
+        _results[key] = Results(data_dir)
+    return _results[key]
+
+
+def _stat_key(paths: List[str]) -> List[List[Any]]:
+    key = []
+    for path in sorted(paths):
+        if os.path.exists(path):
+            stat = os.stat(path)
+            key.append([os.path.basename(path), stat.st_size, stat.st_mtime_ns])
+    return key
+
+
+def run_files_key(data_dir: str) -> List[List[Any]]:
+    # The manifest is rewritten whenever a run's output is, so its size and
+    # mtime stand for the whole run; runs without one have only JSON tables.
+    manifest_path = os.path.join(data_dir, 'manifest.json')
+    if os.path.exists(manifest_path):
+        return _stat_key([manifest_path])
+    return _stat_key(glob.glob(os.path.join(data_dir, '*.json')))
+
+
+def table_files_key(data_dir: str, manifest: Dict[str, Any], table: str) -> List[List[Any]]:
+    # Size and mtime of every file holding the table's rows, for the column
+    # cache to tell whether the table changed under it.
+    output_format = manifest['format']
+    if output_format == 'npy':
+        paths = glob.glob(os.path.join(data_dir, table, '*.npy'))
+    elif output_format == 'sqlite':
+        database = os.path.join(data_dir, manifest['database'])
+        paths = [database, f"{database}-wal"]
+    else:
+        paths = [os.path.join(data_dir, f"{table}.{output_format}")]
+    return _stat_key(paths)
+
+
+def load_table(data_dir: str, table: str) -> pd.DataFrame:
+    manifest_path = os.path.join(data_dir, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return read_table(data_dir, table)
+    manifest = read_json(manifest_path)
+    info = manifest['tables'].get(table)
+    if not info or not info['rows']:
+        return read_table(data_dir, table)
+
+    if manifest['format'] == 'npy' and not info['nested']:
+        chunks = [sorted(glob.glob(os.path.join(data_dir, table, f"{column}.*.npy"))) for column in info['columns']]
+        if all(len(paths) == 1 for paths in chunks):
+            return _mapped(dict(zip(info['columns'], (paths[0] for paths in chunks))), [])
+
+    directory = os.path.join(data_dir, COLUMNS_DIR, table)
+    meta_path = os.path.join(directory, 'columns.json')
+    source = table_files_key(data_dir, manifest, table)
+    if not os.path.exists(meta_path) or read_json(meta_path).get('source') != source:
+        df = read_table(data_dir, table)
+        try:
+            _write_columns(directory, df, info, source)
+        except OSError:
+            return df
+    meta = read_json(meta_path)
+    return _mapped({column: os.path.join(directory, f"{column}.npy") for column in meta['columns']},
+                   meta['nested'])
+
+
+def _write_columns(directory: str, df: pd.DataFrame, info: Dict[str, Any], source: List[List[Any]]):
+    # Text and nested columns are stored as fixed-width unicode, which numpy
+    # can memory-map, unlike object arrays. The metadata goes last, so a
+    # half-written cache is rebuilt on the next load.
+    os.makedirs(directory, exist_ok=True)
+    for column in df.columns:
+        values = df[column].to_numpy()
+        if column in info['nested']:
+            values = np.array([json.dumps(value) for value in values])
+        elif values.dtype.kind not in 'biufcmM':
+            values = values.astype(str)
+        np.save(os.path.join(directory, f"{column}.npy"), values)
+    write_json(os.path.join(directory, 'columns.json'), {
+        'rows': info['rows'],
+        'source': source,
+        'columns': list(df.columns),
+        'nested': info['nested'],
+    })
+
+
+def _mapped(paths: Dict[str, str], nested: List[str]) -> pd.DataFrame:
+    columns = {}
+    for column, path in paths.items():
+        values = np.load(path, mmap_mode='r')
+        if column in nested:
+            values = [json.loads(value) for value in values.tolist()]
+        columns[column] = values
+    return pd.DataFrame(columns, copy=False)
@@ -0,0 +1,185 @@
+import argparse
+import importlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+from .accounts import AccountStore
+from .models import Subnet, Account, Trade
+from .schedules import Periodic, split_trades
+from .trades import TradeBook
+from .utils import read_json, write_json
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+# A compiled scenario is a directory holding the config as a text file plus
+# binary sidecars for the bulky parts, which load with one read per column.
+SCENARIO_FILES = ('scenario.json', 'scenario.yaml', 'scenario.yml', 'scenario.toml')
+TRADES_FILE = 'trades.npz'
+ACCOUNTS_FILE = 'accounts.npz'
+SCHEDULE_TYPES = {'periodic': Periodic}
+
+
+def _read_text(path: str) -> Dict[str, Any]:
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.yaml', '.yml'):
+        if yaml is None:
+            raise ImportError("YAML scenarios require PyYAML (pip install pyyaml)")
+        with open(path) as f:
+            return yaml.safe_load(f)
+    if extension == '.toml':
+        if tomllib is None:
+            raise ImportError("TOML scenarios require Python 3.11+ (tomllib)")
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    return read_json(path)
+
+
+def _write_text(path: str, data: Dict[str, Any]):
+    if os.path.splitext(path)[1].lower() in ('.yaml', '.yml'):
+        if yaml is None:
+            raise ImportError("YAML scenarios require PyYAML (pip install pyyaml)")
+        with open(path, 'w') as f:
+            yaml.safe_dump(data, f, sort_keys=False)
+    else:
+        write_json(path, data)
+
+
+def scenario_path(path: str) -> str:
+    if not os.path.isdir(path):
+        return path
+    for name in SCENARIO_FILES:
+        if os.path.exists(os.path.join(path, name)):
+            return os.path.join(path, name)
+    raise FileNotFoundError(f"No scenario file ({', '.join(SCENARIO_FILES)}) in {path}")
+
+
+def save_scenario(config: Dict[str, Any], directory: str, fmt: str = 'json') -> str:
+    # Trade books and account stores go to .npz sidecars; subnets, account
+    # lists and Periodic schedules are written inline. Other schedules and
+    # config values that are not plain data cannot be stored.
+    os.makedirs(directory, exist_ok=True)
+    scenario = {}
+    for key, value in config.items():
+        if key in ('subnets', 'accounts', 'trades'):
+            continue
+        try:
+            json.dumps(value)
+        except TypeError:
+            raise ValueError(f"Config key '{key}' ({type(value).__name__}) cannot be stored in a scenario file")
+        scenario[key] = value
+
+    scenario['subnets'] = [
+        {'id': int(subnet.id), 'tao_in': float(subnet.tao_in), 'alpha_in': float(subnet.alpha_in),
+         'alpha_out': float(subnet.alpha_out), 'is_root': bool(subnet.is_root)}
+        for subnet in config['subnets']
+    ]
+
+    accounts = config['accounts']
+    if isinstance(accounts, AccountStore):
+        accounts.save(os.path.join(directory, ACCOUNTS_FILE))
+        scenario['accounts'] = ACCOUNTS_FILE
+    else:
+        scenario['accounts'] = [
+            {'id': int(a.id), 'free_balance': float(a.free_balance),
+             'registered_subnets': [int(subnet_id) for subnet_id in a.registered_subnets],
+             'alpha_stakes': {str(subnet_id): float(stake) for subnet_id, stake in a.alpha_stakes.items()}}
+            for a in accounts
+        ]
+
+    book, schedules = split_trades(config['trades'])
+    book.save(os.path.join(directory, TRADES_FILE))
+    scenario['trades'] = TRADES_FILE
+    scenario['schedules'] = []
+    for schedule in schedules:
+        kinds = [kind for kind, cls in SCHEDULE_TYPES.items() if type(schedule) is cls]
+        if not kinds:
+            raise ValueError(f"{type(schedule).__name__} schedules cannot be stored in a scenario file; "
+                             f"materialize them as trades or use one of {list(SCHEDULE_TYPES)}")
+        scenario['schedules'].append({'type': kinds[0], **vars(schedule)})
+
+    path = os.path.join(directory, f"scenario.{fmt}")
+    _write_text(path, scenario)
+    return path
+
+
+def load_scenario(path: str) -> Dict[str, Any]:
+    # Returns a config dict for create_subtensor/run_simulation. path is a
+    # scenario file or a directory holding one; sidecar paths are relative to
+    # the scenario file. Hand-written scenarios may also list trades inline.
+    path = scenario_path(path)
+    directory = os.path.dirname(os.path.abspath(path))
+    config = dict(_read_text(path))
+
+    config['subnets'] = [Subnet(**subnet) for subnet in config['subnets']]
+
+    accounts = config['accounts']
+    if isinstance(accounts, str):
+        config['accounts'] = AccountStore.load(os.path.join(directory, accounts))
+    else:
+        config['accounts'] = [
+            Account(id=a['id'], free_balance=a['free_balance'],
+                    registered_subnets=list(a.get('registered_subnets', [])),
+                    alpha_stakes={int(subnet_id): stake for subnet_id, stake in a.get('alpha_stakes', {}).items()})
+            for a in accounts
+        ]
+
+    trades = config.get('trades', [])
+    if isinstance(trades, str):
+        book = TradeBook.load(os.path.join(directory, trades))
+    else:
+        book = TradeBook.from_trades([Trade(**trade) for trade in trades])
+    schedules = []
+    for schedule in config.pop('schedules', []):
+        schedule = dict(schedule)
+        kind = schedule.pop('type')
+        if kind not in SCHEDULE_TYPES:
+            raise ValueError(f"Unknown schedule type '{kind}', expected one of {list(SCHEDULE_TYPES)}")
+        schedules.append(SCHEDULE_TYPES[kind](**schedule))
+    config['trades'] = [book, *schedules] if schedules else book
+    return config
+
+
+def compile_scenario(module_name: str, directory: str, seed: Optional[int] = None, fmt: str = 'json') -> str:
+    # Modules with a build_config(rng) function are rebuilt from the seed, so
+    # a compiled random scenario can be reproduced.
+    module = importlib.import_module(module_name)
+    if seed is not None:
+        if not hasattr(module, 'build_config'):
+            raise ValueError(f"{module_name} has no build_config(rng) function to seed")
+        config = module.build_config(np.random.default_rng(seed))
+    else:
+        config = module.config
+    return save_scenario(config, directory, fmt)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Compile a simulation module to a scenario directory')
+    parser.add_argument('simulation', help='Simulation module, e.g. simulations.random')
+    parser.add_argument('--output-dir', default=None, help='Scenario directory (default: data/scenarios/<name>)')
+    parser.add_argument('--seed', type=int, default=None, help='Seed passed to build_config(rng)')
+    parser.add_argument('--format', choices=['json', 'yaml'], default='json', help='Scenario file format')
+    args = parser.parse_args(argv)
+
+    directory = args.output_dir or os.path.join('data', 'scenarios', args.simulation.rsplit('.', 1)[-1])
+    path = compile_scenario(args.simulation, directory, args.seed, args.format)
+    start = time.perf_counter()
+    config = load_scenario(path)
+    elapsed = time.perf_counter() - start
+    book, schedules = split_trades(config['trades'])
+    print(f"Compiled {args.simulation} to {path}: {len(config['subnets'])} subnets, "
+          f"{len(config['accounts'])} accounts, {len(book)} trades, {len(schedules)} schedules; "
+          f"loads in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
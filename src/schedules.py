@@ -0,0 +1,94 @@
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+from .models import Trade
+from .trades import TradeBook
+
+
+class TradeSchedule:
+    # Produces trades on demand as the block loop advances. next_block is the
+    # first block >= block at which the schedule may trade (None when it is
+    # done); event mode jumps straight to it. The default visits every block.
+    def next_block(self, block: int) -> Optional[int]:
+        return block
+
+    def trades(self, block: int, subtensor: Any) -> List[Trade]:
+        raise NotImplementedError("Subclasses must implement trades")
+
+
+class Periodic(TradeSchedule):
+    def __init__(self, account_id: int, subnet_id: int, action: str, amount: str,
+                 every: int = 1, start: int = 0, stop: Optional[int] = None):
+        if every < 1:
+            raise ValueError(f"Periodic schedules need every >= 1, got {every}")
+        self.account_id = account_id
+        self.subnet_id = subnet_id
+        self.action = action
+        self.amount = amount
+        self.every = every
+        self.start = start
+        self.stop = stop
+
+    def next_block(self, block: int) -> Optional[int]:
+        if block <= self.start:
+            next_block = self.start
+        else:
+            next_block = self.start + -(-(block - self.start) // self.every) * self.every
+        return next_block if self.stop is None or next_block < self.stop else None
+
+    def trades(self, block: int, subtensor: Any) -> List[Trade]:
+        if self.next_block(block) != block:
+            return []
+        return [Trade(block=block, account_id=self.account_id, subnet_id=self.subnet_id,
+                      action=self.action, amount=self.amount)]
+
+
+class TradeStream(TradeSchedule):
+    def __init__(self, trades: Iterable[Trade]):
+        self._trades = iter(trades)
+        self._pending = next(self._trades, None)
+
+    def next_block(self, block: int) -> Optional[int]:
+        if self._pending is None:
+            return None
+        if self._pending.block < block:
+            raise ValueError(f"Trade stream is not sorted by block: got block {self._pending.block} after {block - 1}")
+        return self._pending.block
+
+    def trades(self, block: int, subtensor: Any) -> List[Trade]:
+        trades = []
+        while self._pending is not None and self.next_block(block) == block:
+            trades.append(self._pending)
+            self._pending = next(self._trades, None)
+        return trades
+
+
+class Callback(TradeSchedule):
+    def __init__(self, fn: Callable[[int, Any], Iterable[Trade]]):
+        self.fn = fn
+
+    def trades(self, block: int, subtensor: Any) -> List[Trade]:
+        return list(self.fn(block, subtensor) or [])
+
+
+def as_schedule(source: Any) -> TradeSchedule:
+    if isinstance(source, TradeSchedule):
+        return source
+    if callable(source):
+        return Callback(source)
+    return TradeStream(source)
+
+
+def split_trades(trades: Any) -> Tuple[TradeBook, List[TradeSchedule]]:
+    # Materialized trades and trade books go into one trade book, everything
+    # else is kept as a schedule. Within a block the book's trades run first
+    # (listed Trade objects, then the books in order), then the schedules in
+    # the order given.
+    if isinstance(trades, TradeBook):
+        return trades, []
+    if isinstance(trades, (list, tuple)):
+        listed = [trade for trade in trades if isinstance(trade, Trade)]
+        books = [source for source in trades if isinstance(source, TradeBook)]
+        schedules = [as_schedule(source) for source in trades if not isinstance(source, (Trade, TradeBook))]
+        if len(books) == 1 and not listed:
+            return books[0], schedules
+        return TradeBook.concat([TradeBook.from_trades(listed), *books]), schedules
+    return TradeBook.from_trades([]), [as_schedule(trades)]
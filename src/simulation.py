@@ -1,36 +1,25 @@
 from .subtensor import Subtensor
-import importlib
-import re
-from .plotting import BasePlot
+from .vectorized import VectorizedSubtensor
+from .compiled import CompiledSubtensor
+from .sinks import DATABASE_FILE, make_sink, new_run_id
+import argparse
+import os
+from .plotting import load_plot_class, parse_plot_argument
+from .live import run_live
+from .render import render_run
+from .scenarios import load_scenario
+from .store import config_hash, config_params
 from typing import Dict, Any, Optional, List, Union
 import matplotlib.pyplot as plt
 
+ENGINES = {
+    'dict': Subtensor,
+    'numpy': VectorizedSubtensor,
+    'compiled': CompiledSubtensor,
+}
 
-def parse_plot_argument(plot_arg: str) -> tuple[str, Optional[Union[List[Any], Any]]]:
-    match = re.match(r'([^[]+)(?:\[(.*)\])?', plot_arg)
-    if not match:
-        return plot_arg, None
-    
-    module_name, params_str = match.groups()
-    if not params_str:
-        return module_name, None
 
-    params = [param.strip() for param in params_str.split(',')]
-    
-    converted_params = []
-    for param in params:
-        try:
-            converted_params.append(int(param))
-        except ValueError:
-            try:
-                converted_params.append(float(param))
-            except ValueError:
-                converted_params.append(param)
-    
-    return module_name, converted_params[0] if len(converted_params) == 1 else converted_params
-
-
-def run_simulation(config: Dict[str, Any], plot_modules: Optional[List[str]] = None):
+def create_subtensor(config: Dict[str, Any], output_dir: Optional[str] = None) -> Subtensor:
     blocks = config['blocks']
     n_steps = config['n_steps']
     subnets = config['subnets']
@@ -40,8 +29,25 @@ def run_simulation(config: Dict[str, Any], plot_modules: Optional[List[str]] = N
     global_split = config['global_split']
     balanced = config['balanced']
     root_weight = config['root_weight']
+    engine = config.get('engine', 'dict')
+
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}', expected one of {list(ENGINES)}")
+
+    if output_dir is None:
+        output_dir = os.path.join(config.get('output_dir', 'data'), config.get('run_id') or new_run_id())
+    output_format = config.get('output_format', 'jsonl')
+    sink_options = {'chunk_size': config.get('chunk_size', 4096)}
+    if output_format == 'sqlite':
+        sink_options.update(
+            database=config.get('database') or os.path.join(config.get('output_dir', 'data'), DATABASE_FILE),
+            run_id=config.get('run_id'),
+            config_hash=config_hash(config),
+            params=config_params(config)
+        )
+    sink = make_sink(output_format, output_dir, **sink_options)
 
-    subtensor = Subtensor(
+    return ENGINES[engine](
         subnets=subnets,
         accounts=accounts,
         trades=trades,
@@ -50,33 +56,76 @@ def run_simulation(config: Dict[str, Any], plot_modules: Optional[List[str]] = N
         balanced=balanced,
         root_weight=root_weight,
         blocks=blocks,
-        n_steps=n_steps
+        n_steps=n_steps,
+        mode=config.get('mode', 'block'),
+        sink=sink,
+        checkpoint_interval=config.get('checkpoint_interval'),
+        profile=config.get('profile', False),
+        progress_interval=config.get('progress_interval'),
+        log_policy=config.get('log_policy')
     )
 
-    subtensor.run_simulation()
 
-    if plot_modules:
-        plotters = []
-        for plot_arg in plot_modules:
-            try:
-                module_name, params = parse_plot_argument(plot_arg)
-                
-                module = importlib.import_module(module_name)
-                
-                plot_class = [obj for obj in module.__dict__.values() 
-                             if isinstance(obj, type) and issubclass(obj, BasePlot) 
-                             and obj != BasePlot][-1]
-                
-                plotter = plot_class("data", config["blocks"], config["n_steps"])
-                
-                if params is not None:
-                    plotter.plot(params)
-                else:
-                    plotter.plot()
-                    
-                plotters.append(plotter)
+def run_plots(data_dir: str, blocks: int, n_steps: int, plot_modules: List[str]):
+    plotters = []
+    for plot_arg in plot_modules:
+        try:
+            module_name, params = parse_plot_argument(plot_arg)
+            
+            plot_class = load_plot_class(module_name)
+            
+            plotter = plot_class(data_dir, blocks, n_steps)
+            
+            if params is not None:
+                plotter.plot(params)
+            else:
+                plotter.plot()
                 
-            except Exception as e:
-                print(f"Error running plot {plot_arg}: {str(e)}")
+            plotters.append(plotter)
+            
+        except Exception as e:
+            print(f"Error running plot {plot_arg}: {str(e)}")
+
+    plt.show()
+
+
+def run_simulation(config: Union[Dict[str, Any], str], plot_modules: Optional[List[str]] = None):
+    # config may also be the path of a scenario file or directory.
+    if isinstance(config, str):
+        config = load_scenario(config)
+    subtensor = create_subtensor(config)
+    if config.get('fork_from'):
+        block = subtensor.restore_checkpoint(config['fork_from'], fork=True)
+        print(f"Forked from {config['fork_from']}, starting at block {block}")
+    elif config.get('resume'):
+        block = subtensor.restore_checkpoint()
+        print(f"Resuming {subtensor.output_dir} at block {block}")
+    live = config.get('live')
+    if live:
+        run_live(subtensor, 'plots.live_dashboard' if live is True else live, config["n_steps"])
+    else:
+        subtensor.run_simulation()
+    print(f"Results written to {subtensor.output_dir}")
+
+    if plot_modules and config.get('headless'):
+        records = render_run(subtensor.output_dir, plot_modules, config["blocks"], config["n_steps"])
+        for record in records:
+            if record["error"]:
+                print(f"Error rendering {record['plot']}: {record['error']}")
+            else:
+                print(f"Wrote {record['path']}")
+    elif plot_modules:
+        run_plots(subtensor.output_dir, config["blocks"], config["n_steps"], plot_modules)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Run a scenario file or directory')
+    parser.add_argument('scenario', help='Scenario written by src.scenarios, e.g. data/scenarios/random')
+    parser.add_argument('--plots', nargs='+', help='List of plot modules to run')
+    args = parser.parse_args(argv)
+
+    run_simulation(args.scenario, args.plots if args.plots else [])
+
 
-        plt.show()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,464 @@
+import copy
+import csv
+import glob
+import itertools
+import json
+import os
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from .utils import read_json, write_json
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+# Default name of the multi-run SQLite database, see SQLiteSink.
+DATABASE_FILE = 'results.sqlite'
+# (run, block, id) index per id column; a table gets one for each it has.
+SQLITE_INDEXES = ('account_id', 'subnet_id')
+
+for _type in (np.int8, np.int16, np.int32, np.int64, np.bool_):
+    sqlite3.register_adapter(_type, int)
+sqlite3.register_adapter(np.float32, float)
+
+
+def new_run_id() -> str:
+    return datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+
+
+class Sink:
+    extension = None
+
+    def __init__(self, directory: str, chunk_size: int = 4096):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.tables: Dict[str, Dict[str, Any]] = {}
+        self._buffers: Dict[str, Dict[str, List]] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, table: str, row: Dict[str, Any]):
+        buffer = self._buffer(table, row)
+        for column, value in row.items():
+            buffer[column].append(value)
+        if len(buffer[next(iter(buffer))]) >= self.chunk_size:
+            self._flush_table(table)
+
+    def write_columns(self, table: str, columns: Dict[str, Any]):
+        # Large column sets are taken a chunk at a time so the row buffers
+        # never hold more than about one chunk of Python objects.
+        buffer = self._buffer(table, columns)
+        n_rows = len(next(iter(columns.values())))
+        for start in range(0, max(n_rows, 1), self.chunk_size):
+            for column, values in columns.items():
+                values = values[start:start + self.chunk_size]
+                buffer[column].extend(values.tolist() if isinstance(values, np.ndarray) else values)
+            if len(buffer[next(iter(buffer))]) >= self.chunk_size:
+                self._flush_table(table)
+
+    def flush(self):
+        for table in self._buffers:
+            self._flush_table(table)
+
+    def close(self):
+        self.flush()
+        for table in self.tables:
+            self._close_table(table)
+        write_json(os.path.join(self.directory, 'manifest.json'), self._manifest())
+
+    def checkpoint(self) -> Dict[str, Any]:
+        # Everything written so far is flushed and the end of every table is
+        # recorded, so restore() can drop rows written after the checkpoint.
+        self.flush()
+        return {'tables': copy.deepcopy(self.tables), 'positions': self._positions()}
+
+    def restore(self, state: Dict[str, Any]):
+        self.tables = copy.deepcopy(state['tables'])
+        self._buffers = {table: {column: [] for column in info['columns']} for table, info in self.tables.items()}
+        self._restore_positions(state['positions'])
+
+    def path(self, table: str) -> str:
+        return os.path.join(self.directory, f"{table}.{self.extension}")
+
+    def _manifest(self) -> Dict[str, Any]:
+        return {'format': self.extension, 'tables': self.tables}
+
+    def _positions(self) -> Dict[str, Any]:
+        return {}
+
+    def _restore_positions(self, positions: Dict[str, Any]):
+        raise NotImplementedError(f"{type(self).__name__} output cannot be resumed")
+
+    def _buffer(self, table: str, row: Dict[str, Any]) -> Dict[str, List]:
+        if table not in self._buffers:
+            self._buffers[table] = {column: [] for column in row}
+            self.tables[table] = {'columns': list(row), 'nested': [], 'rows': 0}
+        return self._buffers[table]
+
+    def _flush_table(self, table: str):
+        buffer = self._buffers[table]
+        n_rows = len(buffer[next(iter(buffer))]) if buffer else 0
+        if not n_rows:
+            return
+        info = self.tables[table]
+        for column, values in buffer.items():
+            if column not in info['nested'] and isinstance(values[0], (dict, list)):
+                info['nested'].append(column)
+        self._write_chunk(table, buffer, n_rows)
+        info['rows'] += n_rows
+        for values in buffer.values():
+            values.clear()
+
+    def _encoded(self, table: str, column: str, values: List) -> List:
+        if column in self.tables[table]['nested']:
+            return [json.dumps(value) for value in values]
+        return values
+
+    def _write_chunk(self, table: str, columns: Dict[str, List], n_rows: int):
+        raise NotImplementedError("Subclasses must implement _write_chunk")
+
+    def _close_table(self, table: str):
+        pass
+
+
+class JSONSink(Sink):
+    extension = 'json'
+
+    def __init__(self, directory: str, chunk_size: int = 4096):
+        super().__init__(directory, chunk_size)
+        self._files = {}
+
+    def _write_chunk(self, table: str, columns: Dict[str, List], n_rows: int):
+        if table not in self._files:
+            self._files[table] = open(self.path(table), 'w')
+            self._files[table].write('[\n')
+        else:
+            self._files[table].write(',\n')
+        names = list(columns)
+        self._files[table].write(',\n'.join(
+            json.dumps(dict(zip(names, values))) for values in zip(*columns.values())
+        ))
+
+    def _close_table(self, table: str):
+        if table not in self._files:
+            with open(self.path(table), 'w') as f:
+                f.write('[]')
+            return
+        f = self._files.pop(table)
+        f.write('\n]\n')
+        f.close()
+
+    def _positions(self) -> Dict[str, Any]:
+        return {table: _sync(f) for table, f in self._files.items()}
+
+    def _restore_positions(self, positions: Dict[str, Any]):
+        for table, position in positions.items():
+            self._files[table] = _reopen(self.path(table), position)
+
+
+class JSONLinesSink(Sink):
+    extension = 'jsonl'
+
+    def __init__(self, directory: str, chunk_size: int = 4096):
+        super().__init__(directory, chunk_size)
+        self._files = {}
+
+    def _write_chunk(self, table: str, columns: Dict[str, List], n_rows: int):
+        if table not in self._files:
+            self._files[table] = open(self.path(table), 'w')
+        names = list(columns)
+        self._files[table].writelines(
+            json.dumps(dict(zip(names, values))) + '\n' for values in zip(*columns.values())
+        )
+
+    def _close_table(self, table: str):
+        if table in self._files:
+            self._files.pop(table).close()
+
+    def _positions(self) -> Dict[str, Any]:
+        return {table: _sync(f) for table, f in self._files.items()}
+
+    def _restore_positions(self, positions: Dict[str, Any]):
+        for table, position in positions.items():
+            self._files[table] = _reopen(self.path(table), position)
+
+
+class CSVSink(Sink):
+    extension = 'csv'
+
+    def __init__(self, directory: str, chunk_size: int = 4096):
+        super().__init__(directory, chunk_size)
+        self._files = {}
+
+    def _write_chunk(self, table: str, columns: Dict[str, List], n_rows: int):
+        if table not in self._files:
+            f = open(self.path(table), 'w', newline='')
+            self._files[table] = (f, csv.writer(f))
+            self._files[table][1].writerow(list(columns))
+        encoded = [self._encoded(table, column, values) for column, values in columns.items()]
+        self._files[table][1].writerows(zip(*encoded))
+
+    def _close_table(self, table: str):
+        if table in self._files:
+            self._files.pop(table)[0].close()
+
+    def _positions(self) -> Dict[str, Any]:
+        return {table: _sync(f) for table, (f, _) in self._files.items()}
+
+    def _restore_positions(self, positions: Dict[str, Any]):
+        for table, position in positions.items():
+            f = _reopen(self.path(table), position, newline='')
+            self._files[table] = (f, csv.writer(f))
+
+
+class ParquetSink(Sink):
+    extension = 'parquet'
+
+    def __init__(self, directory: str, chunk_size: int = 4096):
+        if pa is None:
+            raise ImportError("The parquet sink requires pyarrow (pip install pyarrow)")
+        super().__init__(directory, chunk_size)
+        self._writers = {}
+
+    def _write_chunk(self, table: str, columns: Dict[str, List], n_rows: int):
+        batch = pa.table({
+            column: self._encoded(table, column, values) for column, values in columns.items()
+        })
+        if table not in self._writers:
+            self._writers[table] = pq.ParquetWriter(self.path(table), batch.schema)
+        self._writers[table].write_table(batch.cast(self._writers[table].schema))
+
+    def _close_table(self, table: str):
+        if table in self._writers:
+            self._writers.pop(table).close()
+
+
+class NpySink(Sink):
+    extension = 'npy'
+
+    def __init__(self, directory: str, chunk_size: int = 4096):
+        super().__init__(directory, chunk_size)
+        self._chunks = {}
+
+    def path(self, table: str) -> str:
+        return os.path.join(self.directory, table)
+
+    def _write_chunk(self, table: str, columns: Dict[str, List], n_rows: int):
+        os.makedirs(self.path(table), exist_ok=True)
+        chunk = self._chunks[table] = self._chunks.get(table, -1) + 1
+        for column, values in columns.items():
+            np.save(os.path.join(self.path(table), f"{column}.{chunk:06d}.npy"),
+                    np.asarray(self._encoded(table, column, values)))
+
+    def _positions(self) -> Dict[str, Any]:
+        return dict(self._chunks)
+
+    def _restore_positions(self, positions: Dict[str, Any]):
+        self._chunks = dict(positions)
+        for path in glob.glob(os.path.join(self.directory, '*', '*.npy')):
+            table = os.path.basename(os.path.dirname(path))
+            if int(path.rsplit('.', 2)[1]) > self._chunks.get(table, -1):
+                os.remove(path)
+
+
+class SQLiteSink(Sink):
+    # Appends every table to one SQLite database shared by many runs, with a
+    # run_id column and a row per run in the "runs" table. The run directory
+    # only gets the manifest, which points at the database. By default the
+    # database is results.sqlite next to the run directory, and the run id is
+    # the run directory's path relative to the database.
+    extension = 'sqlite'
+
+    def __init__(self, directory: str, chunk_size: int = 4096, database: Optional[str] = None,
+                 run_id: Optional[str] = None, config_hash: Optional[str] = None,
+                 params: Optional[Dict[str, Any]] = None):
+        super().__init__(directory, chunk_size)
+        self.database = database or os.path.join(os.path.dirname(os.path.abspath(directory)), DATABASE_FILE)
+        self.run_id = run_id or run_key(directory, self.database)
+        self._connection = connect_database(self.database)
+        self._started = set()
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO runs (run_id, config_hash, directory, created, params) VALUES (?, ?, ?, ?, ?)",
+                (self.run_id, config_hash, os.path.abspath(directory), datetime.now().isoformat(),
+                 json.dumps(params or {}))
+            )
+
+    def _write_chunk(self, table: str, columns: Dict[str, List], n_rows: int):
+        encoded = {column: self._encoded(table, column, values) for column, values in columns.items()}
+        with self._connection:
+            if table not in self._started:
+                # A rerun of a run id replaces its rows.
+                create_table(self._connection, table, encoded)
+                self._connection.execute(f'DELETE FROM "{table}" WHERE run_id = ?', (self.run_id,))
+                self._started.add(table)
+            insert_rows(self._connection, table, self.run_id, encoded)
+
+    def close(self):
+        super().close()
+        self._connection.close()
+
+    def _manifest(self) -> Dict[str, Any]:
+        return {**super()._manifest(), 'database': os.path.relpath(self.database, self.directory),
+                'run_id': self.run_id}
+
+    def _positions(self) -> Dict[str, Any]:
+        return {
+            table: self._connection.execute(f'SELECT MAX(rowid) FROM "{table}" WHERE run_id = ?',
+                                            (self.run_id,)).fetchone()[0] or 0
+            for table in self._started
+        }
+
+    def _restore_positions(self, positions: Dict[str, Any]):
+        with self._connection:
+            for table in database_tables(self._connection):
+                self._connection.execute(f'DELETE FROM "{table}" WHERE run_id = ? AND rowid > ?',
+                                         (self.run_id, positions.get(table, 0)))
+        self._started = set(positions)
+
+
+def connect_database(database: str) -> sqlite3.Connection:
+    # WAL lets the runs of a sweep write to one database while it is read.
+    os.makedirs(os.path.dirname(os.path.abspath(database)), exist_ok=True)
+    connection = sqlite3.connect(database, timeout=60)
+    connection.execute("PRAGMA journal_mode=WAL")
+    with connection:
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS runs "
+            "(run_id TEXT PRIMARY KEY, config_hash TEXT, directory TEXT, created TEXT, params TEXT)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS runs_config_hash ON runs (config_hash)")
+    return connection
+
+
+def database_tables(connection: sqlite3.Connection) -> List[str]:
+    return [name for (name,) in connection.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name != 'runs'")]
+
+
+def _sqlite_type(value: Any) -> str:
+    if isinstance(value, (bool, int, np.integer)):
+        return 'INTEGER'
+    if isinstance(value, (float, np.floating)):
+        return 'REAL'
+    return 'TEXT'
+
+
+def create_table(connection: sqlite3.Connection, table: str, columns: Dict[str, List]):
+    # Creates the table and its indexes, or adds columns an older run did not
+    # have.
+    definitions = ', '.join(f'"{column}" {_sqlite_type(values[0])}' for column, values in columns.items())
+    connection.execute(f'CREATE TABLE IF NOT EXISTS "{table}" (run_id TEXT NOT NULL, {definitions})')
+    existing = [row[1] for row in connection.execute(f'PRAGMA table_info("{table}")')]
+    for column, values in columns.items():
+        if column not in existing:
+            connection.execute(f'ALTER TABLE "{table}" ADD COLUMN "{column}" {_sqlite_type(values[0])}')
+    id_columns = [column for column in SQLITE_INDEXES if column in columns]
+    if 'block' not in columns:
+        connection.execute(f'CREATE INDEX IF NOT EXISTS "{table}_run" ON "{table}" (run_id)')
+    elif not id_columns:
+        connection.execute(f'CREATE INDEX IF NOT EXISTS "{table}_run_block" ON "{table}" (run_id, block)')
+    for id_column in id_columns:
+        connection.execute(f'CREATE INDEX IF NOT EXISTS "{table}_run_block_{id_column}" '
+                           f'ON "{table}" (run_id, block, {id_column})')
+
+
+def insert_rows(connection: sqlite3.Connection, table: str, run_id: str, columns: Dict[str, List]):
+    names = ', '.join(f'"{column}"' for column in columns)
+    placeholders = ', '.join('?' * (len(columns) + 1))
+    connection.executemany(f'INSERT INTO "{table}" (run_id, {names}) VALUES ({placeholders})',
+                           zip(itertools.repeat(run_id), *columns.values()))
+
+
+def run_key(directory: str, database: str) -> str:
+    return os.path.relpath(os.path.abspath(directory), os.path.dirname(os.path.abspath(database))).replace(os.sep, '/')
+
+
+def _sync(f) -> int:
+    # Pushes a table file to disk so it holds at least the checkpointed rows
+    # if the process dies later.
+    f.flush()
+    os.fsync(f.fileno())
+    return f.tell()
+
+
+def _reopen(path: str, position: int, **kwargs):
+    # Reopens a table file for appending after cutting it back to position.
+    f = open(path, 'r+', **kwargs)
+    f.seek(position)
+    f.truncate()
+    return f
+
+
+SINKS = {
+    'json': JSONSink,
+    'jsonl': JSONLinesSink,
+    'csv': CSVSink,
+    'parquet': ParquetSink,
+    'npy': NpySink,
+    'sqlite': SQLiteSink,
+}
+
+
+def make_sink(output_format: str, directory: str, **kwargs) -> Sink:
+    if output_format not in SINKS:
+        raise ValueError(f"Unknown output format '{output_format}', expected one of {list(SINKS)}")
+    return SINKS[output_format](directory, **kwargs)
+
+
+def _read_npy(directory: str, table: str, columns: List[str]) -> pd.DataFrame:
+    return pd.DataFrame({
+        column: np.concatenate([
+            np.load(path) for path in sorted(glob.glob(os.path.join(directory, table, f"{column}.*.npy")))
+        ])
+        for column in columns
+    })
+
+
+def read_run_table(database: str, run_id: str, table: str, columns: List[str]) -> pd.DataFrame:
+    connection = sqlite3.connect(database, timeout=60)
+    try:
+        names = ', '.join(f'"{column}"' for column in columns)
+        return pd.read_sql_query(f'SELECT {names} FROM "{table}" WHERE run_id = ? ORDER BY rowid',
+                                 connection, params=(run_id,))
+    finally:
+        connection.close()
+
+
+def read_table(directory: str, table: str) -> pd.DataFrame:
+    manifest_path = os.path.join(directory, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        path = os.path.join(directory, f"{table}.json")
+        return pd.DataFrame(read_json(path) if os.path.exists(path) else [])
+
+    manifest = read_json(manifest_path)
+    info: Optional[Dict[str, Any]] = manifest['tables'].get(table)
+    if not info or not info['rows']:
+        return pd.DataFrame(columns=info['columns'] if info else [])
+
+    output_format = manifest['format']
+    path = os.path.join(directory, f"{table}.{output_format}")
+    if output_format == 'json':
+        return pd.DataFrame(read_json(path))
+    if output_format == 'jsonl':
+        with open(path) as f:
+            return pd.DataFrame([json.loads(line) for line in f])
+
+    if output_format == 'csv':
+        df = pd.read_csv(path)
+    elif output_format == 'parquet':
+        df = pd.read_parquet(path)
+    elif output_format == 'sqlite':
+        df = read_run_table(os.path.join(directory, manifest['database']), manifest['run_id'], table,
+                            info['columns'])
+    else:
+        df = _read_npy(directory, table, info['columns'])
+    for column in info['nested']:
+        df[column] = [json.loads(value) for value in df[column]]
+    return df
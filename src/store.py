@@ -0,0 +1,184 @@
+import argparse
+import dataclasses
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from .log_policies import LOG_TABLES
+from .sinks import (DATABASE_FILE, connect_database, create_table, database_tables, insert_rows,
+                    read_table, run_key)
+from .utils import read_json
+
+# Config keys that only decide where and how a run is written, not what it
+# simulates; they are left out of the config hash and the run parameters.
+OUTPUT_KEYS = ('run_id', 'output_dir', 'output_format', 'database', 'chunk_size', 'checkpoint_interval',
+               'resume', 'fork_from', 'profile', 'progress_interval', 'live', 'headless')
+# Run ids per query, below SQLite's limit on bound parameters.
+QUERY_RUNS = 500
+INGEST_ROWS = 1 << 16
+
+
+def _canonical(value: Any) -> Any:
+    # Plain-data form of a config value for hashing. Arrays are reduced to a
+    # digest of their bytes, and objects to their public attributes.
+    if isinstance(value, (str, bool, int, float)) or value is None:
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return {'dtype': str(value.dtype), 'shape': list(value.shape),
+                'sha1': hashlib.sha1(np.ascontiguousarray(value).tobytes()).hexdigest()}
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if dataclasses.is_dataclass(value):
+        return {'type': type(value).__name__,
+                **{field.name: _canonical(getattr(value, field.name)) for field in dataclasses.fields(value)}}
+    if callable(value) and hasattr(value, '__qualname__'):
+        return f"{value.__module__}.{value.__qualname__}"
+    if hasattr(value, '__dict__'):
+        return {'type': type(value).__name__,
+                **{key: _canonical(item) for key, item in vars(value).items() if not key.startswith('_')}}
+    return repr(value)
+
+
+def config_hash(config: Dict[str, Any]) -> str:
+    canonical = {key: _canonical(value) for key, value in config.items() if key not in OUTPUT_KEYS}
+    return hashlib.sha1(json.dumps(canonical, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def config_params(config: Dict[str, Any]) -> Dict[str, Any]:
+    # The scalar config values, stored with each run to select runs by.
+    return {key: value for key, value in config.items()
+            if key not in OUTPUT_KEYS and (isinstance(value, (str, bool, int, float)) or value is None)}
+
+
+class ResultStore:
+    # Query side of the database SQLiteSink writes: any table of any set of
+    # runs, filtered in SQL so only the matching rows are loaded. Tables with
+    # a block column are indexed on (run_id, block, account_id) and/or
+    # (run_id, block, subnet_id).
+    def __init__(self, database: str = os.path.join('data', DATABASE_FILE)):
+        if os.path.isdir(database):
+            database = os.path.join(database, DATABASE_FILE)
+        self.database = database
+        self.connection = connect_database(database)
+
+    def runs(self, prefix: Optional[str] = None, config_hash: Optional[str] = None, **params) -> pd.DataFrame:
+        # One row per run with its parameters as columns. prefix selects run
+        # ids starting with it, e.g. a sweep's directory.
+        conditions, values = [], []
+        if prefix is not None:
+            conditions.append("substr(run_id, 1, ?) = ?")
+            values += [len(prefix), prefix]
+        if config_hash is not None:
+            conditions.append("config_hash = ?")
+            values.append(config_hash)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        runs = pd.read_sql_query(f"SELECT * FROM runs{where} ORDER BY run_id", self.connection, params=values)
+        runs = runs.join(pd.DataFrame([json.loads(p) for p in runs.pop('params')], index=runs.index))
+        for key, value in params.items():
+            runs = runs[runs[key] == value] if key in runs else runs.iloc[:0]
+        return runs.reset_index(drop=True)
+
+    def tables(self) -> List[str]:
+        return database_tables(self.connection)
+
+    def query(self, table: str, columns: Optional[List[str]] = None, run_ids: Optional[Sequence[str]] = None,
+              blocks: Optional[Tuple[int, int]] = None, **filters) -> pd.DataFrame:
+        # Rows of table for run_ids (default: every run), with run_id as the
+        # first column. blocks is a [start, stop) range; filters match a
+        # column against a value or a list of values, e.g. account_id=1.
+        run_ids = self.runs()['run_id'].tolist() if run_ids is None else list(run_ids)
+        names = ', '.join(['run_id', *(f'"{column}"' for column in columns)]) if columns else '*'
+        conditions, values = [], []
+        if blocks is not None:
+            conditions.append("block >= ? AND block < ?")
+            values += list(blocks)
+        for column, value in filters.items():
+            if isinstance(value, (list, tuple, np.ndarray)):
+                conditions.append(f'"{column}" IN ({", ".join("?" * len(value))})')
+                values += list(value)
+            else:
+                conditions.append(f'"{column}" = ?')
+                values.append(value)
+
+        frames = []
+        for start in range(0, len(run_ids), QUERY_RUNS):
+            chunk = run_ids[start:start + QUERY_RUNS]
+            where = ' AND '.join([f"run_id IN ({', '.join('?' * len(chunk))})", *conditions])
+            frames.append(pd.read_sql_query(f'SELECT {names} FROM "{table}" WHERE {where} ORDER BY run_id, rowid',
+                                            self.connection, params=[*chunk, *values]))
+        if not frames:
+            return pd.DataFrame(columns=['run_id', *columns] if columns else ['run_id'])
+        return pd.concat(frames, ignore_index=True)
+
+    def compare(self, table: str, value: str, run_ids: Optional[Sequence[str]] = None,
+                blocks: Optional[Tuple[int, int]] = None, **filters) -> pd.DataFrame:
+        # One column of value per run, indexed by block. The filters must leave
+        # one row per run and block, e.g. compare('accounts', 'market_value',
+        # account_id=1).
+        df = self.query(table, ['block', value], run_ids, blocks, **filters)
+        return df.pivot(index='block', columns='run_id', values=value)
+
+    def ingest(self, directory: str, run_id: Optional[str] = None, config_hash: Optional[str] = None,
+               params: Optional[Dict[str, Any]] = None) -> str:
+        # Copies a run directory written in any output format, or the JSON
+        # files of the old single-run layout, into the store.
+        run_id = run_id or run_key(directory, self.database)
+        manifest_path = os.path.join(directory, 'manifest.json')
+        tables = list(read_json(manifest_path)['tables']) if os.path.exists(manifest_path) else [*LOG_TABLES, 'trades']
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO runs (run_id, config_hash, directory, created, params) VALUES (?, ?, ?, ?, ?)",
+                (run_id, config_hash, os.path.abspath(directory), pd.Timestamp.now().isoformat(),
+                 json.dumps(params or {}))
+            )
+            for table in tables:
+                df = read_table(directory, table)
+                if df.empty:
+                    continue
+                for column in df.columns:
+                    if isinstance(df[column].iloc[0], (dict, list)):
+                        df[column] = [json.dumps(value) for value in df[column]]
+                for start in range(0, len(df), INGEST_ROWS):
+                    rows = df.iloc[start:start + INGEST_ROWS]
+                    columns = {column: rows[column].tolist() for column in rows.columns}
+                    if not start:
+                        create_table(self.connection, table, columns)
+                        self.connection.execute(f'DELETE FROM "{table}" WHERE run_id = ?', (run_id,))
+                    insert_rows(self.connection, table, run_id, columns)
+        return run_id
+
+    def delete(self, run_id: str):
+        with self.connection:
+            for table in self.tables():
+                self.connection.execute(f'DELETE FROM "{table}" WHERE run_id = ?', (run_id,))
+            self.connection.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+
+    def close(self):
+        self.connection.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Import run directories into a result store or list its runs')
+    parser.add_argument('data_dirs', nargs='*', help='Run directories to import, e.g. data/sweeps/<id>/point-*/output')
+    parser.add_argument('--database', default=os.path.join('data', DATABASE_FILE), help='SQLite result store')
+    parser.add_argument('--prefix', default=None, help='Only list runs whose id starts with this')
+    args = parser.parse_args(argv)
+
+    store = ResultStore(args.database)
+    for data_dir in args.data_dirs:
+        run_id = store.ingest(data_dir)
+        print(f"Imported {data_dir} as {run_id}")
+    if not args.data_dirs:
+        with pd.option_context('display.width', 200, 'display.max_columns', 20):
+            print(store.runs(args.prefix).to_string(index=False))
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
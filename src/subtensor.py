@@ -1,55 +1,181 @@
-from typing import List, Dict
+import bisect
+import os
+import time
+from typing import Any, Iterator, List, Dict, Optional, Tuple, Union
 from collections import defaultdict
-from .models import Subnet, Account, Trade
+from .models import Subnet, Account, BlockResult
+from .accounts import AccountStore
+from .sinks import Sink, JSONLinesSink, new_run_id
+from .checkpoints import checkpoint_path, latest_checkpoint, read_checkpoint, write_checkpoint
+from .trades import TradeBook, BUY, SELL, resolve_amount, trade_row
+from .schedules import TradeSchedule, split_trades
+from .log_policies import LOG_TABLES, Fixed, LogPolicy, log_groups
+from .profiling import PhaseTimer
 from .utils import write_json
 
 
 class Subtensor:
-    def __init__(self, subnets: List[Subnet], accounts: List[Account],
-                 trades: List[Trade], tao_supply: float, global_split: float,
+    # Methods timed when profiling is on, and the phase each one is charged to.
+    PROFILE_PHASES = {
+        '_execute_trade': 'trades',
+        '_calculate_emission': 'emission',
+        '_global_weights': 'weights',
+        '_calculate_dividends': 'dividends',
+        '_advance': 'fast_forward',
+        '_log_state': 'logging',
+        'save_checkpoint': 'checkpoints',
+    }
+    SINK_PHASES = {
+        '_flush_table': 'write',
+        'close': 'write',
+    }
+    # Engines that set this run trade-book rows inside _advance themselves, so
+    # trade blocks are not visited one by one, whatever the mode.
+    batches_trades = False
+
+    def __init__(self, subnets: List[Subnet], accounts: Union[List[Account], AccountStore],
+                 trades: Union[TradeBook, List[Any]], tao_supply: float, global_split: float,
                  balanced: bool, root_weight: float, blocks: int,
-                 n_steps: int):
+                 n_steps: int, mode: str = 'block', sink: Optional[Sink] = None,
+                 checkpoint_interval: Optional[int] = None, profile: bool = False,
+                 progress_interval: Optional[float] = None,
+                 log_policy: Union[LogPolicy, Dict[str, LogPolicy], None] = None):
+        if mode not in ('block', 'event'):
+            raise ValueError(f"Unknown mode '{mode}', expected 'block' or 'event'")
+        if n_steps < 1:
+            raise ValueError(f"n_steps must be >= 1, got {n_steps}")
+        if checkpoint_interval is not None and checkpoint_interval < 1:
+            raise ValueError(f"checkpoint_interval must be >= 1, got {checkpoint_interval}")
         self.subnets = {s.id: s for s in subnets}
-        self.accounts = {a.id: a for a in accounts}
-        self.trade_blocks = self._organize_trades(trades)
+        if isinstance(accounts, AccountStore):
+            accounts.add_subnets(list(self.subnets))
+        self.accounts = accounts if isinstance(accounts, AccountStore) else {a.id: a for a in accounts}
+        self.trades, self.schedules = split_trades(trades)
         self.tao_supply = tao_supply
         self.global_split = global_split
         self.balanced = balanced
+        self._weights = None
+        self._index_stakers()
         self.initial_root_weight = root_weight
         self.root_weight = root_weight
         self.blocks = blocks
-        self.log_interval = int(blocks/n_steps)
+        # With more steps than blocks, every block is logged.
+        self.log_interval = max(blocks // n_steps, 1)
+        self.log_groups = log_groups(log_policy, Fixed(self.log_interval))
+        self.last_trade_block = None
+        self.result_block = None
+        self._step_sum_prices = 0.0
+        self._step_emission = {}
+        self._step_dividends = {}
+        self.mode = mode
+        self.sink = sink if sink is not None else JSONLinesSink(os.path.join('data', new_run_id()))
+        self.output_dir = self.sink.directory
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoint_dir = os.path.join(self.output_dir, 'checkpoints')
+        self.start_block = 0
+        self.stop_requested = False
+        self.progress_interval = progress_interval
+        self.profiler = PhaseTimer() if profile else None
+        if self.profiler:
+            self.profiler.wrap_all(self, self.PROFILE_PHASES)
+            self.profiler.wrap_all(self.sink, self.SINK_PHASES)
 
-    def _organize_trades(self, trades: List[Trade]) -> Dict[int, List[Trade]]:
-        trade_dict = defaultdict(list)
-        for trade in trades:
-            trade_dict[trade.block].append(trade)
-        return dict(trade_dict)
+    @property
+    def root_weight(self) -> float:
+        return self._root_weight
 
-    def _parse_amount(self, amount: str, total: float) -> float:
-        if amount == 'all':
-            return total
-        if '%' in amount:
-            return total * float(amount.strip('%')) / 100
-        return float(amount)
+    @root_weight.setter
+    def root_weight(self, value: float):
+        if getattr(self, '_root_weight', None) != value:
+            self._root_weight = value
+            for subnet in self.subnets.values():
+                if subnet.is_root:
+                    self._invalidate_weights(subnet.id)
 
     def _update_root_weight(self, current_block: int):
         weight_decrease_per_block = self.initial_root_weight / self.blocks
         self.root_weight = max(0.0, self.initial_root_weight - (current_block * weight_decrease_per_block))
 
+    def free_balance_of(self, account_id: int) -> float:
+        return self.accounts[account_id].free_balance
+
+    def alpha_stake_of(self, account_id: int, subnet_id: int) -> float:
+        return self.accounts[account_id].alpha_stakes.get(subnet_id, 0.0)
+
+    def alpha_price_of(self, subnet_id: int) -> float:
+        return self.subnets[subnet_id].alpha_price()
+
+    def market_value_of(self, account_id: int) -> float:
+        account = self.accounts[account_id]
+        return (
+            account.free_balance +
+            sum(
+                account.alpha_stakes.get(subnet.id, 0.0) if subnet.is_root
+                else (subnet.tao_in - (subnet.k / (subnet.alpha_in + account.alpha_stakes.get(subnet.id, 0.0))))
+                for subnet in self.subnets.values()
+                if account.alpha_stakes.get(subnet.id, 0.0) > 0
+            )
+        )
+
+    def _next_event(self, block: int) -> Optional[int]:
+        if block >= self.blocks:
+            return None
+        candidates = [
+            *(policy.next_block(block, self) for policy, _ in self.log_groups),
+            self.blocks - 1,
+            -(-(block + 1) // self.checkpoint_interval) * self.checkpoint_interval - 1
+            if self.checkpoint_interval else None,
+            None if self.batches_trades else self.trades.next_block(block),
+            *(schedule.next_block(block) for schedule in self._event_schedules())
+        ]
+        return min(c for c in candidates if c is not None)
+
+    def _event_schedules(self) -> List[TradeSchedule]:
+        # Schedules whose trade blocks have to be visited one by one.
+        return self.schedules
+
+    def _event_blocks(self) -> Iterator[int]:
+        # Generated lazily so schedules can decide their next block from the
+        # state left by the previous event.
+        block = self._next_event(self.start_block)
+        while block is not None:
+            yield block
+            block = self._next_event(block + 1)
+
+    def _advance(self, block: int, n_blocks: int):
+        for _ in range(n_blocks):
+            self._process_block_step()
+
     def run_simulation(self):
-        accounts_data = []
-        subnets_data = []
-        trades_data = []
-        subtensor_data = []
+        # In event mode only trade, schedule, log and checkpoint blocks are visited;
+        # the blocks in between are handed to _advance, which engines may batch.
+        event = self.mode == 'event' or self.batches_trades
+        blocks = self._event_blocks() if event else range(self.start_block, self.blocks)
+        next_block = self.start_block
+        started = time.perf_counter()
+        next_report = started + (self.progress_interval or 0)
 
-        for block in range(self.blocks):
+        for block in blocks:
+            if block > next_block:
+                self.result_block = None
+                self._advance(next_block, block - next_block)
+            next_block = block + 1
             #self._update_root_weight(block)
 
-            if block in self.trade_blocks:
-                for trade in self.trade_blocks[block]:
-                    self._execute_trade(trade)
-                    trades_data.append({
+            start, stop = self.trades.range(block)
+            if stop > start:
+                for account_id, subnet_id, action, kind, value in self.trades.rows(start, stop):
+                    self._execute_trade(account_id, subnet_id, action, kind, value)
+                self.sink.write_columns("trades", self.trades.columns(start, stop))
+                self.last_trade_block = block
+
+            for schedule in self.schedules:
+                if schedule.next_block(block) != block:
+                    continue
+                for trade in schedule.trades(block, self):
+                    self.last_trade_block = block
+                    self._execute_trade(*trade_row(trade))
+                    self.sink.write("trades", {
                         "block": block,
                         "account_id": trade.account_id,
                         "subnet_id": trade.subnet_id,
@@ -58,19 +184,153 @@ class Subtensor:
                     })
 
             self._process_block_step()
+            self.result_block = block
+
+            logged = self._log_tables(block, block == self.blocks - 1)
+            if logged:
+                self._log_state(block, logged)
+
+            if self.checkpoint_interval and (block + 1) % self.checkpoint_interval == 0:
+                self.save_checkpoint(block)
+
+            if self.progress_interval and time.perf_counter() >= next_report:
+                self._report_progress(block, started)
+                next_report = time.perf_counter() + self.progress_interval
+
+            if self.stop_requested:
+                # The output ends with the state at the block the run stopped on.
+                missing = tuple(table for table in self._final_tables() if table not in logged)
+                if missing:
+                    self._log_state(block, missing)
+                print(f"Stopped after block {block}")
+                break
+
+        self.sink.close()
+        if self.profiler:
+            self._write_profile(next_block - self.start_block, time.perf_counter() - started)
+
+    @property
+    def block_result(self) -> Optional[BlockResult]:
+        # The result of the last block the loop visited. It is None before the
+        # first one and while a batched range between visited blocks runs.
+        if self.result_block is None:
+            return None
+        return self._block_result(self.result_block)
+
+    def _block_result(self, block: int) -> BlockResult:
+        return BlockResult(
+            block=block,
+            sum_prices=self._step_sum_prices,
+            injected_tao=self._step_sum_prices < 1.0 or not self.balanced,
+            emission=dict(self._step_emission),
+            dividends={subnet_id: dict(dividends) for subnet_id, dividends in self._step_dividends.items()},
+        )
+
+    def _log_tables(self, block: int, final: bool) -> Tuple[str, ...]:
+        tables = ()
+        for policy, group in self.log_groups:
+            if policy.should_log(block, self) or (final and policy.log_final):
+                tables += group
+        return tables
+
+    def _final_tables(self) -> Tuple[str, ...]:
+        return tuple(table for policy, group in self.log_groups if policy.log_final for table in group)
+
+    def stop(self):
+        # Safe to call from another thread; the run ends after its current block.
+        self.stop_requested = True
+
+    def _report_progress(self, block: int, started: float):
+        done = block + 1 - self.start_block
+        rate = done / (time.perf_counter() - started)
+        eta = (self.blocks - block - 1) / rate
+        print(f"Block {block + 1}/{self.blocks}: {rate:.1f} blocks/s, ETA {eta:.0f}s")
 
-            if block % self.log_interval == 0 or block == self.blocks - 1:
-                self._log_state(block, accounts_data, subnets_data, subtensor_data)
+    def _write_profile(self, blocks: int, elapsed: float):
+        # Phase times are exclusive, so whatever is left of the run's wall time
+        # (the block loop itself, schedules, pool updates) is reported as other.
+        phases = self.profiler.summary()
+        phases['other'] = {"seconds": elapsed - sum(p["seconds"] for p in phases.values()), "calls": 1}
+        write_json(os.path.join(self.output_dir, 'profile.json'), {
+            "engine": type(self).__name__,
+            "mode": self.mode,
+            "blocks": blocks,
+            "elapsed": elapsed,
+            "blocks_per_sec": blocks / elapsed if elapsed else None,
+            "phases": phases,
+        })
 
-        write_json("data/accounts.json", accounts_data)
-        write_json("data/subnets.json", subnets_data)
-        write_json("data/trades.json", trades_data)
-        write_json("data/subtensor.json", subtensor_data)
+    def save_checkpoint(self, block: int, path: Optional[str] = None) -> str:
+        # Holds the state after `block` has run; a restored run starts at
+        # block + 1. Trade books are not stored, the engine's own book is used.
+        self._sync_models()
+        path = path or checkpoint_path(self.checkpoint_dir, block)
+        write_checkpoint(path, {
+            "block": block,
+            "subnets": list(self.subnets.values()),
+            "accounts": self.accounts if isinstance(self.accounts, AccountStore) else list(self.accounts.values()),
+            "tao_supply": self.tao_supply,
+            "root_weight": self.root_weight,
+            "initial_root_weight": self.initial_root_weight,
+            "schedules": self.schedules,
+            "log_groups": self.log_groups,
+            "sink": self.sink.checkpoint(),
+            # The cached weight sums are kept as well: rebuilding them from
+            # scratch rounds differently and a resumed run would drift.
+            "weight_cache": None if self._weights is None else (
+                self._weights, self._weight_columns, self._column_totals, self._stale_columns),
+        })
+        return path
+
+    def restore_checkpoint(self, path: Optional[str] = None, fork: bool = False) -> int:
+        # Resuming (the default) picks up this run's schedules and cuts its
+        # output back to the checkpoint. A fork only takes the chain state and
+        # runs this engine's own trades into its own sink.
+        if path is None:
+            path = latest_checkpoint(self.checkpoint_dir)
+            if path is None:
+                raise FileNotFoundError(f"No checkpoints found in {self.checkpoint_dir}")
+        state = read_checkpoint(path)
+        subnets = {s.id: s for s in state["subnets"]}
+        accounts = state["accounts"]
+        if not isinstance(accounts, AccountStore):
+            accounts = {a.id: a for a in accounts}
+        if set(subnets) != set(self.subnets) or set(accounts) != set(self.accounts):
+            raise ValueError(f"Checkpoint {path} has different subnets or accounts than this simulation")
+
+        self.subnets = {subnet_id: subnets[subnet_id] for subnet_id in self.subnets}
+        if isinstance(accounts, AccountStore):
+            self.accounts = accounts
+        else:
+            self.accounts = {account_id: accounts[account_id] for account_id in self.accounts}
+        self._index_stakers()
+        self.tao_supply = state["tao_supply"]
+        self.initial_root_weight = state["initial_root_weight"]
+        self.root_weight = state["root_weight"]
+        self._weights = None
+        if state["weight_cache"] is not None:
+            self._weights, self._weight_columns, self._column_totals, self._stale_columns = state["weight_cache"]
+        if not fork:
+            self.schedules = state["schedules"]
+            self.log_groups = state.get("log_groups", self.log_groups)
+            self.sink.restore(state["sink"])
+        self._load_models()
+        self.start_block = state["block"] + 1
+        return self.start_block
+
+    def _sync_models(self):
+        pass
+
+    def _load_models(self):
+        pass
 
     def _process_block_step(self):
         emit = self._calculate_emission()
         sum_prices = sum(s.alpha_price() for s in self.subnets.values() if not s.is_root)
         emission_val = 1
+        self._step_sum_prices = sum_prices
+        self._step_emission = emit
+        self._step_dividends = {}
 
         if sum_prices < 1.0 or not self.balanced:
             self.tao_supply += emission_val
@@ -84,110 +344,182 @@ class Subtensor:
             alpha_amount = emission_val if sum_prices >= 1.0 and self.balanced else 0.0
 
             subnet.inject(tao_amount, alpha_amount, emission_val)
+            self._invalidate_weights(subnet.id)
 
-            dividends = self._calculate_dividends(subnet.id)
+            weights, total_global = self._global_weights()
+            dividends = self._calculate_dividends(subnet.id, weights, total_global)
+            self._step_dividends[subnet.id] = dividends
             for acc_id, div in dividends.items():
-                self.accounts[acc_id].alpha_stakes[subnet.id] = \
-                    self.accounts[acc_id].alpha_stakes.get(subnet.id, 0.0) + \
-                    div * emission_val
+                self._add_stake(self.accounts[acc_id], subnet.id, div * emission_val)
+            self._invalidate_weights(subnet.id)
 
-    def _execute_trade(self, trade: Trade):
-        account = self.accounts.get(trade.account_id)
-        subnet = self.subnets.get(trade.subnet_id)
+    def _execute_trade(self, account_id: int, subnet_id: int, action: int,
+                       amount_kind: int, amount_value: float):
+        account = self.accounts.get(account_id)
+        subnet = self.subnets.get(subnet_id)
         if not account or not subnet:
             return
+        self._invalidate_weights(subnet_id)
 
-        if trade.action == 'buy':
-            tao_amount = self._parse_amount(trade.amount, account.free_balance)
+        if action == BUY:
+            tao_amount = resolve_amount(amount_kind, amount_value, account.free_balance)
             alpha_bought = subnet.stake(tao_amount)
-            account.alpha_stakes[trade.subnet_id] = account.alpha_stakes.get(trade.subnet_id, 0.0) + alpha_bought
+            self._add_stake(account, subnet_id, alpha_bought)
             account.free_balance -= tao_amount
-        elif trade.action == 'sell':
-            alpha_amount = self._parse_amount(trade.amount, account.alpha_stakes.get(trade.subnet_id, 0.0))
+        elif action == SELL:
+            alpha_amount = resolve_amount(amount_kind, amount_value, account.alpha_stakes.get(subnet_id, 0.0))
             tao_bought = subnet.unstake(alpha_amount)
-            account.alpha_stakes[trade.subnet_id] = account.alpha_stakes.get(trade.subnet_id, 0.0) - alpha_amount
+            self._add_stake(account, subnet_id, -alpha_amount)
             account.free_balance += tao_bought
 
+    def _index_stakers(self):
+        # Reverse index from subnet to the accounts holding a stake entry on it,
+        # plus the accounts holding one anywhere, both kept in account order so
+        # weight sums add up in the same order as a scan over all accounts.
+        self._positions = {acc_id: i for i, acc_id in enumerate(self.accounts)}
+        self._stakers = {subnet_id: [] for subnet_id in self.subnets}
+        self._holders = []
+        for acc_id, account in self.accounts.items():
+            for subnet_id in account.alpha_stakes:
+                if subnet_id in self._stakers:
+                    self._stakers[subnet_id].append(acc_id)
+            if account.alpha_stakes:
+                self._holders.append(acc_id)
+
+    def _add_stake(self, account: Account, subnet_id: int, amount: float):
+        if subnet_id not in account.alpha_stakes:
+            if not account.alpha_stakes:
+                self._insert_staker(self._holders, account.id)
+            if subnet_id in self._stakers:
+                self._insert_staker(self._stakers[subnet_id], account.id)
+        account.alpha_stakes[subnet_id] = account.alpha_stakes.get(subnet_id, 0.0) + amount
+
+    def _insert_staker(self, stakers: List[int], account_id: int):
+        # Store-backed stakes drop out of alpha_stakes when they reach zero, so
+        # an account may come back while it is still indexed.
+        key = self._positions.__getitem__
+        i = bisect.bisect_left(stakers, key(account_id), key=key)
+        if i == len(stakers) or stakers[i] != account_id:
+            stakers.insert(i, account_id)
+
     def _calculate_emission(self) -> Dict[int, float]:
         emission = {s.id: s.tao_in for s in self.subnets.values() if not s.is_root}
         total = sum(emission.values())
         return {sid: e / total if total else 0.0 for sid, e in emission.items()}
 
-    def _calculate_dividends(self, subnet_id: int) -> Dict[int, float]:
+    def _calculate_dividends(self, subnet_id: int, weights: Optional[Dict[int, float]] = None,
+                             total_global: Optional[float] = None) -> Dict[int, float]:
         subnet = self.subnets.get(subnet_id)
         if not subnet:
             return {}
 
-        weights = self._calculate_weights()
-        local_weights = {
-            acc_id: subnet.weight(account.alpha_stakes.get(subnet_id, 0.0))
-            for acc_id, account in self.accounts.items()
-            if subnet_id in account.alpha_stakes
-        }
+        if weights is None:
+            weights, total_global = self._global_weights()
+        elif total_global is None:
+            total_global = sum(weights.values())
 
-        total_local = sum(local_weights.values())
-        total_global = sum(weights.values())
+        if subnet.is_root:
+            local_weights = {
+                acc_id: subnet.weight(self.accounts[acc_id].alpha_stakes[subnet_id])
+                for acc_id in self._stakers[subnet_id]
+            }
+            total_local = sum(local_weights.values())
+        else:
+            # A non-root subnet's local weights are its global weight column.
+            self._global_weights()
+            local_weights = self._weight_columns[subnet_id]
+            total_local = self._column_totals[subnet_id]
 
+        # Accounts without any stake entry have no weight and get nothing.
         return {
             acc_id: (
                 self.global_split * (weights.get(acc_id, 0.0) / total_global if total_global else 0.0) +
                 (1 - self.global_split) * (local_weights.get(acc_id, 0.0) / total_local if total_local else 0.0)
             )
-            for acc_id in self.accounts
+            for acc_id in self._holders
         }
 
     def _calculate_weights(self) -> Dict[int, float]:
-        weights = defaultdict(float)
-        for subnet in self.subnets.values():
-            for acc_id, account in self.accounts.items():
-                if subnet.id in account.alpha_stakes:
-                    alpha = account.alpha_stakes[subnet.id]
-                    weight = subnet.weight(alpha * self.root_weight if subnet.is_root else alpha)
-                    weights[acc_id] += weight
-        return dict(weights)
-
-    def _log_state(self, block: int, accounts_data: List, subnets_data: List, subtensor_data: List):
-        for account in self.accounts.values():
-            market_value = (
-                account.free_balance +
-                sum(
-                    account.alpha_stakes.get(subnet.id, 0.0) if subnet.is_root
-                    else (subnet.tao_in - (subnet.k / (subnet.alpha_in + account.alpha_stakes.get(subnet.id, 0.0))))
-                    for subnet in self.subnets.values()
-                    if account.alpha_stakes.get(subnet.id, 0.0) > 0
-                )
-            )
+        return dict(self._global_weights()[0])
 
-            accounts_data.append({
-                "block": block,
-                "account_id": account.id,
-                "free_balance": account.free_balance,
-                "market_value": market_value,
-                "alpha_stakes": account.alpha_stakes.copy(),
-            })
+    def _invalidate_weights(self, subnet_id: int):
+        if self._weights is not None:
+            self._stale_columns.add(subnet_id)
+
+    def _global_weights(self) -> Tuple[Dict[int, float], float]:
+        # Global weights are cached per subnet column; only columns whose stakes,
+        # pool or root_weight changed since the last call are recomputed.
+        if self._weights is None:
+            self._weights = defaultdict(float)
+            self._weight_columns = {}
+            self._column_totals = {}
+            self._stale_columns = set(self.subnets)
+
+        for subnet_id in self._stale_columns:
+            subnet = self.subnets[subnet_id]
+            column = {}
+            for acc_id in self._stakers[subnet_id]:
+                alpha = self.accounts[acc_id].alpha_stakes[subnet_id]
+                column[acc_id] = subnet.weight(alpha * self.root_weight if subnet.is_root else alpha)
 
-        current_emissions = self._calculate_emission()
+            for acc_id, weight in self._weight_columns.get(subnet_id, {}).items():
+                self._weights[acc_id] -= weight
+            for acc_id, weight in column.items():
+                self._weights[acc_id] += weight
+            self._weight_columns[subnet_id] = column
+            self._column_totals[subnet_id] = sum(column.values())
+        self._stale_columns.clear()
 
+        return self._weights, sum(self._column_totals.values())
+
+    def _log_state(self, block: int, tables: Tuple[str, ...] = LOG_TABLES):
+        if "accounts" in tables or "stakes" in tables:
+            for account in self.accounts.values():
+                if "accounts" in tables:
+                    self.sink.write("accounts", {
+                        "block": block,
+                        "account_id": account.id,
+                        "free_balance": account.free_balance,
+                        "market_value": self.market_value_of(account.id),
+                    })
+
+                if "stakes" in tables:
+                    for subnet_id, stake in account.alpha_stakes.items():
+                        if stake:
+                            self.sink.write("stakes", {
+                                "block": block,
+                                "account_id": account.id,
+                                "subnet_id": subnet_id,
+                                "alpha_stake": stake,
+                            })
+
+        # Emission shares and dividends are the ones the block step just paid
+        # out, so logging recomputes neither.
         for subnet in self.subnets.values():
-            if not subnet.is_root:
-                dividends = self._calculate_dividends(subnet.id)
-            else:
-                dividends = {}
-            
-            subnets_data.append({
-                "block": block,
-                "subnet_id": subnet.id,
-                "tao_in": subnet.tao_in,
-                "alpha_in": subnet.alpha_in,
-                "alpha_out": subnet.alpha_out,
-                "exchange_rate": subnet.alpha_price(),
-                "emission_rate": current_emissions.get(subnet.id, 0.0),
-                "dividends": dividends
-            })
+            if "subnets" in tables:
+                self.sink.write("subnets", {
+                    "block": block,
+                    "subnet_id": subnet.id,
+                    "tao_in": subnet.tao_in,
+                    "alpha_in": subnet.alpha_in,
+                    "alpha_out": subnet.alpha_out,
+                    "exchange_rate": subnet.alpha_price(),
+                    "emission_rate": self._step_emission.get(subnet.id, 0.0),
+                })
+
+            if "dividends" in tables:
+                for acc_id, dividend in self._step_dividends.get(subnet.id, {}).items():
+                    if dividend:
+                        self.sink.write("dividends", {
+                            "block": block,
+                            "account_id": acc_id,
+                            "subnet_id": subnet.id,
+                            "dividend": dividend,
+                        })
 
-            sum_prices = sum(s.alpha_price() for s in self.subnets.values() if not s.is_root)
-            subtensor_data.append({
+        if "subtensor" in tables:
+            self.sink.write("subtensor", {
                 "block": block,
                 "tao_supply": self.tao_supply,
-                "sum_prices": sum_prices
+                "sum_prices": sum(s.alpha_price() for s in self.subnets.values() if not s.is_root)
             })
@@ -0,0 +1,197 @@
+import argparse
+import copy
+import dataclasses
+import hashlib
+import importlib
+import itertools
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+import pandas as pd
+from .accounts import AccountStore
+from .batched import BatchedSubtensor
+from .simulation import create_subtensor
+from .sinks import DATABASE_FILE, make_sink, new_run_id
+from .utils import read_json, write_json
+
+
+def expand_grid(grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def point_id(params: Dict[str, Any]) -> str:
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+    return f"point-{digest[:12]}"
+
+
+def apply_params(config: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    # Plain keys replace config entries; "subnets.<id>.<attr>" and
+    # "accounts.<id>.<attr>" replace a field of one subnet or account.
+    config = copy.deepcopy(config)
+    for key, value in params.items():
+        parts = key.split('.')
+        if len(parts) == 1:
+            config[key] = value
+            continue
+        if len(parts) != 3 or parts[0] not in ('subnets', 'accounts'):
+            raise ValueError(f"Unknown sweep parameter '{key}'")
+        collection, item_id, attr = parts[0], int(parts[1]), parts[2]
+        items = config[collection]
+        if isinstance(items, AccountStore):
+            if item_id not in items:
+                raise ValueError(f"Sweep parameter '{key}' refers to unknown account {item_id}")
+            setattr(items[item_id], attr, value)
+            continue
+        matches = [i for i, item in enumerate(items) if item.id == item_id]
+        if not matches:
+            raise ValueError(f"Sweep parameter '{key}' refers to unknown {collection[:-1]} {item_id}")
+        # replace() re-runs __post_init__, so a subnet's k follows its new pool.
+        items[matches[0]] = dataclasses.replace(items[matches[0]], **{attr: value})
+    return config
+
+
+def summarize(subtensor) -> Dict[str, Any]:
+    summary = {"tao_supply": subtensor.tao_supply}
+    for subnet_id in subtensor.subnets:
+        summary[f"price_{subnet_id}"] = subtensor.alpha_price_of(subnet_id)
+    for account_id in subtensor.accounts:
+        summary[f"market_value_{account_id}"] = subtensor.market_value_of(account_id)
+    return summary
+
+
+def run_point(config: Dict[str, Any], params: Dict[str, Any], directory: str) -> Dict[str, Any]:
+    start = time.perf_counter()
+    output_dir = os.path.join(directory, 'output')
+    shutil.rmtree(output_dir, ignore_errors=True)
+    point_config = apply_params(config, params)
+    # With the sqlite output format, the points of a sweep share one database.
+    point_config['run_id'] = os.path.basename(directory)
+    point_config.setdefault('database', os.path.join(os.path.dirname(directory), DATABASE_FILE))
+    subtensor = create_subtensor(point_config, output_dir=output_dir)
+    subtensor.run_simulation()
+    summary = {
+        "point_id": os.path.basename(directory),
+        **params,
+        **summarize(subtensor),
+        "elapsed": time.perf_counter() - start,
+    }
+    write_json(os.path.join(directory, 'summary.json'), summary)
+    return summary
+
+
+def run_batch(config: Dict[str, Any], pending: List[Any], directory: str) -> Dict[str, Dict[str, Any]]:
+    # All pending points run in one BatchedSubtensor writing to
+    # <directory>/batch-<id>/, whose "scenario" column indexes scenarios.json.
+    start = time.perf_counter()
+    batch_dir = os.path.join(directory, f"batch-{new_run_id()}")
+    os.makedirs(batch_dir, exist_ok=True)
+    write_json(os.path.join(batch_dir, 'scenarios.json'), [pid for pid, _ in pending])
+    configs = [apply_params(config, params) for _, params in pending]
+    batch = BatchedSubtensor(configs, sink=make_sink(config.get('output_format', 'jsonl'), batch_dir))
+    batch.run_simulation()
+    elapsed = time.perf_counter() - start
+
+    summaries = {}
+    for b, (pid, params) in enumerate(pending):
+        summaries[pid] = {
+            "point_id": pid,
+            **params,
+            **summarize(batch.scenario(b)),
+            "elapsed": elapsed,
+        }
+        os.makedirs(os.path.join(directory, pid), exist_ok=True)
+        write_json(os.path.join(directory, pid, 'summary.json'), summaries[pid])
+    return summaries
+
+
+def run_sweep(config: Dict[str, Any], grid: Dict[str, List[Any]], directory: str,
+              max_workers: Optional[int] = None, batched: bool = False) -> pd.DataFrame:
+    # Each point runs in its own process and writes to <directory>/<point_id>/;
+    # points that already have a summary.json are not run again.
+    os.makedirs(directory, exist_ok=True)
+    points = expand_grid(grid)
+    write_json(os.path.join(directory, 'sweep.json'), {
+        "grid": grid,
+        "points": {point_id(params): params for params in points},
+    })
+
+    summaries = {}
+    pending = []
+    for params in points:
+        pid = point_id(params)
+        summary_path = os.path.join(directory, pid, 'summary.json')
+        if os.path.exists(summary_path):
+            summaries[pid] = read_json(summary_path)
+        else:
+            pending.append((pid, params))
+
+    if summaries:
+        print(f"Skipping {len(summaries)} completed points")
+
+    if pending and batched:
+        summaries.update(run_batch(config, pending, directory))
+        print(f"Ran {len(pending)} points as one batch in {summaries[pending[0][0]]['elapsed']:.1f}s")
+    elif pending:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(run_point, config, params, os.path.join(directory, pid)): pid
+                for pid, params in pending
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                pid = futures[future]
+                try:
+                    summaries[pid] = future.result()
+                    print(f"[{done}/{len(pending)}] {pid} finished in {summaries[pid]['elapsed']:.1f}s")
+                except Exception as e:
+                    print(f"[{done}/{len(pending)}] {pid} failed: {str(e)}")
+
+    results = pd.DataFrame([summaries[point_id(params)] for params in points if point_id(params) in summaries])
+    results.to_csv(os.path.join(directory, 'results.csv'), index=False)
+    return results
+
+
+def parse_value(value: str) -> Any:
+    if value.lower() in ('true', 'false'):
+        return value.lower() == 'true'
+    for convert in (int, float):
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+    return value
+
+
+def parse_grid(params: List[str]) -> Dict[str, List[Any]]:
+    grid = {}
+    for param in params:
+        key, _, values = param.partition('=')
+        if not values:
+            raise ValueError(f"Sweep parameter '{param}' must look like key=value1,value2")
+        grid[key.strip()] = [parse_value(value.strip()) for value in values.split(',')]
+    return grid
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Run a simulation config over a parameter grid')
+    parser.add_argument('simulation', help='Module holding the base config, e.g. simulations.example')
+    parser.add_argument('--param', action='append', default=[], metavar='KEY=V1,V2',
+                        help='Grid axis; repeat for more axes. KEY is a config key or subnets.<id>.<attr>')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--output-dir', default=os.path.join('data', 'sweeps'), help='Parent directory for sweeps')
+    parser.add_argument('--sweep-id', default=None, help='Reuse an id to resume an interrupted sweep')
+    parser.add_argument('--batched', action='store_true', help='Run all points in one batched engine')
+    args = parser.parse_args(argv)
+
+    config = importlib.import_module(args.simulation).config
+    directory = os.path.join(args.output_dir, args.sweep_id or new_run_id())
+    results = run_sweep(config, parse_grid(args.param), directory, args.workers, args.batched)
+    print(results.to_string(index=False))
+    print(f"Results written to {os.path.join(directory, 'results.csv')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from .models import Trade
+
+BUY = 0
+SELL = 1
+ACTIONS = ['buy', 'sell']
+
+AMOUNT_ABSOLUTE = 0
+AMOUNT_PERCENT = 1
+AMOUNT_ALL = 2
+
+
+@lru_cache(maxsize=4096)
+def parse_amount(amount: str) -> Tuple[int, float]:
+    if amount == 'all':
+        return AMOUNT_ALL, 0.0
+    if '%' in amount:
+        return AMOUNT_PERCENT, float(amount.strip('%'))
+    return AMOUNT_ABSOLUTE, float(amount)
+
+
+def resolve_amount(kind: int, value: float, total: float) -> float:
+    if kind == AMOUNT_ALL:
+        return total
+    if kind == AMOUNT_PERCENT:
+        return total * value / 100
+    return value
+
+
+def trade_row(trade: Trade) -> Tuple[int, int, int, int, float]:
+    kind, value = parse_amount(trade.amount)
+    action = ACTIONS.index(trade.action) if trade.action in ACTIONS else -1
+    return trade.account_id, trade.subnet_id, action, kind, value
+
+
+def format_amount(kind: int, value: float) -> str:
+    if kind == AMOUNT_ALL:
+        return 'all'
+    text = repr(float(value))
+    if text.endswith('.0'):
+        text = text[:-2]
+    return text + '%' if kind == AMOUNT_PERCENT else text
+
+
+class TradeBook:
+    # Struct-of-arrays trade schedule: one row per trade, sorted by block, with
+    # the distinct trade blocks and their row offsets as the lookup index.
+    def __init__(self, block: Sequence[int], account_id: Sequence[int], subnet_id: Sequence[int],
+                 action: Sequence[int], amount_kind: Sequence[int], amount_value: Sequence[float],
+                 actions: Optional[List[str]] = None):
+        self.actions = list(actions) if actions is not None else list(ACTIONS)
+        if self.actions[:len(ACTIONS)] != ACTIONS:
+            raise ValueError(f"Action vocabulary must start with {ACTIONS}")
+
+        block = np.asarray(block, dtype=np.int32)
+        order = None
+        if len(block) > 1 and np.any(block[1:] < block[:-1]):
+            order = np.argsort(block, kind='stable')
+
+        def column(values, dtype):
+            values = np.asarray(values, dtype=dtype)
+            if values.shape != block.shape:
+                raise ValueError("Trade book columns must have the same length")
+            return values[order] if order is not None else values
+
+        self.block = column(block, np.int32)
+        self.account_id = column(account_id, np.int32)
+        self.subnet_id = column(subnet_id, np.int32)
+        self.action = column(action, np.int8)
+        self.amount_kind = column(amount_kind, np.int8)
+        self.amount_value = column(amount_value, np.float64)
+
+        starts = np.flatnonzero(np.diff(self.block, prepend=self.block[:1] - 1)) if len(self.block) else \
+            np.zeros(0, dtype=np.int64)
+        self.trade_blocks = self.block[starts]
+        self.offsets = np.append(starts, len(self.block)).astype(np.int64)
+        self._cursor = 0
+
+    @classmethod
+    def from_trades(cls, trades: List[Trade]) -> 'TradeBook':
+        actions = list(ACTIONS)
+        codes = {action: code for code, action in enumerate(actions)}
+        amounts = {}
+        action = np.empty(len(trades), dtype=np.int8)
+        amount_kind = np.empty(len(trades), dtype=np.int8)
+        amount_value = np.empty(len(trades), dtype=np.float64)
+
+        for i, trade in enumerate(trades):
+            if trade.action not in codes:
+                codes[trade.action] = len(actions)
+                actions.append(trade.action)
+            if trade.amount not in amounts:
+                amounts[trade.amount] = parse_amount(trade.amount)
+            action[i] = codes[trade.action]
+            amount_kind[i], amount_value[i] = amounts[trade.amount]
+
+        return cls(
+            np.fromiter((t.block for t in trades), dtype=np.int32, count=len(trades)),
+            np.fromiter((t.account_id for t in trades), dtype=np.int32, count=len(trades)),
+            np.fromiter((t.subnet_id for t in trades), dtype=np.int32, count=len(trades)),
+            action, amount_kind, amount_value, actions
+        )
+
+    @classmethod
+    def concat(cls, books: List['TradeBook']) -> 'TradeBook':
+        # Rows of equal blocks keep the order of the books.
+        if len(books) == 1:
+            return books[0]
+        actions = list(ACTIONS)
+        for book in books:
+            actions += [action for action in book.actions if action not in actions]
+        codes = [np.array([actions.index(action) for action in book.actions], dtype=np.int8) for book in books]
+        return cls(
+            np.concatenate([book.block for book in books]),
+            np.concatenate([book.account_id for book in books]),
+            np.concatenate([book.subnet_id for book in books]),
+            np.concatenate([code[book.action] for code, book in zip(codes, books)]),
+            np.concatenate([book.amount_kind for book in books]),
+            np.concatenate([book.amount_value for book in books]),
+            actions
+        )
+
+    def save(self, path: str):
+        # Uncompressed, so loading is a plain read of each column.
+        np.savez(path, block=self.block, account_id=self.account_id, subnet_id=self.subnet_id,
+                 action=self.action, amount_kind=self.amount_kind, amount_value=self.amount_value,
+                 actions=np.array(self.actions))
+
+    @classmethod
+    def load(cls, path: str) -> 'TradeBook':
+        with np.load(path) as data:
+            return cls(data['block'], data['account_id'], data['subnet_id'], data['action'],
+                       data['amount_kind'], data['amount_value'], data['actions'].tolist())
+
+    def to_trades(self) -> List[Trade]:
+        return [
+            Trade(block=block, account_id=account_id, subnet_id=subnet_id,
+                  action=self.actions[action], amount=format_amount(kind, value))
+            for block, account_id, subnet_id, action, kind, value in zip(
+                self.block.tolist(), self.account_id.tolist(), self.subnet_id.tolist(),
+                self.action.tolist(), self.amount_kind.tolist(), self.amount_value.tolist())
+        ]
+
+    def __len__(self) -> int:
+        return len(self.block)
+
+    def __contains__(self, block: int) -> bool:
+        g = self._group(block)
+        return g < len(self.trade_blocks) and self.trade_blocks[g] == block
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in (
+            'block', 'account_id', 'subnet_id', 'action', 'amount_kind', 'amount_value',
+            'trade_blocks', 'offsets'))
+
+    def _group(self, block: int) -> int:
+        # Index of the first trade block >= block. Simulations scan blocks in
+        # ascending order, so the cached cursor or its successor almost always
+        # answers in O(1); anything else falls back to a binary search.
+        blocks = self.trade_blocks
+        n = len(blocks)
+        for g in (self._cursor, self._cursor + 1):
+            if g <= n and (g == 0 or blocks[g - 1] < block) and (g == n or blocks[g] >= block):
+                self._cursor = g
+                return g
+        self._cursor = int(np.searchsorted(blocks, block))
+        return self._cursor
+
+    def range(self, block: int) -> Tuple[int, int]:
+        g = self._group(block)
+        if g < len(self.trade_blocks) and self.trade_blocks[g] == block:
+            return int(self.offsets[g]), int(self.offsets[g + 1])
+        return 0, 0
+
+    def next_block(self, block: int) -> Optional[int]:
+        g = self._group(block)
+        return int(self.trade_blocks[g]) if g < len(self.trade_blocks) else None
+
+    def rows(self, start: int, stop: int) -> Iterator[Tuple[int, int, int, int, float]]:
+        return zip(self.account_id[start:stop].tolist(), self.subnet_id[start:stop].tolist(),
+                   self.action[start:stop].tolist(), self.amount_kind[start:stop].tolist(),
+                   self.amount_value[start:stop].tolist())
+
+    def columns(self, start: int, stop: int) -> Dict[str, Any]:
+        return {
+            "block": self.block[start:stop],
+            "account_id": self.account_id[start:stop],
+            "subnet_id": self.subnet_id[start:stop],
+            "action": [self.actions[code] for code in self.action[start:stop].tolist()],
+            "amount": [format_amount(kind, value) for kind, value in zip(
+                self.amount_kind[start:stop].tolist(), self.amount_value[start:stop].tolist())],
+        }
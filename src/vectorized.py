@@ -0,0 +1,415 @@
+from typing import Any, Dict, List, Optional, Tuple, Union
+import numpy as np
+from .models import Subnet, Account, BlockResult
+from .accounts import AccountStore
+from .sinks import Sink
+from .subtensor import Subtensor
+from .log_policies import LOG_TABLES, LogPolicy
+from .trades import TradeBook, BUY, SELL, resolve_amount
+
+# Fast-forward works on stacks of per-block subnet x subnet transition matrices;
+# chunks are sized so a stack stays around this many floats.
+FAST_FORWARD_BUDGET = 1 << 21
+FAST_FORWARD_MIN_BLOCKS = 8
+# Stakes and dividends are logged this many accounts at a time, which bounds
+# the size of the row index arrays for large populations.
+LOG_ACCOUNTS = 1 << 14
+
+
+class VectorizedSubtensor(Subtensor):
+    PROFILE_PHASES = {
+        '_execute_trade': 'trades',
+        '_inject': 'emission',
+        '_weight_factors': 'weights',
+        '_chained_dividends': 'dividends',
+        '_sequential_dividends': 'dividends',
+        '_fast_forward': 'fast_forward',
+        '_log_state': 'logging',
+        'save_checkpoint': 'checkpoints',
+    }
+
+    def __init__(self, subnets: List[Subnet], accounts: Union[List[Account], AccountStore],
+                 trades: Union[TradeBook, List[Any]], tao_supply: float, global_split: float,
+                 balanced: bool, root_weight: float, blocks: int,
+                 n_steps: int, mode: str = 'block', sink: Optional[Sink] = None,
+                 checkpoint_interval: Optional[int] = None, profile: bool = False,
+                 progress_interval: Optional[float] = None,
+                 log_policy: Union[LogPolicy, Dict[str, LogPolicy], None] = None):
+        super().__init__(subnets, accounts, trades, tao_supply, global_split,
+                         balanced, root_weight, blocks, n_steps, mode, sink, checkpoint_interval,
+                         profile, progress_interval, log_policy)
+        self.subnet_ids = np.array([s.id for s in subnets], dtype=np.int64)
+        self.subnet_index = {sid: j for j, sid in enumerate(self.subnet_ids.tolist())}
+        self.is_root = np.array([s.is_root for s in subnets], dtype=bool)
+        self.non_root = ~self.is_root
+        self.account_ids = np.array(list(self.accounts), dtype=np.int64)
+        self.account_index = {aid: i for i, aid in enumerate(self.account_ids.tolist())}
+        self._load_models()
+
+    def run_simulation(self):
+        super().run_simulation()
+        self._sync_models()
+
+    def _index_stakers(self):
+        # Stakes live in alpha_stakes; the dict engine's staker index is unused.
+        pass
+
+    def _sync_models(self):
+        for j in range(len(self.subnet_ids)):
+            self._load_subnet(j)
+        if isinstance(self.accounts, AccountStore):
+            self.accounts.free_balance[:] = self.free_balance
+            self.accounts.set_stake_matrix(self.subnet_ids, self.alpha_stakes)
+            return
+        for i, account in enumerate(self.accounts.values()):
+            account.free_balance = float(self.free_balance[i])
+            account.alpha_stakes = {
+                int(self.subnet_ids[j]): float(self.alpha_stakes[i, j])
+                for j in np.flatnonzero(self.alpha_stakes[i])
+            }
+
+    def _load_models(self):
+        subnets = [self.subnets[subnet_id] for subnet_id in self.subnet_ids.tolist()]
+        self.tao_in = np.array([s.tao_in for s in subnets], dtype=np.float64)
+        self.alpha_in = np.array([s.alpha_in for s in subnets], dtype=np.float64)
+        self.alpha_out = np.array([s.alpha_out for s in subnets], dtype=np.float64)
+        self.k = np.array([s.k for s in subnets], dtype=np.float64)
+
+        if isinstance(self.accounts, AccountStore):
+            self.free_balance = self.accounts.free_balance.copy()
+            self.alpha_stakes = self.accounts.stake_matrix(self.subnet_ids)
+            return
+        accounts = [self.accounts[account_id] for account_id in self.account_ids.tolist()]
+        self.free_balance = np.array([a.free_balance for a in accounts], dtype=np.float64)
+        self.alpha_stakes = np.zeros((len(accounts), len(subnets)), dtype=np.float64)
+        for i, account in enumerate(accounts):
+            for subnet_id, stake in account.alpha_stakes.items():
+                if subnet_id in self.subnet_index:
+                    self.alpha_stakes[i, self.subnet_index[subnet_id]] = stake
+
+    def _load_subnet(self, j: int) -> Subnet:
+        subnet = self.subnets[int(self.subnet_ids[j])]
+        subnet.tao_in = float(self.tao_in[j])
+        subnet.alpha_in = float(self.alpha_in[j])
+        subnet.alpha_out = float(self.alpha_out[j])
+        subnet.k = float(self.k[j])
+        return subnet
+
+    def _store_subnet(self, j: int, subnet: Subnet):
+        self.tao_in[j] = subnet.tao_in
+        self.alpha_in[j] = subnet.alpha_in
+        self.alpha_out[j] = subnet.alpha_out
+        self.k[j] = subnet.k
+
+    def free_balance_of(self, account_id: int) -> float:
+        return float(self.free_balance[self.account_index[account_id]])
+
+    def alpha_stake_of(self, account_id: int, subnet_id: int) -> float:
+        return float(self.alpha_stakes[self.account_index[account_id], self.subnet_index[subnet_id]])
+
+    def alpha_price_of(self, subnet_id: int) -> float:
+        return float(self._alpha_prices()[self.subnet_index[subnet_id]])
+
+    def market_value_of(self, account_id: int) -> float:
+        return float(self._market_values()[self.account_index[account_id]])
+
+    def _execute_trade(self, account_id: int, subnet_id: int, action: int,
+                       amount_kind: int, amount_value: float):
+        i = self.account_index.get(account_id)
+        j = self.subnet_index.get(subnet_id)
+        if i is None or j is None:
+            return
+
+        subnet = self._load_subnet(j)
+        if action == BUY:
+            tao_amount = resolve_amount(amount_kind, amount_value, float(self.free_balance[i]))
+            self.alpha_stakes[i, j] += subnet.stake(tao_amount)
+            self.free_balance[i] -= tao_amount
+        elif action == SELL:
+            alpha_amount = resolve_amount(amount_kind, amount_value, float(self.alpha_stakes[i, j]))
+            self.free_balance[i] += subnet.unstake(alpha_amount)
+            self.alpha_stakes[i, j] -= alpha_amount
+        self._store_subnet(j, subnet)
+
+    def _alpha_prices(self) -> np.ndarray:
+        prices = np.ones_like(self.tao_in)
+        np.divide(self.tao_in, self.alpha_in, out=prices, where=self.non_root & (self.alpha_in != 0))
+        return prices
+
+    def _emission_shares(self) -> np.ndarray:
+        emission = np.where(self.non_root, self.tao_in, 0.0)
+        total = emission.sum()
+        return emission / total if total else emission * 0.0
+
+    def _weight_factors(self) -> np.ndarray:
+        factors = np.zeros_like(self.tao_in)
+        np.divide(self.tao_in, self.alpha_out, out=factors, where=self.alpha_out != 0)
+        factors[self.is_root] = self.root_weight
+        return factors
+
+    def _inject(self, emission_val: float):
+        emit = self._emission_shares()
+        sum_prices = self._alpha_prices()[self.non_root].sum()
+        self._step_emission = emit
+        self._step_sum_prices = float(sum_prices)
+
+        if sum_prices < 1.0 or not self.balanced:
+            self.tao_supply += emission_val
+            self.tao_in += emit * emission_val
+        else:
+            self.alpha_in[self.non_root] += emission_val
+        self.alpha_out[self.non_root] += emission_val
+        self.k[self.non_root] = self.tao_in[self.non_root] * self.alpha_in[self.non_root]
+
+    def _process_block_step(self):
+        emission_val = 1
+        factors_before = self._weight_factors()
+        self._inject(emission_val)
+
+        factors_after = self._weight_factors()
+        weights = self.alpha_stakes @ factors_before
+        total_global = weights.sum()
+        # Dividend shares, accounts x non-root subnets, kept for logging.
+        if total_global and self.non_root.any():
+            dividends = self._chained_dividends(weights, total_global, factors_before, factors_after)
+            self.alpha_stakes[:, self.non_root] += dividends * emission_val
+        elif self.alpha_stakes.any() and self.non_root.any():
+            dividends = self._sequential_dividends(factors_before, factors_after, emission_val)
+        else:
+            dividends = np.zeros((len(self.account_ids), int(self.non_root.sum())))
+        self._step_dividends = dividends
+
+    def _chained_dividends(self, weights: np.ndarray, total_global: float,
+                           factors_before: np.ndarray, factors_after: np.ndarray) -> np.ndarray:
+        # Subnets pay out in order and each payout feeds the global weights seen by
+        # the next subnet. Per account that is the linear recurrence
+        # w_j = m_j * w_{j-1} + c_j, solved here with cumprod/cumsum over subnets.
+        g = self.global_split
+        stakes = self.alpha_stakes[:, self.non_root]
+        factors = factors_after[self.non_root]
+        delta = factors - factors_before[self.non_root]
+
+        local_share = stakes * factors
+        total_local = local_share.sum(axis=0)
+        np.divide(local_share, total_local, out=local_share, where=total_local != 0)
+        local_share[:, total_local == 0] = 0.0
+        local_paid = np.where(total_local != 0, 1 - g, 0.0)
+
+        weight_shift = stakes.sum(axis=0) * delta
+        weight_paid = factors * (g + local_paid)
+        totals = total_global + np.cumsum(weight_shift + weight_paid) - weight_paid
+        growth = 1 + g * factors / totals
+
+        # The accounts x subnets arrays are updated in place so a step holds only
+        # a few of them at once, which matters with 100k+ accounts.
+        carried = np.concatenate(([1.0], np.cumprod(growth[:-1])))
+        chained = stakes
+        chained *= delta
+        chained[:, 1:] += (factors * (1 - g) * local_share)[:, :-1]
+        chained /= carried
+        np.cumsum(chained, axis=1, out=chained)
+        chained += weights[:, None]
+        chained *= carried
+
+        chained *= g
+        chained /= totals
+        local_share *= 1 - g
+        chained += local_share
+        return chained
+
+    def _sequential_dividends(self, factors_before: np.ndarray, factors_after: np.ndarray,
+                              emission_val: float) -> np.ndarray:
+        factors = factors_before.copy()
+        nr_idx = np.flatnonzero(self.non_root)
+        dividends = np.zeros((len(self.account_ids), len(nr_idx)))
+        for column, j in enumerate(nr_idx):
+            factors[j] = factors_after[j]
+            weights = self.alpha_stakes @ factors
+            total_global = weights.sum()
+            local_weights = self.alpha_stakes[:, j] * factors[j]
+            total_local = local_weights.sum()
+            dividends[:, column] = (
+                self.global_split * (weights / total_global if total_global else 0.0) +
+                (1 - self.global_split) * (local_weights / total_local if total_local else 0.0)
+            )
+            self.alpha_stakes[:, j] += emission_val * dividends[:, column]
+        return dividends
+
+    def _advance(self, block: int, n_blocks: int):
+        chunk = FAST_FORWARD_BUDGET // (len(self.subnet_ids) ** 2)
+        while n_blocks > 0:
+            step = min(n_blocks, chunk)
+            if step < FAST_FORWARD_MIN_BLOCKS or not self._fast_forward(step):
+                super()._advance(block, step)
+            block += step
+            n_blocks -= step
+
+    def _fast_forward(self, n_blocks: int) -> bool:
+        # Between trades the pools evolve independently of the stakes, and with
+        # the pools known each account's stake row evolves linearly. The range
+        # therefore collapses to a product of per-block subnet x subnet matrices,
+        # independent of the number of accounts.
+        nr = self.non_root
+        factors = self._weight_factors()
+        if not nr.any() or not self.tao_in[nr].sum() or not (self.alpha_stakes @ factors).sum():
+            return False
+
+        path_factors = np.tile(factors, (n_blocks + 1, 1))
+        path_factors[:, nr] = self._pool_path(n_blocks)
+
+        transitions = self._transition_matrices(path_factors[:-1], path_factors[1:])
+        while len(transitions) > 1:
+            if len(transitions) % 2:
+                transitions = np.concatenate((transitions, np.eye(len(factors))[None]))
+            transitions = transitions[0::2] @ transitions[1::2]
+        self.alpha_stakes = self.alpha_stakes @ transitions[0]
+        return True
+
+    def _pool_path(self, n_blocks: int) -> np.ndarray:
+        # Advances the pools by n_blocks and returns the non-root weight factors
+        # at every block boundary. Unbalanced runs always inject tao pro rata, so
+        # tao_in grows as (total + t) / total; balanced runs switch between tao
+        # and alpha injection on the price sum, which is replayed block by block
+        # with the same float operations as _process_block_step.
+        nr = self.non_root
+        steps = np.arange(n_blocks + 1)[:, None]
+        if self.balanced:
+            path_tao = np.empty((n_blocks + 1, nr.sum()))
+            path_tao[0] = self.tao_in[nr]
+            for t in range(1, n_blocks + 1):
+                self._inject(1)
+                path_tao[t] = self.tao_in[nr]
+            path_alpha_out = self.alpha_out[nr] - n_blocks + steps
+        else:
+            tao_in = self.tao_in[nr]
+            total_tao = tao_in.sum()
+            path_tao = tao_in * (total_tao + steps) / total_tao
+            path_alpha_out = self.alpha_out[nr] + steps
+            self.tao_in[nr] = path_tao[-1]
+            self.alpha_out[nr] = path_alpha_out[-1]
+            self.k[nr] = self.tao_in[nr] * self.alpha_in[nr]
+            self.tao_supply += n_blocks
+
+        path_factors = np.zeros_like(path_tao)
+        np.divide(path_tao, path_alpha_out, out=path_factors, where=path_alpha_out != 0)
+        return path_factors
+
+    def _transition_matrices(self, factors_before: np.ndarray, factors_after: np.ndarray) -> np.ndarray:
+        # Same recurrence as _chained_dividends, written as coefficients on an
+        # account's stake row so that new_row = row @ transitions[t].
+        g = self.global_split
+        nr_idx = np.flatnonzero(self.non_root)
+        n_blocks, n_subnets = factors_before.shape
+        n_paying = len(nr_idx)
+        paying = np.arange(n_paying)
+        before, after = factors_before[:, nr_idx], factors_after[:, nr_idx]
+        delta = after - before
+
+        column_totals = np.empty((n_blocks, n_paying))
+        column_totals[0] = self.alpha_stakes[:, nr_idx].sum(axis=0)
+        local_paid = np.empty((n_blocks, n_paying), dtype=bool)
+        local_paid[0] = column_totals[0] * after[0] != 0
+        if n_blocks > 1:
+            first = column_totals[0] + g + (1 - g) * local_paid[0]
+            local_paid[1:] = first * after[1:] != 0
+            column_totals[1:] = first
+            column_totals[2:] += np.cumsum(g + (1 - g) * local_paid[1:-1], axis=0)
+
+        local_rate = np.where(local_paid, 1 - g, 0.0)
+        inverse_totals = np.zeros_like(column_totals)
+        np.divide(1.0, column_totals, out=inverse_totals, where=local_paid)
+
+        root_total = self.alpha_stakes[:, self.is_root].sum() * self.root_weight
+        totals_before = (column_totals * before).sum(axis=1) + root_total
+        weight_shift = column_totals * delta
+        weight_paid = after * (g + local_rate)
+        totals = totals_before[:, None] + np.cumsum(weight_shift + weight_paid, axis=1) - weight_paid
+        growth = 1 + g * after / totals
+
+        carried = np.ones((n_blocks, n_paying))
+        carried[:, 1:] = np.cumprod(growth[:, :-1], axis=1)
+        increments = np.zeros((n_blocks, n_subnets, n_paying))
+        increments[:, nr_idx, paying] = delta
+        increments[:, nr_idx[:-1], paying[1:]] += (after * local_rate * inverse_totals)[:, :-1]
+        chained = carried[:, None, :] * (
+            factors_before[:, :, None] + np.cumsum(increments / carried[:, None, :], axis=2)
+        )
+
+        transitions = np.broadcast_to(np.eye(n_subnets), (n_blocks, n_subnets, n_subnets)).copy()
+        transitions[:, :, nr_idx] += g * chained / totals[:, None, :]
+        transitions[:, nr_idx, nr_idx] += local_rate * inverse_totals
+        return transitions
+
+    def _market_values(self) -> np.ndarray:
+        held = self.alpha_stakes > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pool_value = self.tao_in - self.k / (self.alpha_in + np.where(held, self.alpha_stakes, 0.0))
+        stake_value = np.where(self.is_root, self.alpha_stakes, pool_value)
+        return self.free_balance + np.where(held, stake_value, 0.0).sum(axis=1)
+
+    def _log_state(self, block: int, tables: Tuple[str, ...] = LOG_TABLES):
+        if "accounts" in tables:
+            self.sink.write_columns("accounts", {
+                "block": np.full(len(self.account_ids), block),
+                "account_id": self.account_ids,
+                "free_balance": self.free_balance,
+                "market_value": self._market_values(),
+            })
+
+        if "stakes" in tables:
+            self._write_nonzero("stakes", "alpha_stake", block, self.alpha_stakes)
+
+        # Emission shares and dividends are the ones the block step just paid
+        # out, so logging recomputes neither.
+        prices = self._alpha_prices()
+        if "subnets" in tables:
+            for j, subnet_id in enumerate(self.subnet_ids.tolist()):
+                self.sink.write("subnets", {
+                    "block": block,
+                    "subnet_id": subnet_id,
+                    "tao_in": float(self.tao_in[j]),
+                    "alpha_in": float(self.alpha_in[j]),
+                    "alpha_out": float(self.alpha_out[j]),
+                    "exchange_rate": float(prices[j]),
+                    "emission_rate": float(self._step_emission[j]),
+                })
+
+        if "dividends" in tables:
+            dividends = np.zeros_like(self.alpha_stakes)
+            dividends[:, self.non_root] = self._step_dividends
+            self._write_nonzero("dividends", "dividend", block, dividends)
+
+        if "subtensor" in tables:
+            self.sink.write("subtensor", {
+                "block": block,
+                "tao_supply": self.tao_supply,
+                "sum_prices": float(prices[self.non_root].sum())
+            })
+
+    def _block_result(self, block: int) -> BlockResult:
+        # Built from the step's arrays only when asked for; accounts without a
+        # dividend are left out.
+        nr_ids = self.subnet_ids[self.non_root].tolist()
+        dividends = {}
+        for column, subnet_id in enumerate(nr_ids):
+            paid = np.flatnonzero(self._step_dividends[:, column])
+            dividends[subnet_id] = dict(zip(self.account_ids[paid].tolist(),
+                                            self._step_dividends[paid, column].tolist()))
+        return BlockResult(
+            block=block,
+            sum_prices=self._step_sum_prices,
+            injected_tao=self._step_sum_prices < 1.0 or not self.balanced,
+            emission=dict(zip(nr_ids, self._step_emission[self.non_root].tolist())),
+            dividends=dividends,
+        )
+
+    def _write_nonzero(self, table: str, column: str, block: int, matrix: np.ndarray):
+        for start in range(0, max(len(self.account_ids), 1), LOG_ACCOUNTS):
+            part = matrix[start:start + LOG_ACCOUNTS]
+            rows, cols = np.nonzero(part)
+            self.sink.write_columns(table, {
+                "block": np.full(len(rows), block),
+                "account_id": self.account_ids[start + rows],
+                "subnet_id": self.subnet_ids[cols],
+                column: part[rows, cols],
+            })
@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+from src.generators import random_trades
+from src.models import Account, Subnet
+
+
+@pytest.mark.parametrize('n_subnets', [1, 2])
+def test_random_trades_with_fewer_subnets_than_opening_stakes(n_subnets):
+    subnets = [Subnet(id=i, tao_in=1000.0, alpha_in=1000.0, alpha_out=1000.0, is_root=i == 0)
+               for i in range(n_subnets)]
+    accounts = [Account(id=i, free_balance=100.0, alpha_stakes={}, registered_subnets=list(range(n_subnets)))
+                for i in range(1, 11)]
+    trades = random_trades(subnets, accounts, 1000, np.random.default_rng(0))
+
+    assert len(trades) > 0
+    rows = list(trades.rows(0, len(trades)))
+    assert {subnet_id for _, subnet_id, _, _, _ in rows} <= set(range(n_subnets))
+    assert {account_id for account_id, _, _, _, _ in rows} <= set(range(1, 11))
+    assert np.all(np.diff(trades.block) >= 0) and trades.block.max() < 1000
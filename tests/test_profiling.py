@@ -0,0 +1,16 @@
+import pytest
+from src.benchmark import PHASES, build_config
+from src.simulation import create_subtensor
+
+
+@pytest.mark.parametrize('engine', ['dict', 'numpy', 'compiled'])
+def test_engine_profiles_every_benchmark_phase(engine, tmp_path):
+    # A small event-mode case with trades, logs and quiet stretches in between
+    # reaches every phase; one that records no calls has no profiled method,
+    # and the benchmark would count its time as other.
+    config = build_config('random', 4, 20, 0.02, 1000)
+    config.update(engine=engine, mode='event', profile=True)
+    subtensor = create_subtensor(config, output_dir=str(tmp_path))
+    subtensor.run_simulation()
+
+    assert [phase for phase in PHASES if not subtensor.profiler.calls.get(phase)] == []
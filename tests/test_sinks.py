@@ -0,0 +1,58 @@
+import copy
+import numpy as np
+import pandas as pd
+import pytest
+import simulations.root_versus_alpha as root_versus_alpha
+from src.log_policies import LOG_TABLES
+from src.simulation import create_subtensor
+from src.sinks import SINKS, make_sink, read_table
+
+FORMATS = list(SINKS)
+
+
+def sink_options(output_format, tmp_path):
+    # A small chunk size, so every table spans several flushes.
+    options = {'chunk_size': 3}
+    if output_format == 'sqlite':
+        options.update(database=str(tmp_path / 'results.sqlite'), run_id='run')
+    return options
+
+
+def make_test_sink(output_format, directory, tmp_path):
+    if output_format == 'parquet':
+        pytest.importorskip('pyarrow')
+    return make_sink(output_format, str(directory), **sink_options(output_format, tmp_path))
+
+
+@pytest.mark.parametrize('output_format', FORMATS)
+def test_sink_round_trips_rows(output_format, tmp_path):
+    sink = make_test_sink(output_format, tmp_path / 'run', tmp_path)
+    rows = [{"block": block, "subnet_id": block % 3, "value": block / 7, "action": ['buy', 'sell'][block % 2]}
+            for block in range(10)]
+    for row in rows[:4]:
+        sink.write("table", row)
+    sink.write_columns("table", {key: np.array([row[key] for row in rows[4:]]) for key in rows[0]})
+    sink.write("nested", {"block": 0, "emission": {"1": 0.25, "2": 0.75}})
+    sink.close()
+
+    pd.testing.assert_frame_equal(read_table(str(tmp_path / 'run'), 'table'), pd.DataFrame(rows),
+                                  check_dtype=False)
+    assert read_table(str(tmp_path / 'run'), 'nested')['emission'].tolist() == [{"1": 0.25, "2": 0.75}]
+    assert read_table(str(tmp_path / 'run'), 'missing').empty
+
+
+@pytest.mark.parametrize('output_format', FORMATS)
+def test_simulation_output_matches_across_formats(output_format, tmp_path):
+    tables = {}
+    for fmt in ('json', output_format):
+        if fmt == 'parquet':
+            pytest.importorskip('pyarrow')
+        config = copy.deepcopy(root_versus_alpha.config)
+        config.update(output_format=fmt, **sink_options(fmt, tmp_path))
+        directory = str(tmp_path / fmt)
+        create_subtensor(config, output_dir=directory).run_simulation()
+        tables[fmt] = {table: read_table(directory, table) for table in (*LOG_TABLES, 'trades')}
+
+    for table, expected in tables['json'].items():
+        assert not expected.empty, table
+        pd.testing.assert_frame_equal(tables[output_format][table], expected, check_dtype=False, obj=table)
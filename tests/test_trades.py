@@ -0,0 +1,33 @@
+from src.models import Trade
+from src.trades import TradeBook
+
+TRADES = [
+    Trade(block=5, account_id=1, subnet_id=1, action='buy', amount='10'),
+    Trade(block=0, account_id=2, subnet_id=0, action='sell', amount='all'),
+    Trade(block=5, account_id=2, subnet_id=2, action='sell', amount='12.5%'),
+    Trade(block=0, account_id=1, subnet_id=2, action='unstake', amount='1.5'),
+    Trade(block=7, account_id=3, subnet_id=1, action='buy', amount='0.25'),
+]
+
+
+def test_trade_book_round_trips_trade_lists():
+    # Rows come back sorted by block, keeping the given order within a block,
+    # with actions outside buy/sell kept by name.
+    book = TradeBook.from_trades(TRADES)
+
+    assert book.to_trades() == sorted(TRADES, key=lambda trade: trade.block)
+    assert TradeBook.from_trades(book.to_trades()).to_trades() == book.to_trades()
+
+
+def test_trade_book_round_trips_through_files(tmp_path):
+    book = TradeBook.from_trades(TRADES)
+    book.save(str(tmp_path / 'trades.npz'))
+
+    assert TradeBook.load(str(tmp_path / 'trades.npz')).to_trades() == book.to_trades()
+
+
+def test_concatenated_books_keep_book_order_within_a_block():
+    first, second = TradeBook.from_trades(TRADES[:2]), TradeBook.from_trades(TRADES[2:])
+
+    assert TradeBook.concat([first, second]).to_trades() == [
+        TRADES[1], TRADES[3], TRADES[0], TRADES[2], TRADES[4]]